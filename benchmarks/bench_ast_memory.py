@@ -0,0 +1,49 @@
+"""Memory held by the AST of a large synthetic program, in bytes per node.
+
+Usage: python benchmarks/bench_ast_memory.py [rings]
+"""
+import os
+import sys
+import gc
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from narya_compiler import NaryaCompiler
+from narya_transformer import NaryaTransformer
+from narya_ast import Ast
+from bench_transform import generate_program
+
+def count_ast_nodes(node):
+    count = 0
+    stack = [node]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, list):
+            stack.extend(item)
+        elif isinstance(item, Ast):
+            count += 1
+            stack.extend(value for _, value in item.iter_fields())
+    return count
+
+def main():
+    rings = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+
+    compiler = NaryaCompiler()
+    parse_tree = compiler.parser.parse(compiler.preprocess(generate_program(rings)))
+
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    ast = NaryaTransformer().transform(parse_tree)
+    gc.collect()
+    retained = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+
+    nodes = count_ast_nodes(ast)
+    print(f"{rings} rings, {nodes} AST nodes")
+    print(f"AST memory  {retained / 1024 / 1024:9.2f} MiB")
+    print(f"per node    {retained / nodes:9.1f} bytes")
+
+if __name__ == "__main__":
+    main()
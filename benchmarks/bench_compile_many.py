@@ -0,0 +1,47 @@
+"""Project compile time of compile_many by worker count.
+
+Usage: python benchmarks/bench_compile_many.py [files] [rings_per_file]
+"""
+import os
+import sys
+import time
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from narya_project import compile_many
+from bench_transform import RING_TEMPLATE
+
+def write_project(directory, files, rings_per_file):
+    for file_index in range(files):
+        rings = (RING_TEMPLATE.format(i=file_index * rings_per_file + i) for i in range(rings_per_file))
+        with open(os.path.join(directory, f"module_{file_index}.narya"), "w") as source_file:
+            source_file.write("\n".join(rings))
+
+def worker_counts():
+    counts = []
+    count = 1
+    while count < (os.cpu_count() or 1):
+        counts.append(count)
+        count *= 2
+    counts.append(os.cpu_count() or 1)
+    return counts
+
+def main():
+    files = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    rings_per_file = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    with tempfile.TemporaryDirectory() as directory:
+        write_project(directory, files, rings_per_file)
+        print(f"{files} files x {rings_per_file} rings")
+        baseline = None
+        for workers in worker_counts():
+            start = time.perf_counter()
+            project = compile_many([directory], workers=workers)
+            seconds = time.perf_counter() - start
+            assert project.ok, project.errors[:3]
+            baseline = baseline or seconds
+            print(f"{workers:3} workers {seconds:8.2f} s  speedup {baseline / seconds:5.2f}x")
+
+if __name__ == "__main__":
+    main()
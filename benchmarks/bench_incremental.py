@@ -0,0 +1,47 @@
+"""Incremental build times: cold, warm with no changes, and after editing one file.
+
+Usage: python benchmarks/bench_incremental.py [files] [rings_per_file]
+"""
+import os
+import sys
+import time
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from narya_build_cache import BuildCache, IncrementalBuilder
+from bench_compile_many import write_project
+
+def timed_build(cache_directory, project_directory):
+    start = time.perf_counter()
+    build = IncrementalBuilder(BuildCache(cache_directory)).build([project_directory])
+    seconds = time.perf_counter() - start
+    assert not build.errors, build.errors[:3]
+    return build, seconds
+
+def main():
+    files = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    rings_per_file = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    with tempfile.TemporaryDirectory() as project_directory, tempfile.TemporaryDirectory() as cache_directory:
+        write_project(project_directory, files, rings_per_file)
+        print(f"{files} files x {rings_per_file} rings")
+
+        build, seconds = timed_build(cache_directory, project_directory)
+        print(f"cold         {seconds:8.3f} s  compiled {len(build.compiled)}")
+
+        build, seconds = timed_build(cache_directory, project_directory)
+        assert not build.compiled
+        print(f"warm no-op   {seconds:8.3f} s  compiled {len(build.compiled)}")
+
+        edited = os.path.join(project_directory, "module_0.narya")
+        with open(edited, "a") as source_file:
+            source_file.write("\nring Edited\n    int Value = 1\n")
+        build, seconds = timed_build(cache_directory, project_directory)
+        print(f"single edit  {seconds:8.3f} s  compiled {len(build.compiled)}  checked {len(build.checked)}")
+
+        ast = build.ast(edited)
+        assert ast is not None and ast.statements[-1].name == "Edited"
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Latency of single-character edits with IncrementalDocument against a full compile.
+
+Usage: python benchmarks/bench_incremental_parse.py [lines] [edits]
+"""
+import os
+import sys
+import time
+import random
+import statistics
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from narya_compiler import NaryaCompiler
+from narya_incremental import IncrementalDocument
+from bench_transform import RING_TEMPLATE
+
+GROUP_TEMPLATE = """    group Shape{i}
+        num width{i} = {i}
+        public num Area{i}(num scale{i})
+            num result{i} = width{i} * scale{i} + {i}
+            return result{i}
+"""
+
+def many_rings(lines):
+    rings = lines // RING_TEMPLATE.count("\n") + 1
+    return "\n".join(RING_TEMPLATE.format(i=i) for i in range(rings))
+
+def one_ring(lines):
+    groups = lines // GROUP_TEMPLATE.count("\n") + 1
+    return "ring Shapes\n" + "".join(GROUP_TEMPLATE.format(i=i) for i in range(groups))
+
+def digit_positions(document):
+    """Positions just after a digit, where typing another digit keeps the program valid."""
+    positions = []
+    for index, line in enumerate(document.lines):
+        for column, char in enumerate(line):
+            if char.isdigit() and not line[column - 1].isalnum():
+                positions.append((index, column + 1))
+    return positions
+
+def measure(name, code, edits):
+    compiler = NaryaCompiler()
+    start = time.perf_counter()
+    compiler.compile(code)
+    full = time.perf_counter() - start
+
+    document = IncrementalDocument(code, compiler)
+    positions = random.Random(0).sample(digit_positions(document), edits)
+    latencies = []
+    for line, column in positions:
+        start = time.perf_counter()
+        document.apply_edit(line, column, line, column, "7")
+        document.apply_edit(line, column, line, column + 1, "")
+        latencies.append((time.perf_counter() - start) / 2)
+    assert document.ast == compiler.parse(document.text)
+
+    median = statistics.median(latencies)
+    print(f"{name:12} {len(document.lines):6} lines  full compile {full * 1000:8.1f} ms  "
+          f"edit median {median * 1000:6.2f} ms  p95 {statistics.quantiles(latencies, n=20)[-1] * 1000:6.2f} ms  "
+          f"speedup {full / median:7.0f}x")
+
+def main():
+    lines = int(sys.argv[1]) if len(sys.argv) > 1 else 12000
+    edits = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    measure("many rings", many_rings(lines), edits)
+    measure("one ring", one_ring(lines), edits)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""Effect and cost of the AST optimization passes.
+
+Usage: python benchmarks/bench_optimize.py [--scale 1.0] [--budget 0.5]
+
+For each generated program shape, prints the node count after every pass
+with its changes and time. Then runs a program with foldable constants,
+dead branches and small helper functions on the VM with and without
+optimization, checking that the output is the same, and checks that
+branches removed from dangerous scopes still run the same and that
+constants too large to fold are left alone quickly.
+"""
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from narya_compiler import NaryaCompiler
+from narya_bytecode import generate_bytecode
+from narya_optimizer import PassManager
+from narya_vm import NaryaVM
+from program_generator import SHAPES, generate
+
+PROGRAM = """ring Bench
+    num Square(num x)
+        return x * x
+    num Clamp(num value, num limit)
+        return value > limit ? limit | value
+    do
+        num total = 0
+        for i = 0 -> {size}
+            total = total + Square(i) % 7 + 60 * 60 * 24 - Clamp(i, 1000)
+            if 2 > 3
+                print "unreachable"
+        print total
+"""
+
+# Dangerous scopes whose single statement is a branch that folding removes
+DANGEROUS_BRANCHES = [
+    "danger if true\n            print x\n            print 3",
+    "danger if false\n            print x\n        else\n            num y = 2\n            print y",
+    "danger if false\n            print x",
+    "danger while false\n            print x",
+]
+
+def check_dangerous_branches():
+    """A list of problems found; empty when optimized programs print what plain ones do."""
+    problems = []
+    for statement in DANGEROUS_BRANCHES:
+        code = f"ring Main\n    do\n        num x = 1\n        {statement}\n        print 9\n"
+        try:
+            expected, _ = run_time(NaryaCompiler().compile(code), 0)
+            output, _ = run_time(NaryaCompiler(optimize=True).compile(code), 0)
+        except Exception as e:
+            problems.append(f"{statement.splitlines()[0]}: {type(e).__name__}: {e}")
+            continue
+        if output != expected:
+            problems.append(f"{statement.splitlines()[0]}: printed {output}, expected {expected}")
+    return problems
+
+# Expressions whose value is too large for a literal
+LARGE_FOLDS = ['"a" * 1000000000', "((((2 ^ 64) ^ 64) ^ 64) ^ 64) ^ 64"]
+
+def check_large_folds(seconds=1.0):
+    problems = []
+    for expression in LARGE_FOLDS:
+        start = time.perf_counter()
+        NaryaCompiler(optimize=True).compile(f"ring Main\n    do\n        print {expression}\n")
+        elapsed = time.perf_counter() - start
+        if elapsed > seconds:
+            problems.append(f"{expression}: folding took {elapsed:.1f} s")
+    return problems
+
+def run_time(ast, repeats):
+    program = generate_bytecode(ast)
+    output = []
+    NaryaVM(program, output.append).run()
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        NaryaVM(program, lambda text: None).run()
+        best = min(best, time.perf_counter() - start)
+    return output, best
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("--scale", type=float, default=1.0)
+    arg_parser.add_argument("--seed", type=int, default=0)
+    arg_parser.add_argument("--budget", type=float, default=0.5, help="seconds each pass may take")
+    arg_parser.add_argument("--repeats", type=int, default=3)
+    args = arg_parser.parse_args(argv)
+
+    compiler = NaryaCompiler()
+    for shape in sorted(SHAPES):
+        ast = compiler.parse(generate(shape, args.seed, args.scale))
+        manager = PassManager(budget=args.budget)
+        manager.run(ast)
+        print(shape)
+        print(manager.summary())
+        print()
+
+    problems = check_dangerous_branches() + check_large_folds()
+    for problem in problems:
+        print(problem)
+    if problems:
+        return 1
+
+    code = PROGRAM.format(size=100000)
+    plain_output, plain_time = run_time(compiler.compile(code), args.repeats)
+    optimizing = NaryaCompiler(optimize=True)
+    optimized_output, optimized_time = run_time(optimizing.compile(code), args.repeats)
+    if plain_output != optimized_output:
+        print(f"Output mismatch:\n  plain:     {plain_output}\n  optimized: {optimized_output}")
+        return 1
+    print(f"vm run: {plain_time * 1000:.1f} ms plain, {optimized_time * 1000:.1f} ms optimized")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,98 @@
+"""One recovering compile against fixing syntax errors one compile at a time.
+
+Usage: python benchmarks/bench_recovery.py [errors] [shape] [scale]
+
+Breaks a number of statements in a generated program (seeded), then times a
+single recovering compile that reports them all, against the fix-one-and-
+recompile cycle of the strict parser. Also checks that stray closing
+brackets and misplaced blocks are reported rather than crashing the
+recovering compile.
+"""
+import os
+import sys
+import time
+import random
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from narya_compiler import NaryaCompiler
+from narya_diagnostics import CompileErrors
+from program_generator import generate
+
+def break_lines(lines, count, seed=0):
+    """Leave a dangling operator on count simple statements; returns the broken line numbers."""
+    candidates = [index for index, line in enumerate(lines) if line.lstrip().startswith(("print ", "num "))]
+    broken = sorted(random.Random(seed).sample(candidates, min(count, len(candidates))))
+    for index in broken:
+        lines[index] += " +"
+    return [index + 1 for index in broken]
+
+# Malformed sources, and the line of their first error
+MALFORMED = [
+    ("ring Main\n    print f(1, )\n", 2),
+    ("ring Main\n    do\n        print (1 +)\n", 3),
+    ("ring Main\n    do\n        print 2)\n        print [1, 2]]\n", 3),
+    ("ring Main\n    do x\n        x = 1\n    (x > 0) ? repeat\n", 2),
+    ("ring Main\n    num x = 1\n    (x > 0) ? repeat\n", 3),
+]
+
+def check_malformed(compiler):
+    """A list of problems found; empty when every malformed source is reported as diagnostics."""
+    problems = []
+    for source, line in MALFORMED:
+        try:
+            compiler.compile(source)
+            problems.append(f"no error reported for {source!r}")
+        except CompileErrors as e:
+            if e.diagnostics[0].line != line:
+                problems.append(f"{source!r}: first error at line {e.diagnostics[0].line}, expected {line}")
+        except Exception as e:
+            problems.append(f"{source!r}: {type(e).__name__}: {e}")
+    return problems
+
+def main():
+    errors = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    shape = sys.argv[2] if len(sys.argv) > 2 else "many_rings"
+    scale = float(sys.argv[3]) if len(sys.argv) > 3 else 0.5
+
+    original = generate(shape, 0, scale).splitlines()
+    lines = list(original)
+    broken = break_lines(lines, errors)
+
+    recovering = NaryaCompiler(recover=True)
+    start = time.perf_counter()
+    try:
+        recovering.compile("\n".join(lines))
+        reported = []
+    except CompileErrors as e:
+        reported = [diagnostic.line for diagnostic in e.diagnostics]
+    recover_time = time.perf_counter() - start
+    if reported != broken:
+        print(f"Reported lines {reported}\ndiffer from broken lines {broken}")
+        return 1
+    problems = check_malformed(recovering)
+    for problem in problems:
+        print(problem)
+    if problems:
+        return 1
+
+    strict = NaryaCompiler()
+    cycles = 0
+    start = time.perf_counter()
+    while True:
+        cycles += 1
+        try:
+            strict.compile("\n".join(lines))
+            break
+        except Exception as e:
+            # Fix the line the error points at and compile again
+            lines[e.line - 1] = original[e.line - 1]
+    strict_time = time.perf_counter() - start
+
+    print(f"{shape} x{scale}, {len(original)} lines, {len(broken)} syntax errors")
+    print(f"recovering compile  1 run     {recover_time * 1000:9.1f} ms, all {len(reported)} reported")
+    print(f"strict compile    {cycles:3} runs    {strict_time * 1000:9.1f} ms, one error per run")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,129 @@
+"""Ring-level build scheduling over using statements, and invalidation on rebuild.
+
+Usage: python benchmarks/bench_schedule.py [rings] [width] [scale]
+
+Generates a project of layered rings: each ring uses a few rings of the
+layer before it, and rings are spread over several files. Prints the
+schedule and its critical path, times full builds at each worker count,
+then changes one ring at the bottom and one at the top of the graph and
+times the rebuilds. Fails if worker counts disagree, if a rebuild
+touches more than the changed ring and its dependents, or if a cycle goes
+undetected.
+"""
+import os
+import sys
+import time
+import random
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from narya_dependencies import DependencyGraph, DependencyCycleError, RingBuilder
+from bench_compile_many import worker_counts
+from program_generator import ProgramGenerator, SHAPES
+
+RINGS_PER_FILE = 4
+
+def generate_project(directory, rings, width, scale, seed=0):
+    """Write the project; returns the ring names, layer by layer."""
+    generator = ProgramGenerator(seed)
+    options = dict(SHAPES["many_rings"])
+    del options["rings"]
+    options["statements"] = max(1, round(options["statements"] * scale))
+    layers = []
+    sources = []
+    for index in range(rings):
+        lines = generator.ring(**options)
+        name = lines[0].split()[1]
+        if index % width == 0:
+            layers.append([])
+        if len(layers) > 1:
+            for dependency in generator.random.sample(layers[-2], min(2, len(layers[-2]))):
+                lines.insert(1, f"    using {dependency}")
+        layers[-1].append(name)
+        sources.append("\n".join(lines) + "\n")
+    for start in range(0, len(sources), RINGS_PER_FILE):
+        with open(os.path.join(directory, f"part_{start // RINGS_PER_FILE}.narya"), "w") as source_file:
+            source_file.write("\n".join(sources[start:start + RINGS_PER_FILE]))
+    return layers
+
+def touch_ring(directory, name):
+    """Append a statement to a ring's do block, changing its source but not its names."""
+    for file_name in os.listdir(directory):
+        path = os.path.join(directory, file_name)
+        with open(path) as source_file:
+            source = source_file.read()
+        start = source.find(f"ring {name}\n")
+        if start >= 0:
+            end = source.find("\nring ", start + 1)
+            end = len(source) if end < 0 else end
+            source = source[:end].rstrip("\n") + "\n        print 0\n" + source[end:]
+            with open(path, "w") as source_file:
+                source_file.write(source)
+            return
+    raise ValueError(f"No ring {name}")
+
+def summary(build):
+    return {name: (sorted(result.names), [diagnostic.message for diagnostic in result.diagnostics], result.error)
+            for name, result in build.results.items()}
+
+def main():
+    rings = int(sys.argv[1]) if len(sys.argv) > 1 else 48
+    width = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    scale = float(sys.argv[3]) if len(sys.argv) > 3 else 1.0
+
+    failed = False
+    with tempfile.TemporaryDirectory() as directory:
+        layers = generate_project(directory, rings, width, scale)
+        graph = DependencyGraph.from_paths([directory])
+        waves = graph.schedule()
+        length, path = graph.critical_path()
+        print(f"{rings} rings in {len(layers)} layers of {width}: {len(waves)} waves, "
+              f"widest {max(map(len, waves))}, critical path {length} rings")
+
+        expected = None
+        builder = None
+        for workers in worker_counts() if (os.cpu_count() or 1) > 1 else [1, 2]:
+            builder = RingBuilder(workers)
+            build = builder.build([directory])
+            seconds, path = build.critical_path
+            print(f"  {workers:3} workers  {build.elapsed * 1000:9.1f} ms, critical path {seconds * 1000:.1f} ms "
+                  f"over {len(path)} rings")
+            if expected is None:
+                expected = summary(build)
+            elif summary(build) != expected:
+                print(f"  results with {workers} workers differ from 1 worker")
+                failed = True
+            if build.errors:
+                print(f"  unexpected errors: {build.errors[:3]}")
+                failed = True
+
+        for label, name in (("top ring", layers[-1][0]), ("bottom ring", layers[0][0])):
+            touch_ring(directory, name)
+            build = builder.build([directory])
+            dependents = graph.invalidated({name})
+            print(f"  change {label} {name}: {build.elapsed * 1000:7.1f} ms, {len(build.compiled)} compiled, "
+                  f"{len(build.rechecked)} rechecked, {rings - len(dependents)} reused")
+            if build.compiled != [name] or set(build.rechecked) != dependents - {name}:
+                print(f"  expected only {name} compiled and its {len(dependents) - 1} dependents rechecked")
+                failed = True
+
+        # Close a cycle from a bottom ring back to the highest ring that depends on it
+        bottom = next((name for name in layers[0] if graph.dependents[name]), None)
+        if bottom is None:
+            print("  nothing depends on the bottom layer; no cycle to close")
+            return 1 if failed else 0
+        dependents = graph.invalidated({bottom})
+        top = next(name for layer in reversed(layers) for name in layer if name in dependents)
+        with open(os.path.join(directory, "cycle.narya"), "w") as source_file:
+            source_file.write(f"ring {bottom}\n    using {top}\n")
+        try:
+            DependencyGraph.from_paths([directory]).schedule()
+            print("  cycle not detected")
+            failed = True
+        except DependencyCycleError as e:
+            print(f"  {e.diagnostics[0].message[:80]}...")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,46 @@
+"""Semantic analysis time by worker count, checking the diagnostics never change.
+
+Usage: python benchmarks/bench_semantic.py [shape] [scale]
+
+Pass one (declaration collection) always runs in this process; pass two
+checks the ring and group bodies across the worker pool.
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from narya_compiler import NaryaCompiler
+from narya_semantic import check_units, collect_declarations
+from program_generator import generate
+from bench_compile_many import worker_counts
+
+def main():
+    shape = sys.argv[1] if len(sys.argv) > 1 else "many_rings"
+    scale = float(sys.argv[2]) if len(sys.argv) > 2 else 4.0
+
+    ast = NaryaCompiler().parse(generate(shape, 0, scale))
+    start = time.perf_counter()
+    index, units, _ = collect_declarations(ast)
+    collect_time = time.perf_counter() - start
+    print(f"{shape} x{scale}: {len(units)} units, declarations collected in {collect_time * 1000:.1f} ms")
+
+    expected = None
+    baseline = None
+    # At least two worker counts, so the results are always compared
+    for workers in worker_counts() if (os.cpu_count() or 1) > 1 else [1, 2]:
+        start = time.perf_counter()
+        results = check_units(index, units, workers)
+        seconds = time.perf_counter() - start
+        expected = expected or results
+        if results != expected:
+            print(f"Diagnostics differ with {workers} workers")
+            return 1
+        baseline = baseline or seconds
+        print(f"{workers:3} workers {seconds * 1000:9.1f} ms  speedup {baseline / seconds:5.2f}x")
+    print(f"{sum(map(len, expected))} diagnostics")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,109 @@
+"""The binary AST format against pickle, with round-trip checks.
+
+Usage: python benchmarks/bench_serialization.py [shape|all] [scale]
+
+For each generated program: checks that the AST survives serialize and
+deserialize, that every declaration read lazily from a memory-mapped file
+equals the one in the original tree, and that damaged files are rejected;
+then compares sizes and times with pickle, including loading a single
+declaration from the middle of the file. A program with anonymous
+functions and the other constructs the generator does not write is
+round-tripped first.
+"""
+import os
+import sys
+import time
+import pickle
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from narya_compiler import NaryaCompiler
+from narya_ast_visualizer import find_declaration
+from narya_serialization import serialize, deserialize, write_ast, AstFile, AstReader, FORMAT_VERSION
+from program_generator import generate, SHAPES
+
+CONSTRUCTS = """ring Main
+    Box(num) Wrap(Box(text) value)
+        return value
+    do
+        num twice = do(num x) num: x * 2
+        num noisy = do(num x) num
+            print x
+            return x
+        Box(num) box = Wrap(twice(3))
+        num d = {a = 1, b = noisy(2)}
+        { print d }
+"""
+
+def best_time(function, runs=3):
+    best = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+def check_round_trip(ast, path):
+    """A list of problems found; empty when every check passes."""
+    problems = []
+    if deserialize(serialize(ast)) != ast:
+        problems.append("deserialize(serialize(ast)) differs from the AST")
+    write_ast(ast, path)
+    with AstFile(path) as ast_file:
+        for name in ast_file.declarations:
+            if ast_file.declaration(name) != find_declaration(ast, name):
+                problems.append(f"declaration {name} differs")
+        if ast_file.root() != ast:
+            problems.append("memory-mapped root differs from the AST")
+    data = bytearray(serialize(ast))
+    data[len(b"NARYA-AST-BIN")] = FORMAT_VERSION + 1
+    for damaged in (b"", b"NARYA-AST", bytes(data)):
+        try:
+            AstReader(damaged)
+            problems.append(f"accepted a damaged file of {len(damaged)} bytes")
+        except ValueError:
+            pass
+    return problems
+
+def main():
+    shape = sys.argv[1] if len(sys.argv) > 1 else "all"
+    scale = float(sys.argv[2]) if len(sys.argv) > 2 else 0.5
+    shapes = list(SHAPES) if shape == "all" else [shape]
+
+    compiler = NaryaCompiler()
+    failed = False
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "program.nast")
+        for problem in check_round_trip(compiler.compile(CONSTRUCTS), path):
+            print(f"constructs: {problem}")
+            failed = True
+        for shape in shapes:
+            ast = compiler.compile(generate(shape, 0, scale))
+            problems = check_round_trip(ast, path)
+            for problem in problems:
+                print(f"{shape}: {problem}")
+            failed |= bool(problems)
+
+            dump_time, data = best_time(lambda: serialize(ast))
+            pickle_dump_time, pickled = best_time(lambda: pickle.dumps(ast, pickle.HIGHEST_PROTOCOL))
+            load_time, _ = best_time(lambda: deserialize(data))
+            pickle_load_time, _ = best_time(lambda: pickle.loads(pickled))
+            with AstFile(path) as ast_file:
+                names = list(ast_file.declarations)
+                name = names[len(names) // 2]
+            def load_declaration():
+                with AstFile(path) as ast_file:
+                    return ast_file.declaration(name), sum(node is not None for node in ast_file.node_cache)
+            declaration_time, (_, decoded) = best_time(load_declaration)
+
+            print(f"{shape} x{scale}: {len(ast_file)} nodes, {len(names)} declarations")
+            print(f"  size          {len(data) / 1024:9.1f} KiB   pickle {len(pickled) / 1024:9.1f} KiB")
+            print(f"  dump          {dump_time * 1000:9.1f} ms    pickle {pickle_dump_time * 1000:9.1f} ms")
+            print(f"  load all      {load_time * 1000:9.1f} ms    pickle {pickle_load_time * 1000:9.1f} ms")
+            print(f"  load {name}: {declaration_time * 1000:.2f} ms, {decoded} nodes decoded")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,80 @@
+"""Cold one-shot compiles against requests to a warm compile server.
+
+Usage: python benchmarks/bench_server.py [files] [shape] [scale]
+
+Writes generated programs to a temporary directory, then times a fresh
+interpreter compiling them (imports, parser tables, compile), the client
+CLI on a warm server for changed and unchanged files, and raw request
+round trips on an open connection.
+"""
+import os
+import sys
+import time
+import tempfile
+import subprocess
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+sys.path.insert(0, SRC_DIR)
+
+from narya_client import connect
+from program_generator import generate
+
+ONE_SHOT = ("import sys; from narya_compiler import NaryaCompiler; compiler = NaryaCompiler()\n"
+            "for path in sys.argv[1:]: compiler.compile(open(path).read())")
+
+def timed_run(command, env):
+    start = time.perf_counter()
+    subprocess.run(command, env=env, check=True)
+    return time.perf_counter() - start
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    shape = sys.argv[2] if len(sys.argv) > 2 else "many_rings"
+    scale = float(sys.argv[3]) if len(sys.argv) > 3 else 0.2
+
+    with tempfile.TemporaryDirectory() as directory:
+        env = dict(os.environ, NARYA_CACHE_DIR=directory, PYTHONPATH=SRC_DIR)
+        paths = []
+        for seed in range(count):
+            path = os.path.join(directory, f"program_{seed}.narya")
+            with open(path, "w") as source_file:
+                source_file.write(generate(shape, seed, scale))
+            paths.append(path)
+        socket_path = os.path.join(directory, "server.sock")
+        client_command = [sys.executable, os.path.join(SRC_DIR, "narya_client.py"), "--socket", socket_path,
+                          "--no-start", "compile", *paths]
+
+        # The first run writes the parser table cache; time the second
+        timed_run([sys.executable, "-c", ONE_SHOT, *paths], env)
+        one_shot_time = timed_run([sys.executable, "-c", ONE_SHOT, *paths], env)
+
+        os.environ["NARYA_CACHE_DIR"] = directory
+        start = time.perf_counter()
+        client = connect(socket_path)
+        startup_time = time.perf_counter() - start
+        try:
+            first_time = timed_run(client_command, env)
+            unchanged_time = min(timed_run(client_command, env) for _ in range(5))
+
+            rounds = 50
+            start = time.perf_counter()
+            for _ in range(rounds):
+                results = client.call_batch("compile", [{"path": path} for path in paths])
+            request_time = (time.perf_counter() - start) / rounds
+            if not all(result["ok"] and result["cached"] for result in results):
+                print("Unchanged files were not all answered from the cache")
+                return 1
+        finally:
+            client.call("shutdown")
+            client.close()
+
+    print(f"{count} files, {shape} x{scale}")
+    print(f"one-shot interpreter     {one_shot_time * 1000:9.1f} ms")
+    print(f"server startup           {startup_time * 1000:9.1f} ms (once)")
+    print(f"client, first compile    {first_time * 1000:9.1f} ms")
+    print(f"client, unchanged files  {unchanged_time * 1000:9.1f} ms")
+    print(f"request, unchanged files {request_time * 1000:9.1f} ms on an open connection")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
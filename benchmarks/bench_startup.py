@@ -0,0 +1,68 @@
+"""Import time of the narya CLI subcommands, with a regression budget.
+
+Usage: python benchmarks/bench_startup.py [runs]
+
+Runs `python -X importtime src/narya.py <subcommand>` on the hello world
+example and sums the top-level imports. lark is needed by every
+subcommand, so the budget applies to what the CLI imports on top of a bare
+`import lark`. Fails if a subcommand goes over its budget or imports a
+module it should only load on request.
+"""
+import os
+import sys
+import time
+import subprocess
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+CLI = os.path.join(ROOT, "src", "narya.py")
+EXAMPLE = os.path.join(ROOT, "examples", "hello_world.narya")
+
+# Milliseconds of imports over `import lark`, per subcommand
+BUDGET_MS = {"compile": 40, "check": 45}
+# Only imported for --visualize, --stats profiling or parallel checks
+DEFERRED_MODULES = ("graphviz", "narya_ast_visualizer", "cProfile", "pstats", "multiprocessing")
+
+def import_times(arguments):
+    """(total import ms, wall ms, imported module names) of one interpreter run."""
+    start = time.perf_counter()
+    process = subprocess.run([sys.executable, "-X", "importtime", *arguments], capture_output=True, text=True)
+    wall = time.perf_counter() - start
+    total = 0
+    modules = set()
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        modules.add(name.strip())
+        # Nested imports are indented two spaces per level under their importer
+        if len(name) - len(name.lstrip()) == 1:
+            total += int(cumulative)
+    return total / 1000, wall * 1000, modules
+
+def best_of(arguments, runs):
+    results = [import_times(arguments) for _ in range(runs)]
+    return min(result[0] for result in results), min(result[1] for result in results), results[0][2]
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+
+    # Writes the parser table cache so the timed runs load it
+    subprocess.run([sys.executable, CLI, "compile", EXAMPLE], check=True)
+    baseline, baseline_wall, _ = best_of(["-c", "import lark"], runs)
+    print(f"import lark      {baseline:7.1f} ms imports {baseline_wall:7.1f} ms wall")
+
+    failed = False
+    for command, budget in BUDGET_MS.items():
+        total, wall, modules = best_of([CLI, command, EXAMPLE], runs)
+        overhead = total - baseline
+        loaded = [name for name in DEFERRED_MODULES if name in modules]
+        over = overhead > budget
+        print(f"narya {command:<10} {total:7.1f} ms imports {wall:7.1f} ms wall, "
+              f"+{overhead:.1f} ms over lark (budget {budget} ms){'  OVER BUDGET' if over else ''}")
+        if loaded:
+            print(f"  imported deferred modules: {', '.join(loaded)}")
+        failed |= over or bool(loaded)
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,52 @@
+"""Peak memory of compiling one large file whole versus ring by ring with compile_stream.
+
+Usage: python benchmarks/bench_stream.py [rings]
+"""
+import os
+import sys
+import gc
+import time
+import tempfile
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from narya_compiler import NaryaCompiler
+from bench_transform import generate_program
+
+def traced(function):
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = function()
+    seconds = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, seconds, peak
+
+def main():
+    rings = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    compiler = NaryaCompiler()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "large.narya")
+        with open(path, "w") as source_file:
+            source_file.write(generate_program(rings))
+        print(f"{rings} rings, {os.path.getsize(path) / 1024 / 1024:.2f} MiB of source")
+
+        def compile_whole():
+            with open(path, "r") as source_file:
+                return [ring.name for ring in compiler.compile(source_file.read()).statements]
+
+        def compile_streamed():
+            return [ring.name for ring, _ in compiler.compile_stream(path)]
+
+        whole, whole_seconds, whole_peak = traced(compile_whole)
+        streamed, streamed_seconds, streamed_peak = traced(compile_streamed)
+        assert whole == streamed
+
+        print(f"whole     {whole_seconds:7.2f} s  peak {whole_peak / 1024 / 1024:9.2f} MiB")
+        print(f"streamed  {streamed_seconds:7.2f} s  peak {streamed_peak / 1024 / 1024:9.2f} MiB")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""Per-stage compile benchmarks over generated program shapes, with JSON results.
+
+Usage:
+    python benchmarks/bench_suite.py [--output results.json] [--compare baseline.json]
+
+Each stage is timed on its own, best of --repeats: lexing with indentation
+tracking, parsing (which lexes again), transforming, and building the symbol
+table. Peak memory is measured for a whole compile. With --compare, stages
+slower than the baseline by more than --threshold are reported and the exit
+status is 1.
+"""
+import os
+import sys
+import gc
+import json
+import time
+import platform
+import argparse
+import subprocess
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import lark
+from narya_compiler import NaryaCompiler
+from narya_transformer import NaryaTransformer
+from narya_scope_builder import ScopeBuilder
+from program_generator import SHAPES, generate
+
+STAGES = ("lex", "parse", "transform", "symbol_table")
+
+def best_time(function, repeats):
+    best = float("inf")
+    result = None
+    for _ in range(repeats):
+        gc.collect()
+        start = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - start)
+    return result, best
+
+def peak_memory(function):
+    gc.collect()
+    tracemalloc.start()
+    function()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+def benchmark_shape(compiler, code, repeats):
+    code = compiler.preprocess(code)
+    stages = {}
+    tokens, stages["lex"] = best_time(lambda: list(compiler.parser.lex(code)), repeats)
+    parse_tree, stages["parse"] = best_time(lambda: compiler.parser.parse(code), repeats)
+    ast, stages["transform"] = best_time(lambda: NaryaTransformer().transform(parse_tree), repeats)
+    _, stages["symbol_table"] = best_time(lambda: ScopeBuilder().build(ast), repeats)
+    return {
+        "lines": code.count("\n"),
+        "bytes": len(code.encode("utf-8")),
+        "tokens": len(tokens),
+        "stages": stages,
+        # The parse stage includes its own lexing
+        "total": stages["parse"] + stages["transform"] + stages["symbol_table"],
+        "peak_memory_bytes": peak_memory(lambda: compiler.compile(code)),
+    }
+
+def metadata(args):
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "lark": lark.__version__,
+        "platform": platform.platform(),
+        "seed": args.seed,
+        "scale": args.scale,
+        "repeats": args.repeats,
+        "parser": args.parser,
+    }
+
+def compare(results, baseline, threshold):
+    """Print stage ratios against a baseline and return the regressions."""
+    regressions = []
+    for shape, result in results["results"].items():
+        previous = baseline["results"].get(shape)
+        if previous is None:
+            continue
+        for stage in STAGES + ("total",):
+            new = result["stages"].get(stage) if stage != "total" else result["total"]
+            old = previous["stages"].get(stage) if stage != "total" else previous["total"]
+            if not new or not old:
+                continue
+            ratio = new / old
+            flag = "  REGRESSION" if ratio > 1 + threshold else ""
+            print(f"{shape:18} {stage:13} {old * 1000:10.2f} ms -> {new * 1000:10.2f} ms  {ratio:5.2f}x{flag}")
+            if flag:
+                regressions.append((shape, stage, ratio))
+    return regressions
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("--shapes", nargs="+", choices=sorted(SHAPES), default=sorted(SHAPES))
+    arg_parser.add_argument("--seed", type=int, default=0)
+    arg_parser.add_argument("--scale", type=float, default=1.0, help="multiplier for the ring count of every shape")
+    arg_parser.add_argument("--repeats", type=int, default=3)
+    arg_parser.add_argument("--parser", choices=("lalr", "earley"), default="lalr")
+    arg_parser.add_argument("--output", help="write results as JSON to this file")
+    arg_parser.add_argument("--compare", help="JSON results of an earlier run to compare against")
+    arg_parser.add_argument("--threshold", type=float, default=0.10, help="allowed slowdown before a stage counts as a regression")
+    args = arg_parser.parse_args(argv)
+
+    compiler = NaryaCompiler(parser=args.parser)
+    results = {"metadata": metadata(args), "results": {}}
+    for shape in args.shapes:
+        result = benchmark_shape(compiler, generate(shape, args.seed, args.scale), args.repeats)
+        results["results"][shape] = result
+        stages = "  ".join(f"{stage} {seconds * 1000:8.1f} ms" for stage, seconds in result["stages"].items())
+        print(f"{shape:18} {result['lines']:7} lines  {stages}  peak {result['peak_memory_bytes'] / 1024 / 1024:7.1f} MiB")
+
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(results, output_file, indent=2)
+
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            baseline = json.load(baseline_file)
+        if compare(results, baseline, args.threshold):
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,109 @@
+"""Interpolated string rendering: precompiled templates against evaluating the parts.
+
+Usage: python benchmarks/bench_templates.py [iterations] [repeats]
+
+First renders one interpolated string in isolation three ways: re-scanning
+the AST parts on every evaluation, joining loaded parts as the VM did
+before templates, and rendering the precompiled Template. Then times a
+print-heavy Narya loop on every executor, with output discarded.
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from narya_ast import StringInterpolation
+from narya_compiler import NaryaCompiler
+from narya_bytecode import generate_bytecode
+from narya_templates import compile_template, to_text
+from narya_vm import NaryaVM
+from narya_python import compile_ast, run_code
+from tree_walker import TreeWalker
+
+PROGRAM = """ring Bench
+    group Person
+        num Age
+        text Name
+
+        public Person(num age, text name)
+            Age = age
+            Name = name
+
+        public text Greeting
+            return 'Hi, my name is .Name and I am .Age years old!'
+
+    do
+        Person cassie = Person(27, "Cassie")
+        bool done = false
+        for i = 0 -> {iterations}
+            print 'line .i of {iterations}: done is .done, ''quoted'' and ..dots'
+            print cassie.Greeting
+"""
+
+def best_time(function, repeats):
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def render_loop(node, iterations, repeats):
+    values = {"Name": "Cassie", "Age": 27, "done": False}
+    template = compile_template(node)
+    # What the VM has on its stack: every part before templates, only the slot values now
+    stack_parts = [values[part.identifier] if isinstance(part, StringInterpolation) else part.value
+                   for part in node.parts]
+    stack_values = [values[name] for name in template.names]
+
+    def rescan():
+        for _ in range(iterations):
+            "".join(to_text(values[part.identifier]) if isinstance(part, StringInterpolation) else part.value
+                    for part in node.parts)
+
+    def join_parts():
+        for _ in range(iterations):
+            "".join([part if part.__class__ is str else to_text(part) for part in stack_parts])
+
+    def render():
+        for _ in range(iterations):
+            template.render(*stack_values)
+
+    return {
+        "rescan parts": best_time(rescan, repeats),
+        "join parts": best_time(join_parts, repeats),
+        "template": best_time(render, repeats),
+    }
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+
+    compiler = NaryaCompiler()
+    node = compiler.compile("ring Main\n    text s = 'Hi, my name is .Name and I am .Age years old, done: .done!'\n")
+    node = node.statements[0].body.statements[0].initializer
+    print(f"render one template, {iterations} times, best of {repeats}")
+    for name, seconds in render_loop(node, iterations, repeats).items():
+        print(f"{name:14} {seconds * 1000:9.1f} ms")
+
+    ast = compiler.compile(PROGRAM.format(iterations=iterations))
+    program = generate_bytecode(ast)
+    code = compile_ast(ast)
+    outputs = [[], [], []]
+    TreeWalker(outputs[0].append).run(ast)
+    NaryaVM(program, outputs[1].append).run()
+    run_code(code, outputs[2].append)
+    if not outputs[0] == outputs[1] == outputs[2]:
+        print("Output mismatch between executors")
+        return 1
+
+    discard = lambda text: None
+    print(f"\nprint-heavy loop, {iterations} iterations, {2 * iterations} lines")
+    print(f"{'tree walker':14} {best_time(lambda: TreeWalker(discard).run(ast), repeats) * 1000:9.1f} ms")
+    print(f"{'bytecode vm':14} {best_time(lambda: NaryaVM(program, discard).run(), repeats) * 1000:9.1f} ms")
+    print(f"{'python':14} {best_time(lambda: run_code(code, discard), repeats) * 1000:9.1f} ms")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,63 @@
+"""Transform throughput of NaryaTransformer with tracing on and off.
+
+Usage: python benchmarks/bench_transform.py [rings] [repeats]
+"""
+import os
+import sys
+import time
+import logging
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from narya_compiler import NaryaCompiler
+import narya_transformer
+from narya_transformer import NaryaTransformer
+
+RING_TEMPLATE = """ring Ring{i}
+    num value{i} = {i} + 2 * (3 - {i})
+    text label{i} = 'ring .value{i} done'
+    do
+        value{i} = value{i} * 2 + 1
+        print label{i}
+    public num Scale{i}(num factor{i})
+        return value{i} * factor{i}
+"""
+
+def generate_program(rings):
+    return "\n".join(RING_TEMPLATE.format(i=i) for i in range(rings))
+
+def count_nodes(tree):
+    return sum(1 for _ in tree.iter_subtrees())
+
+def time_transform(parse_tree, trace, repeats):
+    best = float("inf")
+    for _ in range(repeats):
+        transformer = NaryaTransformer(trace=trace)
+        start = time.perf_counter()
+        transformer.transform(parse_tree)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main():
+    rings = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    compiler = NaryaCompiler()
+    parse_tree = compiler.parser.parse(compiler.preprocess(generate_program(rings)))
+    nodes = count_nodes(parse_tree)
+
+    with open(os.devnull, "w") as devnull:
+        narya_transformer.enable_tracing(devnull)
+        results = {
+            "tracing off": time_transform(parse_tree, False, repeats),
+            "tracing on": time_transform(parse_tree, True, repeats),
+        }
+        narya_transformer.logger.handlers.clear()
+        narya_transformer.logger.setLevel(logging.NOTSET)
+
+    print(f"{rings} rings, {nodes} parse tree nodes, best of {repeats}")
+    for name, seconds in results.items():
+        print(f"{name:12} {seconds * 1000:9.1f} ms  {nodes / seconds:12.0f} nodes/s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""Run time of the bytecode VM and the Python backend against a naive tree-walking interpreter.
+
+Usage: python benchmarks/bench_vm.py [size] [repeats]
+
+All three run the same program, covering loops, arithmetic, recursion, groups
+with methods, foreach and interpolated strings; their outputs are checked
+to match before timing. Compile time is not included.
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from narya_compiler import NaryaCompiler
+from narya_bytecode import generate_bytecode
+from narya_vm import NaryaVM
+from narya_python import compile_ast, run_code
+from tree_walker import TreeWalker
+
+PROGRAM = """ring Bench
+    num size = {size}
+
+    public num Fib(num n)
+        if n < 2
+            return n
+        return Fib(n - 1) + Fib(n - 2)
+
+    group Point
+        num X
+        num Y
+
+        public Point(num x, num y)
+            X = x
+            Y = y
+
+        public num Length
+            return X * X + Y * Y
+
+        public num Dot(Point other)
+            return X * other.X + Y * other.Y
+
+    do
+        num total = 0
+        for i = 0 -> size * 100
+            if i % 3 = 0
+                skip
+            total = total + i * 2 - 1
+        print total
+
+        print Fib(18)
+
+        Point origin = Point(1, 2)
+        *List(Point) points = origin, Point(0, 0)
+        for i = 0 -> size * 10
+            points.Add(Point(i, size - i))
+        num dots = 0
+        foreach point in points
+            dots = dots + point.Dot(origin) + point.Length
+        print dots
+
+        num jumps = 0
+        for i = 0 -> size
+            i = i + 2
+            jumps = jumps + 1
+        print jumps
+
+        num count = 0
+        while true
+            count = count + 1
+            if count >= size * 20
+                exit
+        text label = 'counted .count up to .size'
+        print label
+"""
+
+def best_time(function, repeats):
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+
+    ast = NaryaCompiler().compile(PROGRAM.format(size=size))
+    program = generate_bytecode(ast)
+    code = compile_ast(ast)
+
+    vm_output, python_output, walker_output = [], [], []
+    NaryaVM(program, vm_output.append).run()
+    run_code(code, python_output.append)
+    TreeWalker(walker_output.append).run(ast)
+    if not vm_output == python_output == walker_output:
+        print(f"Output mismatch:\n  vm:          {vm_output}\n  python:      {python_output}\n  tree walker: {walker_output}")
+        return 1
+
+    discard = lambda text: None
+    vm_time = best_time(lambda: NaryaVM(program, discard).run(), repeats)
+    python_time = best_time(lambda: run_code(code, discard), repeats)
+    walker_time = best_time(lambda: TreeWalker(discard).run(ast), repeats)
+    print(f"size {size}, best of {repeats}, output: {' | '.join(vm_output)}")
+    print(f"{'tree walker':12} {walker_time * 1000:9.1f} ms")
+    print(f"{'bytecode vm':12} {vm_time * 1000:9.1f} ms  {walker_time / vm_time:5.1f}x faster")
+    print(f"{'python':12} {python_time * 1000:9.1f} ms  {walker_time / python_time:5.1f}x faster")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
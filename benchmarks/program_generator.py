@@ -0,0 +1,126 @@
+"""Seeded generator of synthetic Narya programs for the benchmarks.
+
+The same seed and shape always produce the same program.
+"""
+import random
+
+# Named program shapes; values are ProgramGenerator.program arguments
+SHAPES = {
+    "many_rings": dict(rings=400, groups=1, fields=2, methods=2, statements=4, depth=1, expression_length=4),
+    "wide_groups": dict(rings=4, groups=10, fields=40, methods=20, statements=3, depth=1, expression_length=3),
+    "deep_nesting": dict(rings=20, groups=1, fields=1, methods=3, statements=2, depth=12, expression_length=3),
+    "long_expressions": dict(rings=20, groups=1, fields=2, methods=4, statements=6, depth=1, expression_length=60),
+}
+
+TYPES = ("num", "int", "text", "bool", "float")
+ARITHMETIC_OPERATORS = ("+", "-", "*", "/", "%")
+COMPARISON_OPERATORS = ("<", ">", "<=", ">=", "!=")
+INDENT = "    "
+
+class ProgramGenerator:
+    def __init__(self, seed=0):
+        self.random = random.Random(seed)
+        self.counter = 0
+
+    def name(self, prefix):
+        self.counter += 1
+        return f"{prefix}{self.counter}"
+
+    def operand(self, variables):
+        if variables and self.random.random() < 0.6:
+            return self.random.choice(variables)
+        return str(self.random.randint(0, 1000))
+
+    def expression(self, length, variables):
+        """An arithmetic expression with length operands and some parenthesized groups."""
+        if length <= 1:
+            return self.operand(variables)
+        if length > 3 and self.random.random() < 0.3:
+            split = self.random.randint(1, length - 1)
+            return f"({self.expression(split, variables)}) {self.random.choice(ARITHMETIC_OPERATORS)} {self.expression(length - split, variables)}"
+        return f"{self.operand(variables)} {self.random.choice(ARITHMETIC_OPERATORS)} {self.expression(length - 1, variables)}"
+
+    def condition(self, length, variables):
+        return f"{self.expression(max(1, length // 2), variables)} {self.random.choice(COMPARISON_OPERATORS)} {self.operand(variables)}"
+
+    def statements(self, level, count, depth, expression_length, variables):
+        indent = INDENT * level
+        variables = list(variables)
+        lines = []
+        for _ in range(count):
+            kind = self.random.random()
+            if kind < 0.5:
+                name = self.name("v")
+                lines.append(f"{indent}num {name} = {self.expression(expression_length, variables)}")
+                variables.append(name)
+            elif kind < 0.8 and variables:
+                lines.append(f"{indent}{self.random.choice(variables)} = {self.expression(expression_length, variables)}")
+            else:
+                lines.append(f"{indent}print {self.expression(expression_length, variables)}")
+        if depth > 1:
+            lines.extend(self.control_flow(level, count, depth - 1, expression_length, variables))
+        return lines
+
+    def control_flow(self, level, count, depth, expression_length, variables):
+        indent = INDENT * level
+        kind = self.random.randrange(4)
+        if kind == 0:
+            lines = [f"{indent}if {self.condition(expression_length, variables)}"]
+            lines.extend(self.statements(level + 1, count, depth, expression_length, variables))
+            lines.append(f"{indent}else")
+            lines.extend(self.statements(level + 1, count, 1, expression_length, variables))
+            return lines
+        if kind == 1:
+            lines = [f"{indent}while {self.condition(expression_length, variables)}"]
+        elif kind == 2:
+            counter = self.name("i")
+            variables = variables + [counter]
+            lines = [f"{indent}for {counter} = 0 -> {self.operand(variables)}"]
+        else:
+            item = self.name("item")
+            variables = variables + [item]
+            lines = [f"{indent}foreach {item} in items"]
+        lines.extend(self.statements(level + 1, count, depth, expression_length, variables))
+        return lines
+
+    def function(self, level, statements, depth, expression_length, fields):
+        indent = INDENT * level
+        parameters = [self.name("p") for _ in range(self.random.randint(0, 3))]
+        signature = ", ".join(f"{self.random.choice(TYPES)} {parameter}" for parameter in parameters)
+        lines = [f"{indent}public num {self.name('Method')}({signature})"]
+        variables = fields + parameters
+        lines.extend(self.statements(level + 1, statements, depth, expression_length, variables))
+        lines.append(f"{INDENT * (level + 1)}return {self.expression(expression_length, variables)}")
+        return lines
+
+    def group(self, level, fields, methods, statements, depth, expression_length):
+        indent = INDENT * level
+        lines = [f"{indent}group {self.name('Group')}"]
+        names = []
+        for _ in range(fields):
+            names.append(self.name("field"))
+            lines.append(f"{indent}{INDENT}{self.random.choice(TYPES)} {names[-1]} = {self.operand([])}")
+        for _ in range(methods):
+            lines.extend(self.function(level + 1, statements, depth, expression_length, names))
+        return lines
+
+    def ring(self, groups, fields, methods, statements, depth, expression_length):
+        lines = [f"ring {self.name('Ring')}", f"{INDENT}*List(num) items = 1, 2, 3"]
+        for _ in range(groups):
+            lines.extend(self.group(1, fields, methods, statements, depth, expression_length))
+        lines.append(f"{INDENT}do")
+        lines.extend(self.statements(2, statements, depth, expression_length, []))
+        return lines
+
+    def program(self, rings, groups=1, fields=2, methods=2, statements=4, depth=1, expression_length=4):
+        lines = []
+        for _ in range(rings):
+            lines.extend(self.ring(groups, fields, methods, statements, depth, expression_length))
+            lines.append("")
+        return "\n".join(lines)
+
+def generate(shape, seed=0, scale=1.0):
+    """The program for a named shape, with its ring count multiplied by scale."""
+    options = dict(SHAPES[shape])
+    options["rings"] = max(1, round(options["rings"] * scale))
+    return ProgramGenerator(seed).program(**options)
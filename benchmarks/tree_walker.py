@@ -0,0 +1,325 @@
+"""A naive tree-walking interpreter for Narya ASTs, the baseline for bench_vm.
+
+Names are looked up at run time through chains of dict environments and
+control flow unwinds with exceptions. It follows the same semantics as
+NaryaVM so the two can be checked against each other.
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from narya_ast import *
+from narya_bytecode import DEFAULT_VALUES
+from narya_vm import LIST_METHODS, SIZE_PROPERTIES, NaryaRuntimeError
+from narya_templates import to_text
+
+class Environment:
+    def __init__(self, parent=None, instance=None):
+        self.values = {}
+        self.parent = parent
+        self.instance = instance
+
+    def find(self, name):
+        environment = self
+        while environment is not None:
+            if name in environment.values:
+                return environment
+            if environment.instance is not None and environment.instance.method(name) is not None:
+                return environment
+            environment = environment.parent
+        raise NaryaRuntimeError(f"Unknown name '{name}'")
+
+class Function:
+    def __init__(self, node, environment):
+        self.node = node
+        self.environment = environment
+
+class Group:
+    def __init__(self, node, environment, parent):
+        self.node = node
+        self.environment = environment
+        self.parent = parent
+        self.name = node.name
+
+    def find(self, predicate):
+        group = self
+        while group is not None:
+            for statement in group.node.body.statements:
+                if predicate(statement):
+                    return statement
+            group = group.parent
+        return None
+
+class Instance(Environment):
+    def __init__(self, group):
+        super().__init__(group.environment, self)
+        self.group = group
+
+    def method(self, name):
+        node = self.group.find(lambda statement: isinstance(statement, FunctionDeclaration)
+                               and statement.name == name and statement.return_type is not None)
+        return Function(node, self) if node is not None else None
+
+class BoundMethod:
+    def __init__(self, function):
+        self.function = function
+
+class ReturnSignal(Exception):
+    def __init__(self, value):
+        self.value = value
+
+class SkipSignal(Exception):
+    pass
+
+class ExitSignal(Exception):
+    pass
+
+class TreeWalker:
+    def __init__(self, output=None):
+        self.output = output or print
+        self.rings = Environment()
+
+    def run(self, ast):
+        for ring in ast.statements:
+            environment = self.rings.values.get(ring.name)
+            if environment is None:
+                environment = self.rings.values[ring.name] = Environment(self.rings)
+            self.declare(ring.body.statements, environment)
+        for ring in ast.statements:
+            self.execute_block(ring.body.statements, self.rings.values[ring.name])
+
+    def declare(self, statements, environment):
+        for statement in statements:
+            if isinstance(statement, GroupDeclaration) and statement.name:
+                parent = environment.find(statement.parent).values[statement.parent] if statement.parent else None
+                environment.values[statement.name] = Group(statement, environment, parent)
+            elif isinstance(statement, FunctionDeclaration):
+                environment.values[statement.name] = Function(statement, environment)
+
+    def execute_block(self, statements, environment):
+        for statement in statements:
+            self.execute(statement, environment)
+
+    def execute(self, node, environment):
+        kind = type(node).__name__
+        if kind == "VariableDeclaration":
+            environment.values[node.name] = self.initial_value(node, environment)
+        elif kind == "BinaryOperation" and node.operator == "=" and isinstance(node.left, Variable):
+            value = self.evaluate(node.right, environment)
+            environment.find(node.left.name).values[node.left.name] = value
+        elif kind == "BinaryOperation" and node.operator == "=" and isinstance(node.left, MemberAccess):
+            target = self.evaluate(node.left.object, environment)
+            target.values[node.left.member] = self.evaluate(node.right, environment)
+        elif kind == "PrintStatement":
+            self.output(to_text(self.evaluate(node.expression, environment)))
+        elif kind == "ReturnStatement":
+            raise ReturnSignal(None if node.value is None else self.evaluate(node.value, environment))
+        elif kind == "SkipStatement":
+            raise SkipSignal()
+        elif kind == "ExitStatement":
+            raise ExitSignal()
+        elif kind == "IfStatement":
+            if self.evaluate(node.condition, environment):
+                self.execute_block(node.if_body.statements, Environment(environment))
+            elif node.else_body is not None:
+                self.execute_block(node.else_body.statements, Environment(environment))
+        elif kind == "WhileStatement":
+            while self.evaluate(node.condition, environment):
+                if not self.loop_body(node.body.statements, environment):
+                    break
+        elif kind == "DoWhileStatement":
+            while self.loop_body(node.body.statements, environment) and self.evaluate(node.condition, environment):
+                pass
+        elif kind == "ForStatement":
+            scope = Environment(environment)
+            scope.values[node.variable] = self.evaluate(node.start, environment)
+            end = self.evaluate(node.end, environment)
+            while scope.values[node.variable] < end:
+                if not self.loop_body(node.body.statements, scope):
+                    break
+                scope.values[node.variable] += 1
+        elif kind == "ForeachStatement":
+            iterable = self.evaluate(node.iterable, environment)
+            for item in range(iterable) if isinstance(iterable, int) else iterable:
+                scope = Environment(environment)
+                scope.values[node.variable] = item
+                if not self.loop_body(node.body.statements, scope):
+                    break
+        elif kind in ("DoBlock", "AnonymousScope"):
+            self.execute_block(node.body.statements, Environment(environment))
+        elif kind == "DangerousScope":
+            self.execute(node.body, environment)
+        elif kind in ("FunctionDeclaration", "GroupDeclaration", "UsingStatement", "WithStatement", "InStatement"):
+            pass
+        else:
+            self.evaluate(node, environment)
+
+    def loop_body(self, statements, environment):
+        """Run one iteration; False when the loop should stop."""
+        try:
+            self.execute_block(statements, Environment(environment))
+        except SkipSignal:
+            pass
+        except ExitSignal:
+            return False
+        return True
+
+    def initial_value(self, node, environment):
+        if node.initializer is not None:
+            return self.evaluate(node.initializer, environment)
+        if node.type is None or node.type.is_nullable:
+            return None
+        if isinstance(node.type, CollectionType):
+            return []
+        return DEFAULT_VALUES.get(node.type.base_type)
+
+    def evaluate(self, node, environment):
+        kind = type(node).__name__
+        if kind in ("Integer", "Float", "Boolean", "String"):
+            return node.value
+        if kind == "Variable":
+            return self.lookup(node.name, environment)
+        if kind == "BinaryOperation":
+            return self.binary(node, environment)
+        if kind == "UnaryOperation":
+            value = self.evaluate(node.operand, environment)
+            return -value if node.operator == "-" else not value
+        if kind == "Conditional":
+            if self.evaluate(node.condition, environment):
+                return self.evaluate(node.if_true, environment)
+            return self.evaluate(node.if_false, environment)
+        if kind == "InterpolatedString":
+            return "".join(to_text(self.lookup(part.identifier, environment)) if isinstance(part, StringInterpolation)
+                           else part.value for part in node.parts)
+        if kind == "CollectionLiteral":
+            if node.size is not None:
+                return [None] * node.size
+            return [self.evaluate(element, environment) for element in node.elements]
+        if kind == "MemberAccess":
+            return self.member(self.evaluate(node.object, environment), node.member)
+        if kind == "FunctionCall":
+            if isinstance(node.function, Variable):
+                callee = environment.find(node.function.name)
+                function = callee.values.get(node.function.name)
+                if function is None:
+                    function = callee.instance.method(node.function.name)
+            elif isinstance(node.function, MemberAccess):
+                target = self.evaluate(node.function.object, environment)
+                function = self.member(target, node.function.member, call=True)
+            else:
+                function = self.evaluate(node.function, environment)
+            return self.call(function, [self.evaluate(argument, environment) for argument in node.arguments])
+        if kind == "ObjectCreation":
+            group = self.lookup(node.group, environment)
+            return self.call(group, [self.evaluate(argument, environment) for argument in node.arguments or []])
+        raise NaryaRuntimeError(f"Unsupported expression {kind}")
+
+    def binary(self, node, environment):
+        operator = node.operator
+        left = self.evaluate(node.left, environment)
+        if operator in ("and", "&&"):
+            return left and self.evaluate(node.right, environment)
+        if operator in ("or", "||"):
+            return left or self.evaluate(node.right, environment)
+        right = self.evaluate(node.right, environment)
+        if operator == "+":
+            if isinstance(left, str) or isinstance(right, str):
+                return to_text(left) + to_text(right)
+            return left + right
+        if operator == "-":
+            return left - right
+        if operator == "*":
+            return left * right
+        if operator == "/":
+            return left / right
+        if operator == "%":
+            return left % right
+        if operator == "=":
+            return left == right
+        if operator == "!=":
+            return left != right
+        if operator == "<":
+            return left < right
+        if operator == "<=":
+            return left <= right
+        if operator == ">":
+            return left > right
+        if operator == ">=":
+            return left >= right
+        if operator == "^":
+            return left ** right
+        if operator == "<<":
+            return left << right
+        if operator == ">>":
+            return left >> right
+        return bool(left) != bool(right)
+
+    def lookup(self, name, environment):
+        found = environment.find(name)
+        if name in found.values:
+            return found.values[name]
+        return self.property(found.instance.method(name))
+
+    def property(self, function):
+        # Parameterless methods read like properties
+        if not function.node.parameters:
+            return self.call(function, [])
+        return BoundMethod(function)
+
+    def member(self, value, name, call=False):
+        if isinstance(value, list):
+            if name in SIZE_PROPERTIES:
+                return len(value)
+            return lambda *arguments: LIST_METHODS[name](value, *arguments)
+        if isinstance(value, str) and name in SIZE_PROPERTIES:
+            return len(value)
+        if isinstance(value, Instance):
+            if name in value.values:
+                return value.values[name]
+            method = value.method(name)
+            if method is None:
+                raise NaryaRuntimeError(f"{value.group.name} has no member '{name}'")
+            return BoundMethod(method) if call else self.property(method)
+        if isinstance(value, Environment) and name in value.values:
+            return value.values[name]
+        raise NaryaRuntimeError(f"{to_text(value)} has no member '{name}'")
+
+    def call(self, function, arguments):
+        if isinstance(function, BoundMethod):
+            function = function.function
+        if isinstance(function, Group):
+            return self.construct(function, arguments)
+        if not isinstance(function, Function):
+            return function(*arguments)
+        parameters = function.node.parameters
+        if len(arguments) != len(parameters):
+            raise NaryaRuntimeError(f"{function.node.name} takes {len(parameters)} arguments, {len(arguments)} given")
+        environment = Environment(function.environment)
+        for parameter, argument in zip(parameters, arguments):
+            environment.values[parameter.name] = argument
+        try:
+            self.execute_block(function.node.body.statements, environment)
+        except ReturnSignal as signal:
+            return signal.value
+        return None
+
+    def construct(self, group, arguments):
+        instance = Instance(group)
+        chain = []
+        current = group
+        while current is not None:
+            chain.append(current)
+            current = current.parent
+        for current in reversed(chain):
+            for statement in current.node.body.statements:
+                if isinstance(statement, VariableDeclaration):
+                    instance.values[statement.name] = self.initial_value(statement, instance)
+        constructor = group.find(lambda statement: isinstance(statement, FunctionDeclaration)
+                                 and statement.name in (current.name for current in chain)
+                                 and statement.return_type is None)
+        if constructor is not None and (arguments or not constructor.parameters):
+            self.call(Function(constructor, instance), arguments)
+        elif arguments:
+            raise NaryaRuntimeError(f"{group.name} has no constructor taking {len(arguments)} arguments")
+        return instance
@@ -0,0 +1,87 @@
+import os
+import sys
+import argparse
+
+# Only argparse is imported up front; each
+# subcommand imports the compiler modules it needs, graphviz is only loaded
+# for --visualize and transformer tracing only set up for --trace.
+
+def compile_paths(args, check):
+    from narya_compiler import NaryaCompiler
+    from narya_diagnostics import CompileErrors
+
+    compiler = NaryaCompiler(parser=args.parser, trace=args.trace, optimize=args.optimize,
+                             recover=args.parser == "lalr", check=check, check_workers=args.jobs)
+    failed = 0
+    for path in args.paths:
+        # Writing or drawing the AST can fail too, e.g. without graphviz's
+        # dot binary; like compile errors, that only fails its own file
+        try:
+            with open(path, "r") as source_file:
+                ast = compiler.compile(source_file.read())
+            if args.emit_ast:
+                from narya_serialization import write_ast
+                write_ast(ast, os.path.splitext(path)[0] + ".nast")
+            if args.visualize:
+                output_file = os.path.splitext(path)[0] + "_ast"
+                print(compiler.visualize_ast(ast, output_file, view=False, format=args.visualize))
+        except CompileErrors as e:
+            for diagnostic in e.diagnostics:
+                print(diagnostic.located(path), file=sys.stderr)
+            failed += 1
+        except Exception as e:
+            print(f"{path}: {type(e).__name__}: {e}", file=sys.stderr)
+            failed += 1
+    return 1 if failed else 0
+
+def show_dependencies(args):
+    from narya_dependencies import DependencyGraph, DependencyCycleError, RingBuilder
+
+    graph = DependencyGraph.from_paths(args.paths)
+    for diagnostic in graph.diagnostics:
+        print(f"{diagnostic.scope}: {diagnostic.message}", file=sys.stderr)
+    try:
+        waves = graph.schedule()
+    except DependencyCycleError as e:
+        for diagnostic in e.diagnostics:
+            print(diagnostic.message, file=sys.stderr)
+        return 1
+    length, path = graph.critical_path()
+    print(f"{len(graph.units)} rings in {len(waves)} waves, widest wave {max(map(len, waves), default=0)}")
+    print(f"critical path, {length} rings: {' -> '.join(path)}")
+    if not args.build:
+        return 1 if graph.diagnostics else 0
+    build = RingBuilder(args.jobs).build(args.paths)
+    for name, error in build.errors:
+        print(f"{name}: {error}", file=sys.stderr)
+    seconds, path = build.critical_path
+    print(f"built {len(build.compiled)} rings in {build.elapsed:.3f}s; critical path {seconds:.3f}s: {' -> '.join(path)}")
+    return 1 if build.errors else 0
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(prog="narya", description="Compile and check Narya programs")
+    commands = arg_parser.add_subparsers(dest="command", required=True)
+    for name, help_text in (("compile", "parse and build symbol tables"),
+                            ("check", "compile and run semantic analysis")):
+        command = commands.add_parser(name, help=help_text)
+        command.add_argument("paths", nargs="+", help="source files")
+        command.add_argument("--parser", choices=("lalr", "earley"), default="lalr")
+        command.add_argument("--optimize", action="store_true", help="run the AST optimization passes")
+        command.add_argument("--trace", action="store_true", help="log transformer calls to stderr")
+        command.add_argument("--visualize", nargs="?", const="png", choices=("png", "svg", "dot"),
+                             help="draw each AST next to its source (default format: png)")
+        command.add_argument("--emit-ast", action="store_true", help="write each AST next to its source as .nast")
+        command.set_defaults(jobs=1)
+        if name == "check":
+            command.add_argument("-j", "--jobs", type=int, default=1, help="worker processes for checking")
+    command = commands.add_parser("deps", help="show the ring dependency schedule, and optionally build by it")
+    command.add_argument("paths", nargs="+", help="source files or directories")
+    command.add_argument("--build", action="store_true", help="compile the rings in dependency order")
+    command.add_argument("-j", "--jobs", type=int, default=None, help="worker processes (default: CPU count)")
+    args = arg_parser.parse_args(argv)
+    if args.command == "deps":
+        return show_dependencies(args)
+    return compile_paths(args, check=args.command == "check")
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,28 +1,128 @@
-from lark.ast_utils import Ast, WithMeta, AsList
-from typing import Optional, List
+import weakref
+from typing import Optional, List, Tuple
+
+class Ast:
+    """Base class of every Narya AST node.
+
+    Nodes keep their fields in __slots__ instead of a per-instance __dict__.
+    Equality compares the fields structurally, and repr only names child nodes
+    so printing a node never walks the whole tree.
+    """
+    __slots__ = ()
+    _fields = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        fields = []
+        for klass in reversed(cls.__mro__):
+            for name in klass.__dict__.get('__slots__', ()):
+                # Slots such as __weakref__ are plumbing, not fields
+                if name not in fields and not name.startswith('__'):
+                    fields.append(name)
+        cls._fields = tuple(fields)
+
+    def iter_fields(self):
+        for name in self._fields:
+            yield name, getattr(self, name)
+
+    def __eq__(self, other):
+        if type(self) is not type(other):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self._fields)
+
+    __hash__ = None
+
+    def __repr__(self):
+        parts = []
+        for name, value in self.iter_fields():
+            if isinstance(value, Ast):
+                value = f"<{type(value).__name__}>"
+            elif isinstance(value, list):
+                value = f"[{len(value)} items]"
+            else:
+                value = repr(value)
+            parts.append(f"{name}={value}")
+        return f"{type(self).__name__}({', '.join(parts)})"
+
+# Canonical type instances, keyed by their class and fields. Structurally
+# equal types are the same object, so types compare by identity.
+_type_table = weakref.WeakValueDictionary()
+
+def _intern_type(cls, key, fields):
+    instance = _type_table.get(key)
+    if instance is None:
+        instance = object.__new__(cls)
+        for name, value in fields.items():
+            object.__setattr__(instance, name, value)
+        _type_table[key] = instance
+    return instance
 
 class TypeExpression(Ast):
+    __slots__ = ('base_type', 'parameters', 'is_nullable', 'is_mutable', '__weakref__')
     base_type: str
-    parameters: Optional[List['TypeExpression']] = None
-    is_nullable: bool = False
-    is_mutable: bool = False
+    parameters: Optional[Tuple['TypeExpression', ...]]
+    is_nullable: bool
+    is_mutable: bool
 
-    def __init__(self, base_type, parameters=None, is_nullable=False, is_mutable=False):
-        self.base_type = base_type
-        self.parameters = parameters
-        self.is_nullable = is_nullable
-        self.is_mutable = is_mutable
+    def __new__(cls, base_type, parameters=None, is_nullable=False, is_mutable=False):
+        if parameters is not None:
+            parameters = tuple(parameters)
+        key = (cls, base_type, parameters, is_nullable, is_mutable)
+        return _intern_type(cls, key, dict(base_type=base_type, parameters=parameters, is_nullable=is_nullable, is_mutable=is_mutable))
+
+    def with_flags(self, is_nullable=None, is_mutable=None):
+        """The interned variant of this type with the given flags changed."""
+        return TypeExpression(self.base_type, self.parameters,
+                              self.is_nullable if is_nullable is None else is_nullable,
+                              self.is_mutable if is_mutable is None else is_mutable)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    __eq__ = object.__eq__
+    __hash__ = object.__hash__
+
+    def __reduce__(self):
+        return (TypeExpression, (self.base_type, self.parameters, self.is_nullable, self.is_mutable))
+
+    def __str__(self):
+        text = self.base_type
+        if self.parameters:
+            text += f"({', '.join(str(parameter) for parameter in self.parameters)})"
+        return self._decorate(text)
+
+    def _decorate(self, text):
+        if self.is_nullable:
+            text += "?"
+        if self.is_mutable:
+            text = "*" + text
+        return text
 
 class CollectionType(TypeExpression):
+    __slots__ = ('value_type', 'key_type')
     value_type: 'TypeExpression'
-    key_type: Optional['TypeExpression'] = None
+    key_type: Optional['TypeExpression']
+
+    def __new__(cls, base_type, value_type, key_type=None, is_nullable=False, is_mutable=False):
+        key = (cls, base_type, value_type, key_type, is_nullable, is_mutable)
+        return _intern_type(cls, key, dict(base_type=base_type, parameters=None, is_nullable=is_nullable,
+                                           is_mutable=is_mutable, value_type=value_type, key_type=key_type))
+
+    def with_flags(self, is_nullable=None, is_mutable=None):
+        return CollectionType(self.base_type, self.value_type, self.key_type,
+                              self.is_nullable if is_nullable is None else is_nullable,
+                              self.is_mutable if is_mutable is None else is_mutable)
 
-    def __init__(self, base_type, value_type, key_type=None):
-        super().__init__(base_type)
-        self.value_type = value_type
-        self.key_type = key_type
+    def __reduce__(self):
+        return (CollectionType, (self.base_type, self.value_type, self.key_type, self.is_nullable, self.is_mutable))
+
+    def __str__(self):
+        if self.key_type is not None:
+            return self._decorate(f"{self.base_type}({self.key_type} = {self.value_type})")
+        return self._decorate(f"{self.base_type}({self.value_type})")
 
 class VariableDeclaration(Ast):
+    __slots__ = ('type', 'name', 'initializer', 'is_mutable')
     type: TypeExpression
     name: str
     initializer: Optional['Expression']
@@ -35,14 +135,19 @@ class VariableDeclaration(Ast):
         self.is_mutable = is_mutable
 
 class Expression(Ast):
-    pass
+    __slots__ = ()
 
 # Add other necessary classes here...
 
 class Program(Ast):
+    __slots__ = ('statements',)
     statements: List[Ast]
 
+    def __init__(self, statements: List[Ast]):
+        self.statements = statements
+
 class Ring(Ast):
+    __slots__ = ('name', 'body')
     name: str
     body: 'Suite'
         
@@ -51,9 +156,14 @@ class Ring(Ast):
         self.body = body
 
 class DoBlock(Ast):
+    __slots__ = ('body',)
     body: 'Suite'
 
-class Suite(Ast, AsList):
+    def __init__(self, body: 'Suite'):
+        self.body = body
+
+class Suite(Ast):
+    __slots__ = ('statements',)
     statements: List[Ast]
 
     def __init__(self, statements: List[Ast]):
@@ -61,51 +171,174 @@ class Suite(Ast, AsList):
 
 
 class PrintStatement(Ast):
+    __slots__ = ('expression',)
     expression: Expression
 
+    def __init__(self, expression: Expression):
+        self.expression = expression
+
 class Variable(Ast):
+    __slots__ = ('name',)
     name: str
 
+    def __init__(self, name: str):
+        self.name = name
+
 class String(Ast):
+    __slots__ = ('value',)
     value: str
 
+    def __init__(self, value: str):
+        self.value = value
+
 class InterpolatedString(Ast):
+    __slots__ = ('parts',)
     parts: List[Ast]
 
+    def __init__(self, parts: List[Ast]):
+        self.parts = parts
+
 class StringInterpolation(Ast):
+    __slots__ = ('identifier',)
     identifier: str
 
+    def __init__(self, identifier: str):
+        self.identifier = identifier
+
 class Boolean(Ast):
+    __slots__ = ('value',)
     value: bool
 
+    def __init__(self, value: bool):
+        self.value = value
+
 class Integer(Ast):
+    __slots__ = ('value',)
     value: int
 
+    def __init__(self, value: int):
+        self.value = value
+
 class Float(Ast):
+    __slots__ = ('value',)
     value: float
 
+    def __init__(self, value: float):
+        self.value = value
+
+class CollectionLiteral(Ast):
+    __slots__ = ('elements', 'size')
+    elements: List[Ast]
+    size: Optional[int]
+
+    def __init__(self, elements: List[Ast], size: Optional[int] = None):
+        self.elements = elements
+        self.size = size
+
+class DictionaryLiteral(Ast):
+    __slots__ = ('keys', 'values')
+    keys: List[str]
+    values: List[Ast]
+
+    def __init__(self, keys: List[str], values: List[Ast]):
+        self.keys = keys
+        self.values = values
+
 class BinaryOperation(Ast):
+    __slots__ = ('left', 'operator', 'right')
     left: Expression
     operator: str
     right: Expression
 
+    def __init__(self, left: Expression, operator: str, right: Expression):
+        self.left = left
+        self.operator = operator
+        self.right = right
+
+class UnaryOperation(Ast):
+    __slots__ = ('operator', 'operand')
+    operator: str
+    operand: Expression
+
+    def __init__(self, operator: str, operand: Expression):
+        self.operator = operator
+        self.operand = operand
+
+class Conditional(Ast):
+    __slots__ = ('condition', 'if_true', 'if_false')
+    condition: Expression
+    if_true: Expression
+    if_false: Expression
+
+    def __init__(self, condition: Expression, if_true: Expression, if_false: Expression):
+        self.condition = condition
+        self.if_true = if_true
+        self.if_false = if_false
+
+class MemberAccess(Ast):
+    __slots__ = ('object', 'member')
+    object: Expression
+    member: str
+
+    def __init__(self, object: Expression, member: str):
+        self.object = object
+        self.member = member
+
 class FunctionCall(Ast):
+    __slots__ = ('function', 'arguments')
     function: Expression
     arguments: List[Ast]
 
+    def __init__(self, function: Expression, arguments: List[Ast]):
+        self.function = function
+        self.arguments = arguments
+
+class ObjectCreation(Ast):
+    __slots__ = ('group', 'arguments')
+    group: str
+    arguments: Optional[List[Ast]]
+
+    def __init__(self, group: str, arguments: Optional[List[Ast]] = None):
+        self.group = group
+        self.arguments = arguments
+
+class Parameter(Ast):
+    __slots__ = ('type', 'name')
+    type: TypeExpression
+    name: str
+
+    def __init__(self, type: TypeExpression, name: str):
+        self.type = type
+        self.name = name
+
 class FunctionDeclaration(Ast):
+    __slots__ = ('name', 'parameters', 'return_type', 'body', 'access_modifier')
     name: str
     parameters: List[Ast]
     return_type: Optional[TypeExpression]
     body: 'Suite'
+    access_modifier: Optional[str]
     
-    def __init__(self, name: str, parameters: List[Ast], return_type: Optional[TypeExpression], body: 'Suite'):
+    def __init__(self, name: str, parameters: List[Ast], return_type: Optional[TypeExpression], body: 'Suite', access_modifier: Optional[str] = None):
         self.name = name
         self.parameters = parameters
         self.return_type = return_type
         self.body = body
+        self.access_modifier = access_modifier
+
+class AnonymousFunction(Ast):
+    __slots__ = ('parameters', 'return_type', 'body')
+    parameters: List[Ast]
+    return_type: Optional[TypeExpression]
+    body: 'Suite'
+
+    def __init__(self, parameters: List[Ast], return_type: Optional[TypeExpression], body: 'Suite'):
+        self.parameters = parameters
+        self.return_type = return_type
+        self.body = body
 
 class GroupDeclaration(Ast):
+    __slots__ = ('name', 'parent', 'body')
     name: str
     parent: Optional[str]
     body: 'Suite'
@@ -116,6 +349,7 @@ class GroupDeclaration(Ast):
         self.body = body
 
 class IfStatement(Ast):
+    __slots__ = ('condition', 'if_body', 'else_body')
     condition: Expression
     if_body: 'Suite'
     else_body: Optional['Suite']
@@ -125,7 +359,17 @@ class IfStatement(Ast):
         self.if_body = if_body
         self.else_body = else_body
 
+class DoWhileStatement(Ast):
+    __slots__ = ('body', 'condition')
+    body: 'Suite'
+    condition: Expression
+
+    def __init__(self, body: 'Suite', condition: Expression):
+        self.body = body
+        self.condition = condition
+
 class WhileStatement(Ast):
+    __slots__ = ('condition', 'body')
     condition: Expression
     body: 'Suite'
 
@@ -134,6 +378,7 @@ class WhileStatement(Ast):
         self.body = body
 
 class ForStatement(Ast):
+    __slots__ = ('variable', 'start', 'end', 'body')
     variable: str
     start: Expression
     end: Expression
@@ -146,6 +391,7 @@ class ForStatement(Ast):
         self.body = body
 
 class ForeachStatement(Ast):
+    __slots__ = ('variable', 'iterable', 'body')
     variable: str
     iterable: Expression
     body: 'Suite'
@@ -155,14 +401,83 @@ class ForeachStatement(Ast):
         self.iterable = iterable
         self.body = body
 
+class MatchCase(Ast):
+    __slots__ = ('pattern', 'body')
+    pattern: Optional[str]
+    body: 'Suite'
+
+    # A pattern of None is the `_` wildcard
+    def __init__(self, pattern: Optional[str], body: 'Suite'):
+        self.pattern = pattern
+        self.body = body
+
+class MatchStatement(Ast):
+    __slots__ = ('subject', 'cases')
+    subject: Expression
+    cases: List[MatchCase]
+
+    def __init__(self, subject: Expression, cases: List[MatchCase]):
+        self.subject = subject
+        self.cases = cases
+
 class AnonymousScope(Ast):
+    __slots__ = ('body',)
     body: 'Suite'
 
     def __init__(self, body: 'Suite'):
         self.body = body
 
 class DangerousScope(Ast):
+    __slots__ = ('body',)
     body: Ast
 
     def __init__(self, body: Ast):
-        self.body = body
\ No newline at end of file
+        self.body = body
+
+class ReturnStatement(Ast):
+    __slots__ = ('value',)
+    value: Optional[Expression]
+
+    def __init__(self, value: Optional[Expression] = None):
+        self.value = value
+
+class SkipStatement(Ast):
+    __slots__ = ()
+
+class ExitStatement(Ast):
+    __slots__ = ()
+
+class UsingStatement(Ast):
+    __slots__ = ('name',)
+    name: str
+
+    def __init__(self, name: str):
+        self.name = name
+
+class WithStatement(Ast):
+    __slots__ = ('qualified_name',)
+    qualified_name: str
+
+    def __init__(self, qualified_name: str):
+        self.qualified_name = qualified_name
+
+class InStatement(Ast):
+    __slots__ = ('qualified_name',)
+    qualified_name: str
+
+    def __init__(self, qualified_name: str):
+        self.qualified_name = qualified_name
+
+class ErrorNode(Ast):
+    """A statement the recovering parser skipped; body is the block that followed it, if any."""
+    __slots__ = ('message', 'line', 'column', 'body')
+    message: str
+    line: int
+    column: int
+    body: Optional['Suite']
+
+    def __init__(self, message: str, line: int, column: int, body: Optional['Suite'] = None):
+        self.message = message
+        self.line = line
+        self.column = column
+        self.body = body
@@ -1,14 +1,51 @@
+import sys
 import graphviz
+from concurrent.futures import ThreadPoolExecutor
 from narya_ast import *
+from narya_stats import count_nodes
 from lark import Tree, Token
 
+# 'dot' writes the graph source without running Graphviz
+OUTPUT_FORMATS = ('png', 'svg', 'dot')
+
+# Renders run one at a time off the calling thread; see visualize_in_background
+_render_executor = None
+
+def find_declaration(ast, qualified_name):
+    """Find the ring, group or function declared as e.g. Main.Person.Greeting."""
+    node = ast
+    for name in qualified_name.split('.'):
+        statements = node.statements if isinstance(node, (Program, Suite)) else node.body.statements
+        node = next((statement for statement in statements
+                     if isinstance(statement, (Ring, GroupDeclaration, FunctionDeclaration)) and statement.name == name), None)
+        if node is None:
+            raise ValueError(f"No declaration named '{qualified_name}'")
+    return node
+
 class NaryaASTVisualizer:
-    def __init__(self):
-        self.dot = graphviz.Digraph(comment='Narya AST', format='png')
-        self.dot.attr(rankdir='TB', size='12,20', dpi='900', bgcolor='black')
+    """Draws an AST with Graphviz.
+
+    max_depth and max_nodes keep large trees drawable: subtrees below
+    max_depth are collapsed into a single node showing their size, and once
+    max_nodes nodes are drawn the remaining children of each node are
+    replaced by one truncation marker.
+    """
+
+    def __init__(self, format='png', max_depth=None, max_nodes=None, dpi='900'):
+        if format not in OUTPUT_FORMATS:
+            raise ValueError(f"Unknown format '{format}', expected one of: {', '.join(OUTPUT_FORMATS)}")
+        self.format = format
+        self.max_depth = max_depth
+        self.max_nodes = max_nodes
+        self.dot = graphviz.Digraph(comment='Narya AST')
+        self.dot.attr(rankdir='TB', size='12,20', bgcolor='black')
+        if format == 'png':
+            self.dot.attr(dpi=dpi)
         self.dot.attr('node', shape='box', style='filled', color='white', fontcolor='black', fontname='Courier')
         self.dot.attr('edge', color='white')
         self.counter = 0
+        self.depth = 0
+        self.truncated = set()
 
     def add_node(self, label, color='lightblue'):
         node_id = f'node_{self.counter}'
@@ -16,7 +53,30 @@ class NaryaASTVisualizer:
         self.dot.node(node_id, label, fillcolor=color)
         return node_id
 
+    def add_child_node(self, label, parent_id, color):
+        node_id = self.add_node(label, color=color)
+        if parent_id:
+            self.dot.edge(parent_id, node_id)
+        return node_id
+
     def visit(self, node, parent_id=None):
+        if isinstance(node, Suite):
+            return self.visit_Suite(node, parent_id)
+        if self.max_nodes is not None and self.counter >= self.max_nodes:
+            if parent_id in self.truncated:
+                return None
+            self.truncated.add(parent_id)
+            return self.add_child_node('...', parent_id, color='lightgray')
+        if self.max_depth is not None and self.depth >= self.max_depth:
+            name = node.data.capitalize() if isinstance(node, Tree) else type(node).__name__
+            return self.add_child_node(f"{name}\\n+{count_nodes(node) - 1} nodes", parent_id, color='lightgray')
+        self.depth += 1
+        try:
+            return self.dispatch(node, parent_id)
+        finally:
+            self.depth -= 1
+
+    def dispatch(self, node, parent_id):
         if isinstance(node, Tree):
             return self.visit_Tree(node, parent_id)
         elif isinstance(node, Token):
@@ -64,7 +124,7 @@ class NaryaASTVisualizer:
         return node_id
 
     def visit_VariableDeclaration(self, node, parent_id):
-        node_id = self.add_node(f"Variable\\n{node.name}\\n{node.type.base_type}", color='lightcyan')
+        node_id = self.add_node(f"Variable\\n{node.name}\\n{node.type}", color='lightcyan')
         if parent_id:
             self.dot.edge(parent_id, node_id)
         if node.initializer:
@@ -83,8 +143,8 @@ class NaryaASTVisualizer:
         if isinstance(node, Tree):
             for child in node.children:
                 self.visit(child, node_id)
-        elif hasattr(node, '__dict__'):
-            for field, value in vars(node).items():
+        elif isinstance(node, Ast):
+            for field, value in node.iter_fields():
                 if isinstance(value, list):
                     for item in value:
                         if isinstance(item, (Ast, Tree, Token)):
@@ -93,17 +153,37 @@ class NaryaASTVisualizer:
                     self.visit(value, node_id)
         return node_id
 
-    def visualize(self, ast, output_file='narya_ast_visualization'):
-        start_id = self.add_node('Program')
-        self.visit(ast, start_id)
-        self.dot.render(output_file, view=True)
+    def visualize(self, ast, output_file='narya_ast_visualization', root=None, view=True):
+        """Draw the whole program, or only the declaration named by root, and return the output path."""
+        if root is None:
+            start_id = self.add_node('Program')
+            self.visit(ast, start_id)
+        else:
+            self.visit(find_declaration(ast, root))
+        if self.format == 'dot':
+            path = f"{output_file}.dot"
+            with open(path, 'w') as dot_file:
+                dot_file.write(self.dot.source)
+            return path
+        return self.dot.render(output_file, format=self.format, view=view)
 
-# Usage example
+def visualize_in_background(ast, output_file='narya_ast_visualization', root=None, view=False, **options):
+    """Visualize on a worker thread and return a Future of the output path.
+
+    The Graphviz renderer runs as a subprocess, so compilation can continue
+    while a large graph is laid out.
+    """
+    global _render_executor
+    if _render_executor is None:
+        _render_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='narya-visualizer')
+    visualizer = NaryaASTVisualizer(**options)
+    return _render_executor.submit(visualizer.visualize, ast, output_file, root, view)
+
+# Usage: python narya_ast_visualizer.py file.narya [Qualified.Name]
 if __name__ == "__main__":
-    from narya_compiler import parser, ast_transformer, narya_code
-    
-    parse_tree = parser.parse(narya_code)
-    ast = ast_transformer.transform(parse_tree)
-    
-    visualizer = NaryaASTVisualizer()
-    visualizer.visualize(ast)
\ No newline at end of file
+    from narya_compiler import NaryaCompiler
+
+    with open(sys.argv[1]) as source_file:
+        ast = NaryaCompiler().compile(source_file.read())
+    visualizer = NaryaASTVisualizer(format='dot', max_depth=8, max_nodes=2000)
+    print(visualizer.visualize(ast, root=sys.argv[2] if len(sys.argv) > 2 else None))
\ No newline at end of file
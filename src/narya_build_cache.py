@@ -0,0 +1,248 @@
+import os
+import pickle
+import hashlib
+from narya_compiler import PARSER_CACHE_DIR, frontend_version
+from narya_project import compile_files, find_sources
+from narya_symbol_table import ScopeType
+
+# Bump whenever narya_ast or the cached entry layout changes shape
+CACHE_FORMAT_VERSION = 3
+CACHE_MAGIC = b"NARYA-AST"
+CACHE_HEADER = CACHE_MAGIC + bytes([CACHE_FORMAT_VERSION])
+DEFAULT_BUILD_CACHE_DIR = os.path.join(PARSER_CACHE_DIR, "builds")
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+def cache_version():
+    """Version stored in the index and manifests; a changed frontend makes them stale."""
+    return (CACHE_FORMAT_VERSION, frontend_version().hex())
+
+def entry_key(source):
+    """Cache key of a file's compiled entry: its content, as compiled by this frontend."""
+    return content_hash(frontend_version() + source)
+
+def _write_atomically(path, data):
+    temporary_path = f"{path}.{os.getpid()}.tmp"
+    with open(temporary_path, "wb") as output:
+        output.write(data)
+    os.replace(temporary_path, path)
+
+def _load_versioned(path):
+    try:
+        with open(path, "rb") as source:
+            state = pickle.load(source)
+    except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError):
+        return None
+    if not isinstance(state, dict) or state.get("version") != cache_version():
+        return None
+    return state
+
+def file_exports(symbol_table):
+    """Qualified names a file makes visible to others: rings, groups and public functions."""
+    exports = {}
+    pending = [symbol_table.root]
+    while pending:
+        scope = pending.pop()
+        if scope.scope_type == ScopeType.RING:
+            exports[scope.qualified_name] = "ring"
+        for symbol in scope.symbols.values():
+            if symbol.kind == "group" or (symbol.kind == "function" and symbol.access_modifier == "public"):
+                qualified_name = f"{scope.qualified_name}.{symbol.name}" if scope.qualified_name else symbol.name
+                exports[qualified_name] = f"{symbol.kind} {symbol.type}"
+        pending.extend(scope.children)
+    return exports
+
+def file_imports(symbol_table):
+    """Qualified names a file refers to through using/with/in statements."""
+    imports = set()
+    pending = [symbol_table.root]
+    while pending:
+        scope = pending.pop()
+        imports.update(scope.imports)
+        pending.extend(scope.children)
+    return sorted(imports)
+
+def _related(name, other):
+    return name == other or name.startswith(other + ".") or other.startswith(name + ".")
+
+class CacheEntry:
+    def __init__(self, ast, exports, imports):
+        self.ast = ast
+        self.exports = exports
+        self.imports = imports
+
+class BuildCache:
+    """Content-addressed store of compiled files with a size limit and LRU eviction."""
+
+    def __init__(self, directory=DEFAULT_BUILD_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+        self.index_path = os.path.join(directory, "index.pickle")
+        state = _load_versioned(self.index_path)
+        # Content hash -> entry size, least recently used first
+        self.index = state["entries"] if state else {}
+        self.total_bytes = sum(self.index.values())
+
+    def entry_path(self, key):
+        return os.path.join(self.directory, key[:2], f"{key}.ast")
+
+    def get(self, key):
+        if key not in self.index:
+            return None
+        try:
+            with open(self.entry_path(key), "rb") as source:
+                data = source.read()
+            if not data.startswith(CACHE_HEADER):
+                raise ValueError("unknown cache entry format")
+            entry = pickle.loads(data[len(CACHE_HEADER):])
+        except (OSError, ValueError, EOFError, pickle.UnpicklingError, AttributeError, ImportError):
+            self._drop(key)
+            return None
+        self.touch(key)
+        return entry
+
+    def put(self, key, entry):
+        data = CACHE_HEADER + pickle.dumps(entry, pickle.HIGHEST_PROTOCOL)
+        path = self.entry_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        _write_atomically(path, data)
+        self.total_bytes += len(data) - self.index.pop(key, 0)
+        self.index[key] = len(data)
+        self._evict()
+
+    def touch(self, key):
+        """Mark an entry as recently used."""
+        if key in self.index:
+            self.index[key] = self.index.pop(key)
+
+    def _evict(self):
+        while self.total_bytes > self.max_bytes and len(self.index) > 1:
+            self._drop(next(iter(self.index)))
+
+    def _drop(self, key):
+        self.total_bytes -= self.index.pop(key, 0)
+        try:
+            os.remove(self.entry_path(key))
+        except OSError:
+            pass
+
+    def save(self):
+        _write_atomically(self.index_path, pickle.dumps({"version": cache_version(), "entries": self.index}))
+
+class FileState:
+    def __init__(self, mtime_ns, size, content_hash, exports, imports, error=None, diagnostics=()):
+        self.mtime_ns = mtime_ns
+        self.size = size
+        self.content_hash = content_hash
+        self.exports = exports
+        self.imports = imports
+        self.error = error
+        self.diagnostics = list(diagnostics)
+
+class BuildResult:
+    def __init__(self, cache, files, compiled, checked):
+        self.cache = cache
+        self.files = files
+        self.compiled = compiled
+        self.checked = checked
+
+    @property
+    def errors(self):
+        errors = []
+        for path, state in self.files.items():
+            if state.error:
+                errors.append((path, state.error))
+            errors.extend((path, diagnostic) for diagnostic in state.diagnostics)
+        return errors
+
+    def ast(self, path):
+        """Load a file's AST from the cache on demand."""
+        entry = self.cache.get(self.files[path].content_hash)
+        return entry.ast if entry else None
+
+class IncrementalBuilder:
+    """Rebuilds only changed files and re-checks the files that depend on them.
+
+    A per-project manifest remembers each file's stat data, content hash,
+    exports and imports, so unchanged files are neither read nor unpickled.
+    """
+
+    def __init__(self, cache=None, workers=None, parser="lalr"):
+        self.cache = cache or BuildCache()
+        self.workers = workers
+        self.parser = parser
+
+    def manifest_path(self, paths):
+        roots = "\0".join(sorted(os.path.abspath(path) for path in paths))
+        return os.path.join(self.cache.directory, f"manifest-{content_hash(roots.encode('utf-8'))[:32]}.pickle")
+
+    def build(self, paths):
+        manifest_path = self.manifest_path(paths)
+        state = _load_versioned(manifest_path)
+        previous_files = state["files"] if state else {}
+
+        files = {}
+        changed = []
+        to_compile = []
+        for path in find_sources(paths):
+            stat = os.stat(path)
+            previous = previous_files.get(path)
+            if previous and previous.mtime_ns == stat.st_mtime_ns and previous.size == stat.st_size:
+                files[path] = previous
+                self.cache.touch(previous.content_hash)
+                continue
+            with open(path, "rb") as source_file:
+                key = entry_key(source_file.read())
+            if previous and previous.content_hash == key and not previous.error:
+                files[path] = FileState(stat.st_mtime_ns, stat.st_size, key, previous.exports, previous.imports,
+                                        diagnostics=previous.diagnostics)
+                self.cache.touch(key)
+                continue
+            changed.append(path)
+            entry = self.cache.get(key)
+            if entry is None:
+                to_compile.append((path, stat, key))
+            else:
+                files[path] = FileState(stat.st_mtime_ns, stat.st_size, key, entry.exports, entry.imports)
+
+        results = compile_files([path for path, _, _ in to_compile], self.workers, self.parser)
+        for (path, stat, key), result in zip(to_compile, results):
+            if result.error is not None:
+                files[path] = FileState(stat.st_mtime_ns, stat.st_size, key, {}, [], error=result.error)
+                continue
+            entry = CacheEntry(result.ast, file_exports(result.symbol_table), file_imports(result.symbol_table))
+            self.cache.put(key, entry)
+            files[path] = FileState(stat.st_mtime_ns, stat.st_size, key, entry.exports, entry.imports)
+
+        changed_exports = set()
+        for path in changed + [path for path in previous_files if path not in files]:
+            old_exports = previous_files[path].exports if path in previous_files else {}
+            new_exports = files[path].exports if path in files else {}
+            for name in old_exports.keys() | new_exports.keys():
+                if old_exports.get(name) != new_exports.get(name):
+                    changed_exports.add(name)
+
+        checked = [path for path, file_state in files.items()
+                   if path in changed or any(_related(target, name) for target in file_state.imports for name in changed_exports)]
+        self.check(files, checked)
+
+        if changed or len(files) != len(previous_files):
+            _write_atomically(manifest_path, pickle.dumps({"version": cache_version(), "files": files}))
+        self.cache.save()
+        return BuildResult(self.cache, files, changed, checked)
+
+    def check(self, files, paths):
+        """Resolve the using/with/in targets of the given files against every file's exports."""
+        exported = set()
+        for file_state in files.values():
+            exported.update(file_state.exports)
+        for path in paths:
+            diagnostics = []
+            for target in files[path].imports:
+                parts = target.split(".")
+                if not any(".".join(parts[:length]) in exported for length in range(len(parts), 0, -1)):
+                    diagnostics.append(f"unresolved reference '{target}'")
+            files[path].diagnostics = diagnostics
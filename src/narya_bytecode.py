@@ -0,0 +1,697 @@
+from lark import Tree
+from narya_ast import *
+from narya_scope_builder import ScopeBuilder
+from narya_symbol_table import ScopeType
+from narya_templates import compile_template
+
+# Every instruction is two ints, an opcode and an argument, so jump targets
+# are plain indexes into CodeObject.code.
+LOAD_CONST = 0
+LOAD_LOCAL = 1
+STORE_LOCAL = 2
+LOAD_GLOBAL = 3
+STORE_GLOBAL = 4
+LOAD_FIELD = 5
+STORE_FIELD = 6
+LOAD_ATTR = 7
+STORE_ATTR = 8
+ADD = 9
+SUBTRACT = 10
+MULTIPLY = 11
+DIVIDE = 12
+MODULO = 13
+EQUAL = 14
+NOT_EQUAL = 15
+LESS = 16
+LESS_EQUAL = 17
+GREATER = 18
+GREATER_EQUAL = 19
+BINARY_OP = 20
+NEGATE = 21
+NOT = 22
+JUMP = 23
+JUMP_IF_FALSE = 24
+JUMP_IF_TRUE = 25
+JUMP_IF_FALSE_OR_POP = 26
+JUMP_IF_TRUE_OR_POP = 27
+CALL = 28
+CALL_METHOD = 29
+RETURN = 30
+POP = 31
+PRINT = 32
+BUILD_LIST = 33
+MAKE_ARRAY = 34
+FORMAT = 35
+GET_ITER = 36
+FOR_ITER = 37
+
+OPCODE_NAMES = {value: name for name, value in globals().items() if name.isupper() and isinstance(value, int)}
+
+# BINARY_OP arguments, for operators without an opcode of their own
+BINARY_OPERATORS = ("^", "<<", ">>", "^^", "~~")
+
+ARITHMETIC_OPCODES = {
+    "+": ADD, "-": SUBTRACT, "*": MULTIPLY, "/": DIVIDE, "%": MODULO,
+    "=": EQUAL, "!=": NOT_EQUAL, "<": LESS, "<=": LESS_EQUAL, ">": GREATER, ">=": GREATER_EQUAL,
+}
+SHORT_CIRCUIT_OPCODES = {"and": JUMP_IF_FALSE_OR_POP, "&&": JUMP_IF_FALSE_OR_POP,
+                         "or": JUMP_IF_TRUE_OR_POP, "||": JUMP_IF_TRUE_OR_POP}
+
+# CALL_METHOD packs the method name's constant index above the argument count
+ARGUMENT_BITS = 8
+
+DEFAULT_VALUES = {
+    "num": 0, "int": 0, "big int": 0, "uint": 0, "big uint": 0, "byte": 0,
+    "float": 0.0, "big float": 0.0, "text": "", "string": "", "char": "", "bool": False,
+}
+
+class CodeObject:
+    __slots__ = ('name', 'code', 'constants', 'argcount', 'nlocals')
+
+    def __init__(self, name, code, constants, argcount, nlocals):
+        self.name = name
+        self.code = code
+        self.constants = constants
+        # Methods count their receiver, which is always local 0
+        self.argcount = argcount
+        self.nlocals = nlocals
+
+class Function:
+    __slots__ = ('name', 'code', 'is_method')
+
+    def __init__(self, name, is_method=False):
+        self.name = name
+        self.code = None
+        self.is_method = is_method
+
+class Group:
+    """Runtime description of a group: its field layout, methods and initializers."""
+    __slots__ = ('name', 'parent', 'fields', 'field_index', 'methods', 'constructor', 'inits')
+
+    def __init__(self, name):
+        self.name = name
+        self.parent = None
+        self.fields = []
+        self.field_index = {}
+        self.methods = {}
+        self.constructor = None
+        # Field initializers, base group first
+        self.inits = []
+
+class Ring:
+    __slots__ = ('name', 'members')
+
+    def __init__(self, name):
+        self.name = name
+        # Name -> GlobalSlot, Function or Group
+        self.members = {}
+
+class GlobalSlot:
+    __slots__ = ('index',)
+
+    def __init__(self, index):
+        self.index = index
+
+class BytecodeProgram:
+    def __init__(self, rings, inits, globals_count):
+        # Rings by name; rings declared twice share one namespace
+        self.rings = rings
+        # Ring bodies in program order
+        self.inits = inits
+        self.globals_count = globals_count
+
+class ScopeRecorder(ScopeBuilder):
+    """ScopeBuilder that remembers the scopes each node opened."""
+
+    def __init__(self):
+        super().__init__()
+        self.scopes = {}
+
+    def visit(self, node):
+        if not isinstance(node, Ast):
+            super().visit(node)
+            return
+        scope = self.symbol_table.current_scope
+        count = len(scope.children)
+        super().visit(node)
+        if len(scope.children) > count:
+            self.scopes[id(node)] = scope.children[count:]
+
+def generate_bytecode(ast):
+    return BytecodeGenerator().generate(ast)
+
+def disassemble(code):
+    lines = []
+    for pc in range(0, len(code.code), 2):
+        opcode, argument = code.code[pc], code.code[pc + 1]
+        detail = ""
+        if opcode == LOAD_CONST:
+            detail = f" ({code.constants[argument]!r})"
+        elif opcode == CALL_METHOD:
+            detail = f" ({code.constants[argument >> ARGUMENT_BITS]}, {argument & ((1 << ARGUMENT_BITS) - 1)} args)"
+        elif opcode in (LOAD_ATTR, STORE_ATTR, FORMAT):
+            detail = f" ({code.constants[argument]})"
+        lines.append(f"{pc:6} {OPCODE_NAMES[opcode]:22} {argument}{detail}")
+    return "\n".join(lines)
+
+class BytecodeGenerator:
+    """Compiles a Narya AST into code objects for NaryaVM.
+
+    Names are resolved at compile time against the symbol table: locals get
+    frame slot indexes, ring variables global indexes and group fields
+    indexes in their instance layout. Only member access on values is looked
+    up at run time.
+    """
+
+    def generate(self, ast):
+        recorder = ScopeRecorder()
+        self.symbol_table = recorder.build(ast)
+        self.scopes = recorder.scopes
+        self.globals_count = 0
+        self.rings = {}
+        # Ring and group scopes -> the Ring or Group declared by them, and the
+        # functions, groups and ring variables declared directly in them
+        self.owners = {}
+        self.members = {}
+        self.declared = set()
+        self.functions = []
+        # Group -> (node, scope, enclosing scope)
+        self.groups = {}
+        self.laid_out = []
+
+        rings = []
+        for node in ast.statements:
+            scope, = self.scopes[id(node)]
+            ring = self.rings.setdefault(node.name, Ring(node.name))
+            self.owners[id(scope)] = ring
+            self.members[id(scope)] = ring.members
+            self.declare(node.body.statements, scope, ring.members, None)
+            rings.append((node, scope, ring))
+
+        in_progress = set()
+        for group in self.groups:
+            self.layout(group, in_progress)
+        for function, node, scope, group in self.functions:
+            function.code = CodeBuilder(self, node.name, scope, group).function(node)
+        for group in self.laid_out:
+            node, scope, _ = self.groups[group]
+            fields = [statement for statement in node.body.statements if isinstance(statement, VariableDeclaration)]
+            init = CodeBuilder(self, f"{group.name}.init", scope, group).fields(fields)
+            group.inits = (group.parent.inits if group.parent else []) + [init]
+        inits = []
+        for node, scope, ring in rings:
+            inits.append(CodeBuilder(self, node.name, scope, None).block(node.body.statements))
+        return BytecodeProgram(self.rings, inits, self.globals_count)
+
+    def declare(self, statements, scope, members, group):
+        """Create the functions, groups and ring variables declared directly in a scope."""
+        for statement in statements:
+            if isinstance(statement, (GroupDeclaration, FunctionDeclaration)):
+                self.declared.add(id(statement))
+            if isinstance(statement, GroupDeclaration) and not statement.name:
+                self.declare(statement.body.statements, scope, members, group)
+            elif isinstance(statement, GroupDeclaration):
+                group_scope, = self.scopes[id(statement)]
+                declared = Group(statement.name)
+                members[statement.name] = declared
+                self.owners[id(group_scope)] = declared
+                self.members[id(group_scope)] = {}
+                self.groups[declared] = (statement, group_scope, scope)
+                self.declare(statement.body.statements, group_scope, self.members[id(group_scope)], declared)
+            elif isinstance(statement, FunctionDeclaration):
+                function_scope, = self.scopes[id(statement)]
+                function = Function(statement.name, is_method=group is not None)
+                self.functions.append((function, statement, function_scope, group))
+                if group is None:
+                    members[statement.name] = function
+                elif statement.name == group.name and statement.return_type is None:
+                    group.constructor = function
+                else:
+                    group.methods[statement.name] = function
+            elif isinstance(statement, VariableDeclaration) and group is None and scope.scope_type == ScopeType.RING:
+                members[statement.name] = GlobalSlot(self.globals_count)
+                self.globals_count += 1
+
+    def layout(self, group, in_progress):
+        """Lay out a group's fields and methods after those of its parent."""
+        if group in self.laid_out:
+            return
+        if group in in_progress:
+            raise ValueError(f"Group '{group.name}' derives from itself")
+        in_progress.add(group)
+        node, _, enclosing = self.groups[group]
+        if node.parent:
+            parent = self.lookup_group(node.parent, enclosing)
+            if parent is None:
+                raise ValueError(f"Unknown parent group '{node.parent}' of '{group.name}'")
+            self.layout(parent, in_progress)
+            group.parent = parent
+            group.fields = list(parent.fields)
+            group.field_index = dict(parent.field_index)
+            group.methods = {**parent.methods, **group.methods}
+            group.constructor = group.constructor or parent.constructor
+        for statement in node.body.statements:
+            if isinstance(statement, VariableDeclaration) and statement.name not in group.field_index:
+                group.field_index[statement.name] = len(group.fields)
+                group.fields.append(statement.name)
+        self.laid_out.append(group)
+
+    def lookup_group(self, name, scope):
+        while scope is not None:
+            member = self.members.get(id(scope), {}).get(name)
+            if isinstance(member, Group):
+                return member
+            scope = scope.parent
+        return None
+
+class LoopLabels:
+    def __init__(self):
+        self.skips = []
+        self.exits = []
+
+class CodeBuilder:
+    """Emits the code object of one function, ring body or group initializer."""
+
+    def __init__(self, generator, name, scope, group):
+        self.generator = generator
+        self.name = name
+        self.scope = scope
+        self.group = group
+        self.code = []
+        self.constants = []
+        self.constant_index = {}
+        self.slots = {}
+        self.nlocals = 1 if group is not None else 0
+        self.loops = []
+
+    # Emission
+
+    def emit(self, opcode, argument=0):
+        self.code.extend((opcode, argument))
+        return len(self.code) - 2
+
+    def patch(self, position, target=None):
+        self.code[position + 1] = len(self.code) if target is None else target
+
+    def constant(self, value):
+        # Keyed by type too, so 1, 1.0 and True stay distinct
+        key = (type(value), value) if isinstance(value, (int, float, str, bool, type(None))) else (type(value), id(value))
+        index = self.constant_index.get(key)
+        if index is None:
+            index = self.constant_index[key] = len(self.constants)
+            self.constants.append(value)
+        return index
+
+    def new_slot(self):
+        self.nlocals += 1
+        return self.nlocals - 1
+
+    def finish(self, argcount):
+        self.emit(LOAD_CONST, self.constant(None))
+        self.emit(RETURN)
+        return CodeObject(self.name, self.code, self.constants, argcount, self.nlocals)
+
+    # Code units
+
+    def function(self, node):
+        for parameter in node.parameters:
+            self.slots[id(self.scope.symbols[parameter.name])] = self.new_slot()
+        argcount = self.nlocals
+        self.statements(node.body.statements)
+        return self.finish(argcount)
+
+    def fields(self, declarations):
+        for declaration in declarations:
+            self.initial_value(declaration)
+            self.emit(STORE_FIELD, self.group.field_index[declaration.name])
+        return self.finish(1)
+
+    def block(self, statements):
+        self.statements(statements)
+        return self.finish(0)
+
+    # Names
+
+    def resolve(self, name):
+        """Where a name lives: ('local', slot), ('global', index), ('field', index), ('method', name) or ('value', object)."""
+        scope = self.scope
+        while scope is not None:
+            owner = self.generator.owners.get(id(scope))
+            if owner is not None:
+                if owner is self.group and name in owner.field_index:
+                    return 'field', owner.field_index[name]
+                if owner is self.group and name in owner.methods:
+                    return 'method', name
+                member = self.generator.members[id(scope)].get(name)
+                if isinstance(member, GlobalSlot):
+                    return 'global', member.index
+                if member is not None:
+                    return 'value', member
+            elif scope.scope_type != ScopeType.GLOBAL:
+                symbol = scope.symbols.get(name)
+                if symbol is not None:
+                    slot = self.slots.get(id(symbol))
+                    if slot is None:
+                        slot = self.slots[id(symbol)] = self.new_slot()
+                    return 'local', slot
+            scope = scope.parent
+        if name in self.generator.rings:
+            return 'value', self.generator.rings[name]
+        raise ValueError(f"Unknown name '{name}' in {self.name}")
+
+    def load_name(self, name):
+        kind, where = self.resolve(name)
+        if kind == 'local':
+            self.emit(LOAD_LOCAL, where)
+        elif kind == 'global':
+            self.emit(LOAD_GLOBAL, where)
+        elif kind == 'field':
+            self.emit(LOAD_FIELD, where)
+        elif kind == 'method':
+            self.emit(LOAD_LOCAL, 0)
+            self.emit(LOAD_ATTR, self.constant(where))
+        else:
+            self.emit(LOAD_CONST, self.constant(where))
+
+    def store_name(self, name):
+        kind, where = self.resolve(name)
+        if kind == 'local':
+            self.emit(STORE_LOCAL, where)
+        elif kind == 'global':
+            self.emit(STORE_GLOBAL, where)
+        elif kind == 'field':
+            self.emit(STORE_FIELD, where)
+        else:
+            raise ValueError(f"Cannot assign to '{name}' in {self.name}")
+
+    def enter(self, scope):
+        self.scope, previous = scope, self.scope
+        return previous
+
+    # Statements
+
+    def statements(self, statements):
+        for statement in statements:
+            self.statement(statement)
+
+    def statement(self, node):
+        if isinstance(node, (FunctionDeclaration, GroupDeclaration)):
+            # Declarations are compiled on their own
+            if id(node) not in self.generator.declared:
+                raise ValueError(f"Declarations are only supported in rings and groups, not in {self.name}")
+            if isinstance(node, GroupDeclaration) and not node.name:
+                self.statements(node.body.statements)
+            return
+        if node is None or isinstance(node, (UsingStatement, WithStatement, InStatement)):
+            return
+        if isinstance(node, Tree):
+            raise ValueError(f"Unsupported construct '{node.data}' in {self.name}")
+        method = getattr(self, f'statement_{type(node).__name__}', None)
+        if method is not None:
+            method(node)
+        else:
+            self.expression(node)
+            self.emit(POP)
+
+    def scoped_body(self, node, scope, statements):
+        previous = self.enter(scope)
+        self.statements(statements)
+        self.scope = previous
+
+    def statement_Suite(self, node):
+        self.statements(node.statements)
+
+    def statement_VariableDeclaration(self, node):
+        self.initial_value(node)
+        self.store_name(node.name)
+
+    def initial_value(self, node):
+        if node.initializer is not None:
+            self.expression(node.initializer)
+            return
+        type_expression = node.type
+        if type_expression is None or type_expression.is_nullable:
+            value = None
+        elif isinstance(type_expression, CollectionType):
+            self.emit(BUILD_LIST, 0)
+            return
+        else:
+            value = DEFAULT_VALUES.get(type_expression.base_type)
+        self.emit(LOAD_CONST, self.constant(value))
+
+    def statement_BinaryOperation(self, node):
+        # `name = value` as a statement is an assignment, elsewhere a comparison
+        if node.operator != "=" or not isinstance(node.left, (Variable, MemberAccess)):
+            self.expression(node)
+            self.emit(POP)
+        elif isinstance(node.left, Variable):
+            self.expression(node.right)
+            self.store_name(node.left.name)
+        else:
+            self.expression(node.left.object)
+            self.expression(node.right)
+            self.emit(STORE_ATTR, self.constant(node.left.member))
+
+    def statement_PrintStatement(self, node):
+        self.expression(node.expression)
+        self.emit(PRINT)
+
+    def statement_ReturnStatement(self, node):
+        if node.value is None:
+            self.emit(LOAD_CONST, self.constant(None))
+        else:
+            self.expression(node.value)
+        # RETURN drops the frame's stack, including iterators of enclosing foreach loops
+        self.emit(RETURN)
+
+    def statement_SkipStatement(self, node):
+        if not self.loops:
+            raise ValueError(f"'skip' outside a loop in {self.name}")
+        self.loops[-1].skips.append(self.emit(JUMP))
+
+    def statement_ExitStatement(self, node):
+        if not self.loops:
+            raise ValueError(f"'exit' outside a loop in {self.name}")
+        self.loops[-1].exits.append(self.emit(JUMP))
+
+    def loop(self):
+        labels = LoopLabels()
+        self.loops.append(labels)
+        return labels
+
+    def end_loop(self, skip_target, exit_target=None):
+        labels = self.loops.pop()
+        for position in labels.skips:
+            self.patch(position, skip_target)
+        for position in labels.exits:
+            self.patch(position, exit_target)
+
+    def statement_DoBlock(self, node):
+        scope, = self.generator.scopes[id(node)]
+        self.scoped_body(node, scope, node.body.statements)
+
+    def statement_DoWhileStatement(self, node):
+        scope, = self.generator.scopes[id(node)]
+        start = len(self.code)
+        self.loop()
+        self.scoped_body(node, scope, node.body.statements)
+        condition = len(self.code)
+        self.expression(node.condition)
+        self.emit(JUMP_IF_TRUE, start)
+        self.end_loop(condition)
+
+    def statement_WhileStatement(self, node):
+        scope, = self.generator.scopes[id(node)]
+        start = len(self.code)
+        self.expression(node.condition)
+        done = self.emit(JUMP_IF_FALSE)
+        self.loop()
+        self.scoped_body(node, scope, node.body.statements)
+        self.emit(JUMP, start)
+        self.patch(done)
+        self.end_loop(start)
+
+    def statement_IfStatement(self, node):
+        scopes = self.generator.scopes[id(node)]
+        self.expression(node.condition)
+        otherwise = self.emit(JUMP_IF_FALSE)
+        self.scoped_body(node, scopes[0], node.if_body.statements)
+        if node.else_body is None:
+            self.patch(otherwise)
+            return
+        done = self.emit(JUMP)
+        self.patch(otherwise)
+        self.scoped_body(node, scopes[1], node.else_body.statements)
+        self.patch(done)
+
+    def statement_ForStatement(self, node):
+        # `for i = a -> b` counts from a up to, but not including, b
+        scope, = self.generator.scopes[id(node)]
+        previous = self.enter(scope)
+        self.expression(node.start)
+        self.store_name(node.variable)
+        end = self.new_slot()
+        self.expression(node.end)
+        self.emit(STORE_LOCAL, end)
+        start = len(self.code)
+        self.load_name(node.variable)
+        self.emit(LOAD_LOCAL, end)
+        self.emit(LESS)
+        done = self.emit(JUMP_IF_FALSE)
+        self.loop()
+        self.statements(node.body.statements)
+        increment = len(self.code)
+        self.load_name(node.variable)
+        self.emit(LOAD_CONST, self.constant(1))
+        self.emit(ADD)
+        self.store_name(node.variable)
+        self.emit(JUMP, start)
+        self.patch(done)
+        self.end_loop(increment)
+        self.scope = previous
+
+    def statement_ForeachStatement(self, node):
+        scope, = self.generator.scopes[id(node)]
+        self.expression(node.iterable)
+        self.emit(GET_ITER)
+        previous = self.enter(scope)
+        start = self.emit(FOR_ITER)
+        self.store_name(node.variable)
+        self.loop()
+        self.statements(node.body.statements)
+        self.emit(JUMP, start)
+        exit_target = self.emit(POP)
+        self.patch(start)
+        self.end_loop(start, exit_target)
+        self.scope = previous
+
+    def statement_MatchStatement(self, node):
+        # Cases compare the subject against the value of their name, in order
+        subject = self.new_slot()
+        self.expression(node.subject)
+        self.emit(STORE_LOCAL, subject)
+        ends = []
+        for case, scope in zip(node.cases, self.generator.scopes.get(id(node), [])):
+            if case.pattern is None:
+                self.scoped_body(case, scope, case.body.statements)
+                break
+            self.emit(LOAD_LOCAL, subject)
+            self.load_name(case.pattern)
+            self.emit(EQUAL)
+            next_case = self.emit(JUMP_IF_FALSE)
+            self.scoped_body(case, scope, case.body.statements)
+            ends.append(self.emit(JUMP))
+            self.patch(next_case)
+        for position in ends:
+            self.patch(position)
+
+    def statement_AnonymousScope(self, node):
+        scope, = self.generator.scopes[id(node)]
+        self.scoped_body(node, scope, node.body.statements)
+
+    def statement_DangerousScope(self, node):
+        if isinstance(node.body, AnonymousScope):
+            scope, = self.generator.scopes[id(node)]
+            self.scoped_body(node, scope, node.body.body.statements)
+        else:
+            self.statement(node.body)
+
+    # Expressions
+
+    def expression(self, node):
+        if isinstance(node, Tree):
+            raise ValueError(f"Unsupported construct '{node.data}' in {self.name}")
+        method = getattr(self, f'expression_{type(node).__name__}', None)
+        if method is None:
+            raise ValueError(f"Unsupported expression {type(node).__name__} in {self.name}")
+        method(node)
+
+    def expression_Integer(self, node):
+        self.emit(LOAD_CONST, self.constant(node.value))
+
+    expression_Float = expression_Integer
+    expression_Boolean = expression_Integer
+    expression_String = expression_Integer
+
+    def expression_Variable(self, node):
+        self.load_name(node.name)
+
+    def expression_InterpolatedString(self, node):
+        template = compile_template(node)
+        if not template.names:
+            self.emit(LOAD_CONST, self.constant(template.segments[0]))
+            return
+        for name in template.names:
+            self.load_name(name)
+        self.emit(FORMAT, self.constant(template))
+
+    def expression_CollectionLiteral(self, node):
+        if node.size is not None:
+            self.emit(MAKE_ARRAY, node.size)
+            return
+        for element in node.elements:
+            self.expression(element)
+        self.emit(BUILD_LIST, len(node.elements))
+
+    def expression_BinaryOperation(self, node):
+        self.expression(node.left)
+        jump = SHORT_CIRCUIT_OPCODES.get(node.operator)
+        if jump is not None:
+            position = self.emit(jump)
+            self.expression(node.right)
+            self.patch(position)
+            return
+        self.expression(node.right)
+        opcode = ARITHMETIC_OPCODES.get(node.operator)
+        if opcode is not None:
+            self.emit(opcode)
+        else:
+            self.emit(BINARY_OP, BINARY_OPERATORS.index(node.operator))
+
+    def expression_UnaryOperation(self, node):
+        self.expression(node.operand)
+        self.emit(NEGATE if node.operator == "-" else NOT)
+
+    def expression_Conditional(self, node):
+        self.expression(node.condition)
+        otherwise = self.emit(JUMP_IF_FALSE)
+        self.expression(node.if_true)
+        done = self.emit(JUMP)
+        self.patch(otherwise)
+        self.expression(node.if_false)
+        self.patch(done)
+
+    def expression_MemberAccess(self, node):
+        self.expression(node.object)
+        self.emit(LOAD_ATTR, self.constant(node.member))
+
+    def arguments(self, arguments):
+        if len(arguments) >= 1 << ARGUMENT_BITS:
+            raise ValueError(f"Too many arguments in a call in {self.name}")
+        for argument in arguments:
+            self.expression(argument)
+        return len(arguments)
+
+    def expression_FunctionCall(self, node):
+        function = node.function
+        if isinstance(function, MemberAccess):
+            self.expression(function.object)
+            count = self.arguments(node.arguments)
+            self.emit(CALL_METHOD, self.constant(function.member) << ARGUMENT_BITS | count)
+            return
+        if isinstance(function, Variable):
+            kind, where = self.resolve(function.name)
+            if kind == 'method':
+                self.emit(LOAD_LOCAL, 0)
+                count = self.arguments(node.arguments)
+                self.emit(CALL_METHOD, self.constant(where) << ARGUMENT_BITS | count)
+                return
+        self.expression(function)
+        self.emit(CALL, self.arguments(node.arguments))
+
+    def expression_ObjectCreation(self, node):
+        kind, group = self.resolve(node.group)
+        if not isinstance(group, Group):
+            raise ValueError(f"'{node.group}' is not a group in {self.name}")
+        self.emit(LOAD_CONST, self.constant(group))
+        self.emit(CALL, self.arguments(node.arguments or []))
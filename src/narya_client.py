@@ -0,0 +1,109 @@
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import subprocess
+from narya_diagnostics import Diagnostic
+
+# Kept free of lark and the compiler modules (narya_diagnostics imports nothing) so the client starts in milliseconds
+DEFAULT_SOCKET_PATH = os.path.join(os.environ.get("NARYA_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "narya")),
+                                   "server.sock")
+SERVER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "narya_server.py")
+START_TIMEOUT = 30.0
+
+class ServerError(Exception):
+    def __init__(self, error):
+        self.code = error.get("code")
+        super().__init__(error.get("message"))
+
+class NaryaClient:
+    """A connection to a running narya_server, one JSON-RPC request per line."""
+
+    def __init__(self, socket_path=DEFAULT_SOCKET_PATH):
+        self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.socket.connect(socket_path)
+        self.stream = self.socket.makefile("rwb")
+        self.next_id = 0
+
+    def call(self, method, **params):
+        return self.call_batch(method, [params])[0]
+
+    def call_batch(self, method, params_list):
+        """Send one request per params dict as a single batch; the server runs them concurrently."""
+        requests = []
+        for params in params_list:
+            self.next_id += 1
+            requests.append({"jsonrpc": "2.0", "id": self.next_id, "method": method, "params": params})
+        self.stream.write(json.dumps(requests).encode("utf-8") + b"\n")
+        self.stream.flush()
+        line = self.stream.readline()
+        if not line:
+            raise ConnectionError("Server closed the connection")
+        responses = {response["id"]: response for response in json.loads(line)}
+        results = []
+        for request in requests:
+            response = responses[request["id"]]
+            if "error" in response:
+                raise ServerError(response["error"])
+            results.append(response["result"])
+        return results
+
+    def close(self):
+        self.stream.close()
+        self.socket.close()
+
+def connect(socket_path=DEFAULT_SOCKET_PATH, start=True):
+    """Connect to the server, starting it in the background first if it is not running."""
+    try:
+        return NaryaClient(socket_path)
+    except (FileNotFoundError, ConnectionRefusedError):
+        if not start:
+            raise
+    os.makedirs(os.path.dirname(socket_path), exist_ok=True)
+    subprocess.Popen([sys.executable, SERVER_SCRIPT, "--socket", socket_path], start_new_session=True,
+                     stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + START_TIMEOUT
+    while True:
+        try:
+            return NaryaClient(socket_path)
+        except (FileNotFoundError, ConnectionRefusedError):
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.02)
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description="Compile through a running Narya compile server")
+    arg_parser.add_argument("--socket", default=DEFAULT_SOCKET_PATH)
+    arg_parser.add_argument("--no-start", action="store_true", help="fail instead of starting the server")
+    commands = arg_parser.add_subparsers(dest="command", required=True)
+    for name in ("compile", "check"):
+        command = commands.add_parser(name)
+        command.add_argument("paths", nargs="+")
+    commands.add_parser("stats")
+    commands.add_parser("shutdown")
+    args = arg_parser.parse_args(argv)
+
+    client = connect(args.socket, start=not args.no_start and args.command != "shutdown")
+    try:
+        if args.command in ("stats", "shutdown"):
+            print(json.dumps(client.call(args.command), indent=2))
+            return 0
+        failed = 0
+        results = client.call_batch(args.command, [{"path": os.path.abspath(path)} for path in args.paths])
+        for path, result in zip(args.paths, results):
+            for diagnostic in result["diagnostics"]:
+                print(Diagnostic(**diagnostic).located(path), file=sys.stderr)
+            if result["error"]:
+                print(f"{path}: {result['error']}", file=sys.stderr)
+            failed += not result["ok"]
+        return 1 if failed else 0
+    except ServerError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    finally:
+        client.close()
+
+if __name__ == "__main__":
+    sys.exit(main())
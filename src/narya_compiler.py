@@ -1,75 +1,252 @@
 import os
+import re
 import sys
+import mmap
+import hashlib
+from contextlib import nullcontext
+import lark
 from lark import Lark
-from narya_transformer import NaryaTransformer
-from narya_ast_visualizer import NaryaASTVisualizer
+from lark.lexer import LexerThread
+from lark.parser_frontends import PostLexConnector
+from lark.exceptions import UnexpectedInput
+from narya_indenter import NaryaIndenter
+from narya_transformer import NaryaTransformer, enable_tracing
+from narya_scope_builder import ScopeBuilder
+from narya_stats import CompileStats
+from narya_recovery import RecoveringParser
+from narya_diagnostics import CompileErrors
+
+PARSER_LEXERS = {
+    # The grammar is conflict-free, so LALR with a contextual lexer is the
+    # default. Earley stays available as a fallback; it uses the basic lexer so
+    # keywords are tokenized the same way and it builds the same trees.
+    "lalr": "contextual",
+    "earley": "basic",
+}
+
+PARSER_CACHE_DIR = os.environ.get("NARYA_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "narya"))
+
+# Parsers shared by every NaryaCompiler in this process, keyed by parser type
+_shared_parsers = {}
+
+# Sources that decide what a default NaryaCompiler builds from a given input
+FRONTEND_FILES = ("narya_grammar.lark", "narya_indenter.py", "narya_transformer.py", "narya_ast.py",
+                  "narya_scope_builder.py", "narya_symbol_table.py", "narya_compiler.py")
+_frontend_version = None
+
+# A top-level ring header; rings are the only statements allowed at column 0
+RING_BOUNDARY = re.compile(rb"^ring[ \t]", re.MULTILINE)
+
+def iter_ring_sources(path):
+    """Yield (first line number, source) for each top-level ring of a file.
+
+    The file is memory-mapped and scanned for ring headers, so only one ring's
+    source is decoded at a time.
+    """
+    with open(path, "rb") as source_file:
+        if os.fstat(source_file.fileno()).st_size == 0:
+            return
+        with mmap.mmap(source_file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            line = 1
+            start = 0
+            for match in RING_BOUNDARY.finditer(data):
+                if match.start() > start:
+                    chunk = data[start:match.start()]
+                    if chunk.strip():
+                        yield line, chunk.decode("utf-8")
+                    line += chunk.count(b"\n")
+                    start = match.start()
+            chunk = data[start:]
+            if chunk.strip():
+                yield line, chunk.decode("utf-8")
+
+def frontend_version():
+    """A digest of the frontend's sources, so caches of what it compiles go stale when it changes."""
+    global _frontend_version
+    if _frontend_version is None:
+        script_dir = os.path.dirname(os.path.abspath(__file__))
+        digest = hashlib.sha256()
+        for name in FRONTEND_FILES:
+            with open(os.path.join(script_dir, name), "rb") as source_file:
+                digest.update(source_file.read())
+        _frontend_version = digest.digest()
+    return _frontend_version
+
+def parser_cache_path(grammar, options):
+    """Path of the serialized parser tables for this grammar, options and Lark version."""
+    key = grammar + repr(sorted(options.items())) + lark.__version__
+    digest = hashlib.sha256(key.encode("utf-8")).hexdigest()
+    return os.path.join(PARSER_CACHE_DIR, f"narya_parser_{digest[:32]}.cache")
 
 class NaryaCompiler:
-    def __init__(self):
+    def __init__(self, parser="lalr", cache=True, trace=False, stats=False, profiler=None, optimize=False,
+                 check=False, check_workers=1, recover=False):
+        if parser not in PARSER_LEXERS:
+            raise ValueError(f"Unknown parser '{parser}', expected one of: {', '.join(PARSER_LEXERS)}")
+        if recover and parser != "lalr":
+            raise ValueError("Error recovery needs the lalr parser")
+        self.parser_type = parser
+        self.use_cache = cache
         self.parser = self.create_parser()
-        self.transformer = NaryaTransformer()
+        if trace:
+            enable_tracing()
+        self.transformer = NaryaTransformer(trace=trace, recover=recover)
+        self.symbol_table = None
+        # CompileStats of the last compile when stats is on; see compile_with_stats
+        self.collect_stats = stats
+        self.profiler = profiler
+        self.stats = None
+        # optimize is True for the default passes, or a configured PassManager
+        if optimize is True:
+            from narya_optimizer import PassManager
+            optimize = PassManager()
+        self.optimizer = optimize or None
+        # Semantic analysis of the last compile when check is on; see narya_semantic
+        self.check = check
+        self.check_workers = check_workers
+        # With recover, syntax errors are collected into diagnostics and raised
+        # together as CompileErrors once the whole input has been parsed
+        self.recover = recover
+        self.diagnostics = []
 
     def create_parser(self):
+        if not self.use_cache:
+            return self.build_parser()
+        if self.parser_type not in _shared_parsers:
+            _shared_parsers[self.parser_type] = self.build_parser()
+        return _shared_parsers[self.parser_type]
+
+    def build_parser(self):
         script_dir = os.path.dirname(os.path.abspath(__file__))
         grammar_path = os.path.join(script_dir, "narya_grammar.lark")
         with open(grammar_path, "r") as grammar_file:
             narya_grammar = grammar_file.read()
-        return Lark(narya_grammar, start="start", parser="earley")
+        options = dict(start="start", parser=self.parser_type, lexer=PARSER_LEXERS[self.parser_type])
+        # Lark can only serialize LALR tables; Earley is rebuilt once per process
+        if self.use_cache and self.parser_type == "lalr":
+            try:
+                os.makedirs(PARSER_CACHE_DIR, exist_ok=True)
+                options["cache"] = parser_cache_path(narya_grammar, options)
+            except OSError:
+                pass
+        return Lark(narya_grammar, postlex=NaryaIndenter(), **options)
 
     def compile(self, code):
-        preprocessed_code = self.preprocess(code)
-        parse_tree = self.parser.parse(preprocessed_code)
-        ast = self.transformer.transform(parse_tree)
+        stats = CompileStats() if self.collect_stats else None
+        ast = self.run_phases(code, stats)
+        self.stats = stats
         return ast
 
+    def compile_with_stats(self, code):
+        """Compile with instrumentation on, returning the AST and its CompileStats."""
+        stats = CompileStats()
+        ast = self.run_phases(code, stats)
+        self.stats = stats
+        return ast, stats
+
+    def run_phases(self, code, stats):
+        ast = self.parse(code, stats)
+        if self.optimizer is not None:
+            with self.phase(stats, "optimize"):
+                ast = self.optimizer.run(ast)
+            if stats is not None:
+                for pass_statistics in self.optimizer.statistics:
+                    key = f"{pass_statistics.name}_changes"
+                    stats.counters[key] = stats.counters.get(key, 0) + pass_statistics.changes
+        with self.phase(stats, "symbol_table"):
+            self.symbol_table = ScopeBuilder().build(ast)
+        if stats is not None:
+            stats.count_ast(ast)
+            stats.count_symbol_table(self.symbol_table)
+        if self.check:
+            from narya_semantic import SemanticError, analyze
+            with self.phase(stats, "check"):
+                self.diagnostics = analyze(ast, self.check_workers)
+            if stats is not None:
+                stats.counters["diagnostics"] = len(self.diagnostics)
+            if self.diagnostics:
+                raise SemanticError(self.diagnostics)
+        return ast
+
+    def parse(self, code, stats=None, first_line=1):
+        """Parse and transform code into an AST without building its symbol table.
+
+        first_line is the line code starts at in its file, e.g. for one ring
+        of it; errors and diagnostics carry file line numbers.
+        """
+        self.diagnostics = []
+        with self.phase(stats, "preprocess"):
+            preprocessed_code = self.preprocess(code)
+        with self.phase(stats, "parse"):
+            if self.recover:
+                parser = RecoveringParser(self.parser, first_line)
+                parse_tree = parser.parse(preprocessed_code)
+                self.diagnostics = parser.diagnostics
+            else:
+                parser = NaryaIndenter()
+                parser.first_line = first_line
+                try:
+                    parse_tree = self.parse_with(parser, preprocessed_code)
+                except UnexpectedInput as e:
+                    if e.line > 0:
+                        e.line += first_line - 1
+                    raise
+        if stats is not None:
+            stats.counters["tokens"] = parser.token_count
+            if parse_tree is not None:
+                stats.count_parse_tree(parse_tree)
+        with self.phase(stats, "transform"):
+            ast = self.transformer.transform(parse_tree, first_line) if parse_tree is not None else None
+        if self.transformer.diagnostics:
+            self.diagnostics = sorted(self.diagnostics + self.transformer.diagnostics,
+                                      key=lambda diagnostic: (diagnostic.line or 0, diagnostic.column or 0))
+        if self.diagnostics:
+            raise CompileErrors(self.diagnostics, ast)
+        return ast
+
+    def parse_with(self, indenter, text):
+        """Parse text with the parser's tables, lexing through the given indenter.
+
+        The parser is shared between compilers and threads, so its own
+        postlexer cannot hold a parse's line offset and token count.
+        """
+        frontend = self.parser.parser
+        lexer = PostLexConnector(frontend.lexer.lexer, indenter)
+        return frontend.parser.parse(LexerThread.from_text(lexer, text), "start")
+
+    def phase(self, stats, name):
+        return stats.phase(name, self.profiler) if stats is not None else nullcontext()
+
+    def compile_stream(self, path):
+        """Compile a file one top-level ring at a time, yielding (Ring, SymbolTable) pairs.
+
+        Only one ring's source, parse tree and AST are alive at a time, so
+        memory is bounded by the largest ring rather than the whole file.
+        """
+        for line, source in iter_ring_sources(path):
+            for ring in self.parse(source, first_line=line).statements:
+                yield ring, ScopeBuilder().build(ring)
+
     def preprocess(self, code):
-        preprocessor = IndentationPreprocessor(code)
-        return preprocessor.process()
-
-    def visualize_ast(self, ast):
-        visualizer = NaryaASTVisualizer()
-        visualizer.visualize(ast)
-
-class IndentationPreprocessor:
-    def __init__(self, text):
-        self.lines = text.splitlines()
-        self.indent_stack = [0]
-        self.processed_lines = []
-
-    def process(self):
-        for line_num, line in enumerate(self.lines):
-            stripped = line.rstrip()
-            
-            if stripped:  # Non-empty line
-                indent = len(line) - len(line.lstrip())
-                
-                if indent > self.indent_stack[-1]:
-                    self.processed_lines.append("INDENT")
-                    self.indent_stack.append(indent)
-                elif indent < self.indent_stack[-1]:
-                    while indent < self.indent_stack[-1]:
-                        self.processed_lines.append("DEDENT")
-                        self.indent_stack.pop()
-                    if indent != self.indent_stack[-1]:
-                        raise ValueError(f"Inconsistent indentation at line {line_num + 1}: {line}")
-                
-                self.processed_lines.append(stripped)
-                self.processed_lines.append("NEWLINE")
-            else:  # Empty line
-                self.processed_lines.append("NEWLINE")
-
-        # Add remaining DEDENTs
-        while len(self.indent_stack) > 1:
-            self.processed_lines.append("DEDENT")
-            self.indent_stack.pop()
-
-        result = " ".join(self.processed_lines)
-        print("Final preprocessed code:")
-        print(result)
-        return result
-    
+        # NaryaIndenter derives INDENT/DEDENT from NEWLINE tokens while lexing, so
+        # the source only needs a final line break to close every open block.
+        return code.rstrip() + "\n"
+
+    def visualize_ast(self, ast, output_file='narya_ast_visualization', root=None, view=True, background=False, **options):
+        """Draw the AST; options such as format, max_depth and max_nodes go to NaryaASTVisualizer.
+
+        With background=True the drawing happens on a worker thread and a
+        Future of the output path is returned instead.
+        """
+        # graphviz is only imported when something is drawn
+        from narya_ast_visualizer import NaryaASTVisualizer, visualize_in_background
+        if background:
+            return visualize_in_background(ast, output_file, root, view, **options)
+        visualizer = NaryaASTVisualizer(**options)
+        return visualizer.visualize(ast, output_file, root, view)
+
 if __name__ == "__main__":
-    compiler = NaryaCompiler()
+    compiler = NaryaCompiler(recover=True)
     
     # Sample Narya code
     narya_code = """
@@ -102,10 +279,14 @@ ring Main
         ast = compiler.compile(narya_code)
         print("Compilation successful!")
         print("\nSymbol Table:")
-        compiler.transformer.symbol_table.print_table()
+        compiler.symbol_table.print_table()
         
         compiler.visualize_ast(ast)
         print("AST visualization generated: narya_ast_visualization.png")
+    except CompileErrors as e:
+        print(f"Compilation failed with {len(e.diagnostics)} errors:")
+        for diagnostic in e.diagnostics:
+            print(f"  {diagnostic}")
     except Exception as e:
         print(f"Compilation error: {e}")
         import traceback
@@ -0,0 +1,322 @@
+import os
+import re
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, FIRST_COMPLETED, wait
+from narya_compiler import NaryaCompiler, iter_ring_sources
+from narya_scope_builder import ScopeBuilder
+from narya_project import find_sources
+from narya_build_cache import content_hash, file_imports
+from narya_symbol_table import ScopeType
+from narya_diagnostics import Diagnostic, CompileErrors
+
+RING_HEADER = re.compile(r"ring[ \t]+([A-Za-z_][A-Za-z0-9_]*)")
+# A using, with or in statement; they always stand on a line of their own
+IMPORT_STATEMENT = re.compile(r"^[ \t]+(?:using|with|in)[ \t]+([A-Za-z_][A-Za-z0-9_]*(?:\.[A-Za-z_][A-Za-z0-9_]*)*)[ \t]*$",
+                              re.MULTILINE)
+
+# One compiler per worker process, as in narya_project
+_worker_compiler = None
+
+class DependencyCycleError(CompileErrors):
+    pass
+
+class RingUnit:
+    """The sources of one ring, which may be split over several files, and the names they import."""
+
+    def __init__(self, name):
+        self.name = name
+        # (path, first line, source) of each part
+        self.sources = []
+        self.imports = set()
+
+    @property
+    def content_hash(self):
+        return content_hash("\0".join(source for _, _, source in self.sources).encode("utf-8"))
+
+def scan_rings(paths):
+    """Find every ring in the given files and directories, and what it imports, without parsing.
+
+    Imports are matched line by line, which is enough for dependency order;
+    the compile of each ring checks them properly.
+    """
+    units = {}
+    for path in find_sources(paths):
+        for line, source in iter_ring_sources(path):
+            header = RING_HEADER.match(source)
+            if header is None:
+                # Statements before the first ring; the compiler reports them
+                continue
+            unit = units.get(header.group(1))
+            if unit is None:
+                unit = units[header.group(1)] = RingUnit(header.group(1))
+            unit.sources.append((path, line, source))
+            unit.imports.update(IMPORT_STATEMENT.findall(source))
+    return units
+
+class DependencyGraph:
+    """Which rings depend on which, through their using, with and in statements.
+
+    A qualified name's first part is the ring it lives in; references to a
+    ring's own names add no edge. diagnostics lists references to rings that
+    do not exist.
+    """
+
+    def __init__(self, units):
+        self.units = units
+        self.dependencies = {name: set() for name in units}
+        self.dependents = {name: set() for name in units}
+        self.diagnostics = []
+        for unit in units.values():
+            for target in sorted(unit.imports):
+                ring = target.split(".", 1)[0]
+                if ring == unit.name:
+                    continue
+                if ring not in units:
+                    self.diagnostics.append(Diagnostic(f"Unknown ring '{ring}' in '{target}'", scope=unit.name))
+                    continue
+                self.dependencies[unit.name].add(ring)
+                self.dependents[ring].add(unit.name)
+
+    @classmethod
+    def from_paths(cls, paths):
+        return cls(scan_rings(paths))
+
+    def cycles(self):
+        """Each group of rings that depend on each other, as sorted name lists (Tarjan's algorithm)."""
+        index = {}
+        low = {}
+        stack = []
+        on_stack = set()
+        cycles = []
+        for root in self.units:
+            if root in index:
+                continue
+            # Iterative, so long dependency chains cannot overflow the stack
+            work = [(root, iter(sorted(self.dependencies[root])))]
+            index[root] = low[root] = len(index)
+            stack.append(root)
+            on_stack.add(root)
+            while work:
+                name, dependencies = work[-1]
+                dependency = next(dependencies, None)
+                if dependency is not None:
+                    if dependency not in index:
+                        index[dependency] = low[dependency] = len(index)
+                        stack.append(dependency)
+                        on_stack.add(dependency)
+                        work.append((dependency, iter(sorted(self.dependencies[dependency]))))
+                    elif dependency in on_stack:
+                        low[name] = min(low[name], index[dependency])
+                    continue
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    low[parent] = min(low[parent], low[name])
+                if low[name] == index[name]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack.discard(member)
+                        component.append(member)
+                        if member == name:
+                            break
+                    if len(component) > 1:
+                        cycles.append(sorted(component))
+        return cycles
+
+    def check_cycles(self):
+        cycles = self.cycles()
+        if cycles:
+            raise DependencyCycleError([Diagnostic(f"Dependency cycle between rings {', '.join(cycle)}", scope=cycle[0])
+                                        for cycle in cycles])
+
+    def schedule(self):
+        """Rings in waves: each wave only depends on earlier ones, so its rings can build concurrently."""
+        self.check_cycles()
+        waiting = {name: len(dependencies) for name, dependencies in self.dependencies.items()}
+        wave = sorted(name for name, count in waiting.items() if count == 0)
+        waves = []
+        while wave:
+            waves.append(wave)
+            following = []
+            for name in wave:
+                for dependent in self.dependents[name]:
+                    waiting[dependent] -= 1
+                    if waiting[dependent] == 0:
+                        following.append(dependent)
+            wave = sorted(following)
+        return waves
+
+    def critical_path(self, costs=None):
+        """(length, rings) of the most expensive dependency chain; costs default to 1 per ring.
+
+        No number of workers can build the project faster than this chain.
+        """
+        best = {}
+        previous = {}
+        for wave in self.schedule():
+            for name in wave:
+                before = max(self.dependencies[name], key=best.get, default=None)
+                best[name] = (best[before] if before is not None else 0) + (costs[name] if costs else 1)
+                previous[name] = before
+        end = max(best, key=best.get, default=None)
+        if end is None:
+            return 0, []
+        path = []
+        name = end
+        while name is not None:
+            path.append(name)
+            name = previous[name]
+        path.reverse()
+        return best[end], path
+
+    def invalidated(self, changed):
+        """The changed rings and every ring that depends on them, directly or not."""
+        invalid = set()
+        pending = [name for name in changed if name in self.units]
+        while pending:
+            name = pending.pop()
+            if name not in invalid:
+                invalid.add(name)
+                pending.extend(self.dependents[name])
+        return invalid
+
+def declared_names(symbol_table):
+    """Qualified names a using/with/in target can refer to: rings and whatever rings and groups declare."""
+    names = set()
+    pending = [symbol_table.root]
+    while pending:
+        scope = pending.pop()
+        if scope.scope_type in (ScopeType.RING, ScopeType.GROUP):
+            names.add(scope.qualified_name)
+            names.update(f"{scope.qualified_name}.{name}" for name in scope.symbols)
+        pending.extend(scope.children)
+    return names
+
+class RingResult:
+    def __init__(self, name, content_hash, names=(), imports=(), error=None, seconds=0.0):
+        self.name = name
+        self.content_hash = content_hash
+        self.names = set(names)
+        self.imports = list(imports)
+        self.error = error
+        self.seconds = seconds
+        self.diagnostics = []
+
+def compile_ring(name, sources, key):
+    """Parse every part of one ring and collect its declared names and imports; runs in a worker process."""
+    global _worker_compiler
+    if _worker_compiler is None:
+        _worker_compiler = NaryaCompiler()
+    start = time.perf_counter()
+    names = set()
+    imports = set()
+    for path, line, source in sources:
+        try:
+            symbol_table = ScopeBuilder().build(_worker_compiler.parse(source, first_line=line))
+        except Exception as e:
+            return RingResult(name, key, error=f"{path}: {type(e).__name__}: {e}", seconds=time.perf_counter() - start)
+        names.update(declared_names(symbol_table))
+        imports.update(file_imports(symbol_table))
+    return RingResult(name, key, names, sorted(imports), seconds=time.perf_counter() - start)
+
+class BuildReport:
+    def __init__(self, graph, waves, results, compiled, rechecked, elapsed):
+        self.graph = graph
+        self.waves = waves
+        self.results = results
+        self.compiled = compiled
+        self.rechecked = rechecked
+        self.elapsed = elapsed
+
+    @property
+    def critical_path(self):
+        """(seconds, rings) of the chain of compile times that bounds the build."""
+        return self.graph.critical_path({name: result.seconds for name, result in self.results.items()})
+
+    @property
+    def errors(self):
+        errors = []
+        for name, result in self.results.items():
+            if result.error:
+                errors.append((name, result.error))
+            errors.extend((name, diagnostic.message) for diagnostic in result.diagnostics)
+        return errors
+
+class RingBuilder:
+    """Builds rings in dependency order on a process pool, keeping results between builds.
+
+    A ring starts as soon as the rings it depends on are done, rather than
+    wave by wave. On a rebuild only rings whose source changed are compiled
+    again; rings that depend on them, directly or not, have their imports
+    checked again against the new declarations, and everything else is reused.
+    """
+
+    def __init__(self, workers=None):
+        self.workers = workers or os.cpu_count() or 1
+        self.results = {}
+
+    def build(self, paths):
+        start = time.perf_counter()
+        graph = DependencyGraph.from_paths(paths)
+        waves = graph.schedule()
+        keys = {name: unit.content_hash for name, unit in graph.units.items()}
+        changed = {name for name in graph.units
+                   if name not in self.results or self.results[name].content_hash != keys[name]}
+        removed = set(self.results) - set(graph.units)
+        stale = graph.invalidated(changed | {name for name, unit in graph.units.items()
+                                             if any(target.split(".", 1)[0] in removed for target in unit.imports)})
+        results = {name: result for name, result in self.results.items() if name in graph.units and name not in stale}
+
+        waiting = {name: len(graph.dependencies[name] & stale) for name in stale}
+        ready = [name for name in sorted(stale) if waiting[name] == 0]
+        running = {}
+        compiled = []
+        rechecked = []
+        executor = ProcessPoolExecutor(max_workers=self.workers) if self.workers > 1 and len(changed) > 1 else None
+        try:
+            while ready or running:
+                for name in ready:
+                    if name in changed:
+                        unit = graph.units[name]
+                        if executor is not None:
+                            future = executor.submit(compile_ring, name, unit.sources, keys[name])
+                        else:
+                            future = Future()
+                            future.set_result(compile_ring(name, unit.sources, keys[name]))
+                        compiled.append(name)
+                    else:
+                        future = Future()
+                        future.set_result(self.results[name])
+                        rechecked.append(name)
+                    running[future] = name
+                ready = []
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    result = results[name] = future.result()
+                    self.check_imports(result, results)
+                    for dependent in sorted(graph.dependents[name]):
+                        if dependent in waiting:
+                            waiting[dependent] -= 1
+                            if waiting[dependent] == 0:
+                                ready.append(dependent)
+        finally:
+            if executor is not None:
+                executor.shutdown()
+        self.results = results
+        return BuildReport(graph, waves, results, compiled, rechecked, time.perf_counter() - start)
+
+    def check_imports(self, result, results):
+        """Resolve a ring's using/with/in targets against the names declared by the rings they name."""
+        result.diagnostics = []
+        failed = set()
+        for target in result.imports:
+            ring = results.get(target.split(".", 1)[0])
+            if ring is not None and ring.error:
+                # Its names are unknown rather than missing; say so once per ring
+                if ring.name not in failed:
+                    failed.add(ring.name)
+                    result.diagnostics.append(Diagnostic(f"depends on failed ring '{ring.name}'", scope=result.name))
+            elif ring is None or target not in ring.names:
+                result.diagnostics.append(Diagnostic(f"unresolved reference '{target}'", scope=result.name))
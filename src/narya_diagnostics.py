@@ -0,0 +1,52 @@
+class Diagnostic:
+    """One problem found while compiling.
+
+    Syntax and indentation diagnostics carry a source span with 1-based
+    lines and columns; semantic ones name the ring, group or function they
+    are in instead, since AST nodes have no positions.
+    """
+    __slots__ = ('message', 'scope', 'line', 'column', 'end_line', 'end_column')
+
+    def __init__(self, message, scope=None, line=None, column=None, end_line=None, end_column=None):
+        self.message = message
+        self.scope = scope
+        self.line = line
+        self.column = column
+        self.end_line = line if end_line is None else end_line
+        self.end_column = column if end_column is None else end_column
+
+    def __eq__(self, other):
+        if not isinstance(other, Diagnostic):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    __hash__ = None
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def located(self, path):
+        """The diagnostic prefixed with the file it was found in."""
+        if self.line is not None:
+            return f"{path}:{self}"
+        return f"{path}: {self}"
+
+    def __str__(self):
+        if self.line is not None:
+            return f"{self.line}:{self.column}: {self.message}"
+        return f"{self.scope}: {self.message}"
+
+    def __repr__(self):
+        return f"Diagnostic({str(self)!r})"
+
+class CompileErrors(ValueError):
+    """Raised with every diagnostic of a compile; ast is the partial AST, if any."""
+
+    def __init__(self, diagnostics, ast=None):
+        super().__init__(diagnostics)
+        self.diagnostics = diagnostics
+        self.ast = ast
+
+    def __str__(self):
+        # Built when shown, so it matches diagnostics even if they were moved since
+        return "\n".join(str(diagnostic) for diagnostic in self.diagnostics)
@@ -0,0 +1,296 @@
+import re
+from bisect import bisect_right
+from itertools import islice
+from narya_ast import Ast, Ring, GroupDeclaration, FunctionDeclaration, Suite
+from narya_compiler import NaryaCompiler
+from narya_indenter import NaryaIndenter
+from narya_scope_builder import ScopeBuilder
+from narya_symbol_table import SymbolTable
+
+# Statements below the top level are reparsed inside a stand-in ring
+FRAGMENT_HEADER = "ring __Fragment\n"
+FRAGMENT_INDENT = "    "
+
+# Lines that continue the statement above them instead of starting a new one
+CONTINUATION_PATTERN = re.compile(r"\s*(else\b|\})|.*\?\s*repeat\s*$")
+
+def indentation(line):
+    prefix = line[:len(line) - len(line.lstrip(" \t"))]
+    return prefix.count(" ") + prefix.count("\t") * NaryaIndenter.tab_len
+
+def bracket_depth(line, depth=0):
+    """Bracket nesting after a line, ignoring brackets inside string literals."""
+    if "(" not in line and ")" not in line and "[" not in line and "]" not in line:
+        return depth
+    quote = None
+    for char in line:
+        if quote:
+            if char == quote:
+                quote = None
+        elif char in "\"'":
+            quote = char
+        elif char in "([":
+            depth += 1
+        elif char in ")]":
+            depth -= 1
+    return depth
+
+def outline_statements(lines, start, end):
+    """Split lines[start:end] into [start, end) line ranges, one per statement.
+
+    Statements begin at the indentation of the first non-blank line. Returns
+    None if the lines are not a sequence of whole statements at that level.
+    """
+    statements = []
+    base = None
+    depth = 0
+    for index in range(start, end):
+        line = lines[index]
+        if not line.strip():
+            continue
+        if depth == 0:
+            width = indentation(line)
+            if base is None:
+                if CONTINUATION_PATTERN.match(line):
+                    return None
+                base = width
+            if width < base:
+                return None
+            if width == base and not (statements and CONTINUATION_PATTERN.match(line)):
+                statements.append([index, index + 1])
+        statements[-1][1] = index + 1
+        depth = bracket_depth(line, depth)
+    return statements if depth == 0 else None
+
+def header_end(lines, start):
+    """Index of the first line after a declaration header, which may span bracketed lines."""
+    depth = bracket_depth(lines[start])
+    index = start + 1
+    while depth > 0 and index < len(lines):
+        depth = bracket_depth(lines[index], depth)
+        index += 1
+    return index
+
+def is_container(node):
+    """Declarations whose body statements are tracked, and reparsed, one by one."""
+    if isinstance(node, GroupDeclaration) and not node.name:
+        return False
+    return isinstance(node, (Ring, GroupDeclaration, FunctionDeclaration)) and isinstance(node.body, Suite)
+
+class Segment:
+    """The line range of one statement, with the AST node and the scopes it produced."""
+    __slots__ = ('start', 'end', 'indent', 'node', 'children', 'scope', 'scopes', 'symbols')
+
+    def __init__(self, start, end, indent, node):
+        self.start = start
+        self.end = end
+        self.indent = indent
+        self.node = node
+        self.children = []
+        # Scope of a container's body; the global scope for the document root
+        self.scope = None
+        # Scopes and symbols this statement added to the enclosing scope
+        self.scopes = []
+        self.symbols = []
+
+    def body(self):
+        return self.node.statements if self.scope.parent is None else self.node.body.statements
+
+    def shift(self, line, delta):
+        """Move the segments at or after line by delta lines, growing the ones that contain it."""
+        if self.end < line:
+            return
+        if self.start >= line:
+            self.start += delta
+        self.end += delta
+        for child in self.children:
+            child.shift(line, delta)
+
+class SegmentScopeBuilder(ScopeBuilder):
+    """ScopeBuilder that records which scopes and symbols each segment's node declares."""
+
+    def __init__(self, symbol_table, segments):
+        super().__init__(symbol_table)
+        self.segments = segments
+
+    def visit(self, node):
+        segment = self.segments.get(id(node)) if isinstance(node, Ast) else None
+        if segment is None:
+            super().visit(node)
+            return
+        scope = self.symbol_table.current_scope
+        symbol_count, scope_count = len(scope.symbols), len(scope.children)
+        super().visit(node)
+        segment.symbols = list(islice(reversed(scope.symbols), len(scope.symbols) - symbol_count))
+        segment.scopes = scope.children[scope_count:]
+        if is_container(node):
+            segment.scope = segment.scopes[0]
+
+class IncrementalDocument:
+    """An editor buffer whose AST and scope tree are kept up to date edit by edit.
+
+    Each edit reparses only the innermost statement enclosing it, found from
+    the indentation structure, and splices the new nodes and scopes into the
+    existing tree. When the edit changes the statement boundaries themselves
+    the enclosing declaration is reparsed instead, up to the whole document.
+    """
+
+    def __init__(self, code, compiler=None):
+        self.compiler = compiler or NaryaCompiler()
+        self.lines = code.splitlines(keepends=True)
+        self.ast = None
+        self.symbol_table = None
+        self.root = None
+        # Line range whose text failed to parse and has to be reparsed on the next edit
+        self.stale = None
+        self.reparse()
+
+    @property
+    def text(self):
+        return "".join(self.lines)
+
+    def reparse(self):
+        """Parse the whole document from scratch."""
+        self.stale = (0, len(self.lines))
+        ast = self.compiler.parse(self.text)
+        segments = {}
+        root = Segment(0, len(self.lines), -1, ast)
+        root.children = self.build_segments(outline_statements(self.lines, 0, len(self.lines)), ast.statements, segments)
+        symbol_table = SymbolTable()
+        root.scope = symbol_table.root
+        SegmentScopeBuilder(symbol_table, segments).build(ast)
+        self.ast, self.symbol_table, self.root, self.stale = ast, symbol_table, root, None
+        return ast
+
+    def build_segments(self, ranges, nodes, segments):
+        if ranges is None or len(ranges) != len(nodes):
+            # The statements cannot be told apart by their lines; edits reparse the parent
+            return []
+        children = []
+        for (start, end), node in zip(ranges, nodes):
+            segment = Segment(start, end, indentation(self.lines[start]), node)
+            segments[id(node)] = segment
+            if is_container(node):
+                body_start = header_end(self.lines, start)
+                segment.children = self.build_segments(outline_statements(self.lines, body_start, end),
+                                                        node.body.statements, segments)
+            children.append(segment)
+        return children
+
+    def apply_edit(self, start_line, start_column, end_line, end_column, text):
+        """Replace the text between two positions and reparse what the edit touched.
+
+        Lines and columns are zero-based. Returns the AST nodes that replaced
+        the reparsed statements. Parse errors are raised after the text is
+        updated; the failed lines are reparsed again with the next edit.
+        """
+        dirty_start, dirty_end = start_line, end_line + 1
+        if self.stale:
+            dirty_start, dirty_end = min(dirty_start, self.stale[0]), max(dirty_end, self.stale[1])
+        path = self.enclosing_segments(dirty_start, dirty_end)
+
+        if end_line >= len(self.lines):
+            # The empty line after a final line break
+            self.lines.append("")
+        before = self.lines[start_line][:start_column]
+        after = self.lines[end_line][end_column:]
+        replacement = (before + text + after).splitlines(keepends=True)
+        delta = len(replacement) - (end_line + 1 - start_line)
+        self.lines[start_line:end_line + 1] = replacement
+        self.root.shift(end_line + 1, delta)
+        self.root.end = len(self.lines)
+
+        for depth in range(len(path) - 1, 0, -1):
+            nodes = self.reparse_segment(path[depth], path[depth - 1])
+            if nodes is not None:
+                self.stale = None
+                return nodes
+        return self.reparse().statements
+
+    def enclosing_segments(self, start, end):
+        """Segments from the root down to the innermost one containing lines [start, end)."""
+        path = [self.root]
+        while True:
+            children = path[-1].children
+            index = bisect_right(children, start, key=lambda segment: segment.start) - 1
+            if index < 0 or children[index].end < end:
+                return path
+            path.append(children[index])
+
+    def reparse_segment(self, segment, parent):
+        """Reparse one statement and splice it into parent, or return None if its boundaries moved."""
+        lines = self.lines
+        start, end = segment.start, segment.end
+        ranges = outline_statements(lines, start, end)
+        if not ranges or ranges[0][0] != start or indentation(lines[start]) != segment.indent:
+            return None
+
+        if parent is self.root:
+            fragment = "".join(lines[start:end])
+        else:
+            prefix = lines[start][:len(lines[start]) - len(lines[start].lstrip(" \t"))]
+            body = []
+            for line in lines[start:end]:
+                if not line.strip():
+                    body.append("\n")
+                elif line.startswith(prefix):
+                    body.append(FRAGMENT_INDENT + line[len(prefix):])
+                else:
+                    return None
+            fragment = FRAGMENT_HEADER + "".join(body)
+
+        self.stale = (start, end)
+        try:
+            program = self.compiler.parse(fragment)
+        except Exception as e:
+            if isinstance(getattr(e, "line", None), int):
+                e.line += start if parent is self.root else start - 1
+            raise
+        nodes = program.statements if parent is self.root else program.statements[0].body.statements
+        if len(nodes) != len(ranges):
+            return None
+
+        segments = {}
+        replacements = self.build_segments(ranges, nodes, segments)
+        index = parent.children.index(segment)
+        parent.body()[index:index + 1] = nodes
+        parent.children[index:index + 1] = replacements
+        try:
+            self.replace_scopes(parent, segment, index + len(replacements), segments, nodes)
+        except Exception:
+            # The scope tree is only partly updated; rebuild everything next time
+            self.stale = (0, len(lines))
+            raise
+        return nodes
+
+    def replace_scopes(self, parent, segment, next_index, segments, nodes):
+        symbol_table = self.symbol_table
+        scope = parent.scope
+        for name in segment.symbols:
+            del scope.symbols[name]
+        for child in segment.scopes:
+            symbol_table.detach_scope(child)
+        position = len(scope.children)
+        for sibling in parent.children[next_index:]:
+            if sibling.scopes:
+                position = scope.children.index(sibling.scopes[0])
+                break
+
+        scope_count = len(scope.children)
+        symbol_table.current_scope = scope
+        try:
+            SegmentScopeBuilder(symbol_table, segments).visit(nodes)
+        finally:
+            symbol_table.current_scope = symbol_table.root
+        added = scope.children[scope_count:]
+        del scope.children[scope_count:]
+        scope.children[position:position] = added
+
+        if scope is not symbol_table.root:
+            # A finished build only keeps bindings for global symbols
+            for replacement in parent.children[next_index - len(nodes):next_index]:
+                for name in replacement.symbols:
+                    stack = symbol_table.bindings[name]
+                    stack.pop()
+                    if not stack:
+                        del symbol_table.bindings[name]
@@ -1,9 +1,52 @@
-from lark.indenter import Indenter
+from lark import Token
+from lark.indenter import Indenter, DedentError
+from narya_diagnostics import Diagnostic
 
 class NaryaIndenter(Indenter):
     NL_type = 'NEWLINE'
-    OPEN_PAREN_types = ['LPAREN', 'LBRACKET', 'LBRACE']
-    CLOSE_PAREN_types = ['RPAREN', 'RBRACKET', 'RBRACE']
+    # Braces are left out: anonymous scopes contain indented blocks
+    OPEN_PAREN_types = ['LPAR', 'LSQB']
+    CLOSE_PAREN_types = ['RPAR', 'RSQB']
     INDENT_type = 'INDENT'
     DEDENT_type = 'DEDENT'
-    tab_len = 4  # Narya uses 4 spaces for indentation
\ No newline at end of file
+    tab_len = 4  # Narya uses 4 spaces for indentation
+
+    def __init__(self, diagnostics=None):
+        super().__init__()
+        # When a list, inconsistent dedents are recorded there instead of raised
+        self.diagnostics = diagnostics
+        # Line number of the input's first line, when it was cut out of a larger file
+        self.first_line = 1
+
+    def process(self, stream):
+        # Tokens seen by the last parse, reported in CompileStats
+        self.token_count = 0
+        for token in super().process(stream):
+            self.token_count += 1
+            yield token
+
+    def handle_NL(self, token):
+        if self.paren_level > 0:
+            return
+        yield token
+
+        indent_str = token.rsplit('\n', 1)[1]
+        indent = indent_str.count(' ') + indent_str.count('\t') * self.tab_len
+        if indent > self.indent_level[-1]:
+            self.indent_level.append(indent)
+            yield Token.new_borrow_pos(self.INDENT_type, indent_str, token)
+            return
+        while indent < self.indent_level[-1]:
+            if indent > self.indent_level[-2]:
+                message = (f"Unexpected dedent to column {indent}. "
+                           f"Expected dedent to {self.indent_level[-2]}")
+                line = token.end_line + self.first_line - 1
+                if self.diagnostics is None:
+                    raise DedentError(f"Inconsistent indentation at line {line}: {message}")
+                self.diagnostics.append(Diagnostic(f"Inconsistent indentation: {message}",
+                                                   line=line, column=1, end_column=len(indent_str) + 1))
+                # Keep going as if the block had started at this column
+                self.indent_level[-1] = indent
+                return
+            self.indent_level.pop()
+            yield Token.new_borrow_pos(self.DEDENT_type, indent_str, token)
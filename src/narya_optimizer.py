@@ -0,0 +1,513 @@
+import copy
+import time
+import operator
+from collections import Counter
+from narya_ast import *
+from narya_stats import count_nodes
+from narya_templates import to_text
+
+# Seconds each pass may run before it leaves the rest of the tree as it is
+DEFAULT_BUDGET = 0.5
+# Nodes visited between budget checks
+CHECK_INTERVAL = 256
+# Largest return expression, in nodes, of a function that is inlined
+MAX_INLINE_NODES = 16
+# Longest text, and widest integer in bits, a fold may produce
+MAX_FOLDED_TEXT = 4096
+MAX_FOLDED_BITS = 4096
+
+LITERALS = (Integer, Float, Boolean, String)
+# Statements a skip or exit inside does not leave
+LOOP_BOUNDARIES = (WhileStatement, DoWhileStatement, ForStatement, ForeachStatement, FunctionDeclaration,
+                   AnonymousFunction, GroupDeclaration)
+
+def _add(left, right):
+    if isinstance(left, str) or isinstance(right, str):
+        return to_text(left) + to_text(right)
+    return left + right
+
+def _shift(shift):
+    def fold(left, right):
+        # Keep folded constants small; large shifts are left for run time
+        if not 0 <= right <= 64:
+            raise ValueError("shift out of folding range")
+        return shift(left, right)
+    return fold
+
+def _multiply(left, right):
+    # Text repeated past the literal limit is left for run time, before it is built
+    text, count = (left, right) if isinstance(left, str) else (right, left)
+    if isinstance(text, str) and isinstance(count, int) and len(text) * count > MAX_FOLDED_TEXT:
+        raise ValueError("text out of folding range")
+    return left * right
+
+def _power(left, right):
+    if isinstance(right, int) and not -64 <= right <= 64:
+        raise ValueError("exponent out of folding range")
+    # Powers of powers grow exponentially; check the result's width before computing it
+    if isinstance(left, int) and isinstance(right, int) and abs(left).bit_length() * right > MAX_FOLDED_BITS:
+        raise ValueError("power out of folding range")
+    return left ** right
+
+def _xor(left, right):
+    return bool(left) != bool(right)
+
+# Same semantics as NaryaVM, so folding never changes a program's output
+FOLDERS = {
+    "+": _add, "-": operator.sub, "*": _multiply, "/": operator.truediv, "%": operator.mod,
+    "=": operator.eq, "!=": operator.ne, "<": operator.lt, "<=": operator.le, ">": operator.gt, ">=": operator.ge,
+    "^": _power, "<<": _shift(operator.lshift), ">>": _shift(operator.rshift), "^^": _xor, "~~": _xor,
+}
+SHORT_CIRCUIT = {"and": False, "&&": False, "or": True, "||": True}
+
+def literal(value):
+    """The literal node for a folded value, or None when it has no literal form."""
+    if isinstance(value, bool):
+        return Boolean(value)
+    if isinstance(value, int) and value.bit_length() <= MAX_FOLDED_BITS:
+        return Integer(value)
+    if isinstance(value, float):
+        return Float(value)
+    if isinstance(value, str) and len(value) <= MAX_FOLDED_TEXT:
+        return String(value)
+    return None
+
+def terminates(statement):
+    """Whether control never falls through to the statement after this one."""
+    if isinstance(statement, (ReturnStatement, ExitStatement, SkipStatement)):
+        return True
+    if isinstance(statement, IfStatement):
+        return (statement.else_body is not None and any(map(terminates, statement.if_body.statements))
+                and any(map(terminates, statement.else_body.statements)))
+    if isinstance(statement, (DoBlock, AnonymousScope)):
+        return any(map(terminates, statement.body.statements))
+    if isinstance(statement, DangerousScope):
+        return terminates(statement.body)
+    return False
+
+def controls_loop(statements):
+    """Whether a skip or exit in statements belongs to the loop around them."""
+    stack = list(statements)
+    while stack:
+        item = stack.pop()
+        if isinstance(item, list):
+            stack.extend(item)
+        elif isinstance(item, (SkipStatement, ExitStatement)):
+            return True
+        elif isinstance(item, Ast) and not isinstance(item, LOOP_BOUNDARIES + (TypeExpression,)):
+            stack.extend(value for _, value in item.iter_fields())
+    return False
+
+def declares(statements):
+    return any(isinstance(statement, (VariableDeclaration, FunctionDeclaration, GroupDeclaration)) for statement in statements)
+
+class PassStatistics:
+    def __init__(self, name):
+        self.name = name
+        self.duration = 0.0
+        self.changes = 0
+        self.nodes_after = 0
+        # True when the pass ran out of its budget before visiting the whole tree
+        self.exhausted = False
+
+class OptimizationPass:
+    """Base of the AST passes: a rewriting visitor with a time budget.
+
+    visit_<Class> methods return the node to put in place of the visited
+    one. For statements they may also return a list of statements to
+    splice in, empty to drop the statement; a field that holds a single
+    statement gets them in an anonymous scope. Once the deadline passes the
+    remaining nodes are returned unchanged, so the tree stays valid.
+    """
+    name = "pass"
+
+    def run(self, ast, statistics, deadline=None):
+        self.statistics = statistics
+        self.deadline = deadline
+        self.visited = 0
+        # Node class -> bound visit method
+        self.visitors = {}
+        return self.visit(ast)
+
+    def changed(self, count=1):
+        self.statistics.changes += count
+
+    def visit(self, node):
+        self.visited += 1
+        if self.deadline is not None and self.visited % CHECK_INTERVAL == 0 and time.perf_counter() > self.deadline:
+            self.statistics.exhausted = True
+        if self.statistics.exhausted or not isinstance(node, Ast) or isinstance(node, TypeExpression):
+            return node
+        visitor = self.visitors.get(type(node))
+        if visitor is None:
+            visitor = self.visitors[type(node)] = getattr(self, f'visit_{type(node).__name__}', self.generic_visit)
+        return visitor(node)
+
+    def generic_visit(self, node):
+        for name, value in node.iter_fields():
+            if isinstance(value, list):
+                setattr(node, name, self.visit_list(value))
+            elif isinstance(value, Ast) and not isinstance(value, TypeExpression):
+                value = self.visit(value)
+                if isinstance(value, list):
+                    # Statements spliced where one statement goes, as in a dangerous scope
+                    value = value[0] if len(value) == 1 else AnonymousScope(body=Suite(statements=value))
+                setattr(node, name, value)
+        return node
+
+    def visit_list(self, items):
+        result = []
+        for item in items:
+            item = self.visit(item)
+            if isinstance(item, list):
+                result.extend(item)
+            else:
+                result.append(item)
+        return result
+
+class ConstantFolding(OptimizationPass):
+    """Folds operations on literals, and conditionals with literal conditions."""
+    name = "constant_folding"
+
+    def visit_BinaryOperation(self, node):
+        self.generic_visit(node)
+        if not isinstance(node.left, LITERALS):
+            return node
+        if node.operator in SHORT_CIRCUIT:
+            self.changed()
+            # `false and x` is false, `true and x` is x; the other way round for or
+            return node.left if bool(node.left.value) == SHORT_CIRCUIT[node.operator] else node.right
+        folder = FOLDERS.get(node.operator)
+        if folder is None or not isinstance(node.right, LITERALS):
+            return node
+        try:
+            folded = literal(folder(node.left.value, node.right.value))
+        except (ArithmeticError, TypeError, ValueError):
+            return node
+        if folded is None:
+            return node
+        self.changed()
+        return folded
+
+    def visit_UnaryOperation(self, node):
+        self.generic_visit(node)
+        operand = node.operand
+        if node.operator == "-" and isinstance(operand, (Integer, Float)):
+            self.changed()
+            return literal(-operand.value)
+        if node.operator != "-" and isinstance(operand, LITERALS):
+            self.changed()
+            return Boolean(not operand.value)
+        return node
+
+    def visit_Conditional(self, node):
+        self.generic_visit(node)
+        if not isinstance(node.condition, LITERALS):
+            return node
+        self.changed()
+        return node.if_true if node.condition.value else node.if_false
+
+class DeadBranchElimination(OptimizationPass):
+    """Removes branches and loops whose literal condition means they never run.
+
+    A surviving branch is spliced into the enclosing statements, or kept in
+    an anonymous scope when it declares names.
+    """
+    name = "dead_branches"
+
+    def body(self, suite):
+        if declares(suite.statements):
+            return [AnonymousScope(body=suite)]
+        return suite.statements
+
+    def visit_IfStatement(self, node):
+        self.generic_visit(node)
+        if not isinstance(node.condition, LITERALS):
+            return node
+        self.changed()
+        if node.condition.value:
+            return self.body(node.if_body)
+        return self.body(node.else_body) if node.else_body is not None else []
+
+    def visit_WhileStatement(self, node):
+        self.generic_visit(node)
+        if isinstance(node.condition, LITERALS) and not node.condition.value:
+            self.changed()
+            return []
+        return node
+
+    def visit_DoWhileStatement(self, node):
+        self.generic_visit(node)
+        # The body runs once; skip and exit need the loop to stay
+        if isinstance(node.condition, LITERALS) and not node.condition.value and not controls_loop(node.body.statements):
+            self.changed()
+            return self.body(node.body)
+        return node
+
+class UnreachableCodeElimination(OptimizationPass):
+    """Drops statements after a return, skip or exit in the same block.
+
+    Function and group declarations are kept, since they are not executed
+    in place.
+    """
+    name = "unreachable_code"
+
+    def visit_Suite(self, node):
+        self.generic_visit(node)
+        for index, statement in enumerate(node.statements):
+            if terminates(statement):
+                rest = node.statements[index + 1:]
+                kept = [declaration for declaration in rest if isinstance(declaration, (FunctionDeclaration, GroupDeclaration))]
+                if len(kept) < len(rest):
+                    self.changed(len(rest) - len(kept))
+                    node.statements = node.statements[:index + 1] + kept
+                break
+        return node
+
+class FunctionInlining(OptimizationPass):
+    """Inlines calls to small ring functions that only return an expression.
+
+    Only functions whose name is declared once in the whole program are
+    considered, so a call can never mean something else in another scope,
+    and the names their expression uses must be declared once at the top of
+    the same ring. Functions that call themselves, directly or through
+    each other, are never inlined. Functions left with no references
+    afterwards are removed unless they are public.
+    """
+    name = "inlining"
+
+    def __init__(self, max_nodes=MAX_INLINE_NODES):
+        self.max_nodes = max_nodes
+
+    def run(self, ast, statistics, deadline=None):
+        shaped = []
+        for ring in getattr(ast, 'statements', [ast]):
+            if isinstance(ring, Ring):
+                shaped.extend(self.find_candidates(ring))
+        self.candidates = {}
+        if shaped:
+            # Only walk the whole tree once some function could be inlined at all
+            self.declarations = Counter()
+            self.collect_declarations(ast)
+            for ring, declaration, parameters, expression, free, ring_members in shaped:
+                if self.declarations[declaration.name] == 1 and all(
+                        self.declarations[name] == 1 and name in ring_members for name in free):
+                    self.candidates[declaration.name] = (ring.name, declaration, parameters, expression, free)
+            self.remove_recursive()
+        if not self.candidates:
+            return ast
+        self.ring = None
+        ast = super().run(ast, statistics, deadline)
+        if not statistics.exhausted:
+            self.remove_unused(ast)
+        return ast
+
+    def collect_declarations(self, node):
+        stack = [node]
+        while stack:
+            item = stack.pop()
+            if isinstance(item, list):
+                stack.extend(item)
+            elif isinstance(item, Ast) and not isinstance(item, TypeExpression):
+                if isinstance(item, (VariableDeclaration, Parameter, FunctionDeclaration, GroupDeclaration, Ring)):
+                    self.declarations[item.name] += 1
+                elif isinstance(item, (ForStatement, ForeachStatement)):
+                    self.declarations[item.variable] += 1
+                stack.extend([getattr(item, name) for name in item._fields])
+
+    def find_candidates(self, ring):
+        """Ring functions whose body is a single small return, with the names they use."""
+        ring_members = {statement.name for statement in ring.body.statements
+                        if isinstance(statement, (VariableDeclaration, FunctionDeclaration, GroupDeclaration))}
+        for statement in ring.body.statements:
+            if not isinstance(statement, FunctionDeclaration):
+                continue
+            body = statement.body.statements
+            if len(body) != 1 or not isinstance(body[0], ReturnStatement) or body[0].value is None:
+                continue
+            expression = body[0].value
+            if count_nodes(expression) > self.max_nodes:
+                continue
+            parameters = [parameter.name for parameter in statement.parameters]
+            names = self.free_names(expression)
+            if names is not None:
+                yield ring, statement, parameters, expression, names - set(parameters), ring_members
+
+    def free_names(self, expression):
+        """Names an expression refers to, or None if it contains anything but plain expressions."""
+        names = set()
+        stack = [expression]
+        while stack:
+            item = stack.pop()
+            if isinstance(item, list):
+                stack.extend(item)
+            elif isinstance(item, Variable):
+                names.add(item.name)
+            elif isinstance(item, StringInterpolation):
+                names.add(item.identifier)
+            elif isinstance(item, ObjectCreation):
+                names.add(item.group)
+                stack.extend(item.arguments or [])
+            elif isinstance(item, (BinaryOperation, UnaryOperation, Conditional, MemberAccess, FunctionCall,
+                                   InterpolatedString, CollectionLiteral) + LITERALS):
+                stack.extend(value for _, value in item.iter_fields())
+            elif item is not None and not isinstance(item, str):
+                return None
+        return names
+
+    def remove_recursive(self):
+        # Drop every candidate that can reach itself through calls to candidates
+        calls = {name: candidate[4] & self.candidates.keys() for name, candidate in self.candidates.items()}
+        for name in list(calls):
+            seen = set()
+            pending = list(calls[name])
+            while pending:
+                callee = pending.pop()
+                if callee == name:
+                    del self.candidates[name]
+                    break
+                if callee not in seen:
+                    seen.add(callee)
+                    pending.extend(calls.get(callee, ()))
+
+    def visit_Ring(self, node):
+        self.ring = node.name
+        return self.generic_visit(node)
+
+    def visit_FunctionCall(self, node):
+        self.generic_visit(node)
+        if not isinstance(node.function, Variable) or node.function.name not in self.candidates:
+            return node
+        ring, declaration, parameters, expression, _ = self.candidates[node.function.name]
+        if ring != self.ring or len(node.arguments) != len(parameters):
+            return node
+        inlined = self.substitute(expression, dict(zip(parameters, node.arguments)))
+        if inlined is None:
+            return node
+        self.changed()
+        # Calls to other candidates inside the inlined expression
+        return self.visit(inlined)
+
+    def substitute(self, expression, arguments):
+        """A copy of expression with parameters replaced by the call's arguments, or None if that is unsafe."""
+        uses = Counter()
+        stack = [expression]
+        has_calls = False
+        while stack:
+            item = stack.pop()
+            if isinstance(item, list):
+                stack.extend(item)
+            elif isinstance(item, Ast) and not isinstance(item, TypeExpression):
+                if isinstance(item, Variable) and item.name in arguments:
+                    uses[item.name] += 1
+                elif isinstance(item, StringInterpolation) and item.identifier in arguments:
+                    # Only a variable can stand in an interpolation
+                    if not isinstance(arguments[item.identifier], Variable):
+                        return None
+                    uses[item.identifier] += 1
+                elif isinstance(item, (FunctionCall, ObjectCreation, MemberAccess)):
+                    has_calls = True
+                stack.extend(value for _, value in item.iter_fields())
+        for name, argument in arguments.items():
+            # Arguments are evaluated once, before the body; only copy those
+            # whose value cannot change or cause effects in between
+            if isinstance(argument, LITERALS):
+                continue
+            if isinstance(argument, Variable) and not has_calls:
+                continue
+            if self.is_pure(argument) and uses[name] == 1 and not has_calls:
+                continue
+            return None
+
+        def replace(node):
+            if isinstance(node, Variable) and node.name in arguments:
+                return copy.deepcopy(arguments[node.name])
+            if isinstance(node, StringInterpolation) and node.identifier in arguments:
+                return StringInterpolation(identifier=arguments[node.identifier].name)
+            if isinstance(node, Ast) and not isinstance(node, TypeExpression):
+                for name, value in node.iter_fields():
+                    if isinstance(value, list):
+                        setattr(node, name, [replace(item) for item in value])
+                    elif isinstance(value, Ast):
+                        setattr(node, name, replace(value))
+            return node
+
+        return replace(copy.deepcopy(expression))
+
+    def is_pure(self, expression):
+        if isinstance(expression, LITERALS + (Variable,)):
+            return True
+        if isinstance(expression, BinaryOperation):
+            return self.is_pure(expression.left) and self.is_pure(expression.right)
+        if isinstance(expression, UnaryOperation):
+            return self.is_pure(expression.operand)
+        return False
+
+    def remove_unused(self, ast):
+        referenced = Counter()
+        stack = [ast]
+        while stack:
+            item = stack.pop()
+            if isinstance(item, list):
+                stack.extend(item)
+            elif isinstance(item, Ast) and not isinstance(item, TypeExpression):
+                if isinstance(item, Variable):
+                    referenced[item.name] += 1
+                elif isinstance(item, MemberAccess):
+                    referenced[item.member] += 1
+                elif isinstance(item, StringInterpolation):
+                    referenced[item.identifier] += 1
+                stack.extend(value for _, value in item.iter_fields())
+        for ring in getattr(ast, 'statements', [ast]):
+            if not isinstance(ring, Ring):
+                continue
+            kept = []
+            for statement in ring.body.statements:
+                if (isinstance(statement, FunctionDeclaration) and statement.name in self.candidates
+                        and statement.access_modifier != "public" and not referenced[statement.name]):
+                    self.changed()
+                    continue
+                kept.append(statement)
+            ring.body.statements = kept
+
+DEFAULT_PASSES = (ConstantFolding, DeadBranchElimination, UnreachableCodeElimination, FunctionInlining, ConstantFolding)
+
+class PassManager:
+    """Runs optimization passes over an AST in order, each within its own time budget.
+
+    statistics holds a PassStatistics per pass of the last run. Passes
+    rewrite the tree in place where they can; always use the returned AST.
+    """
+
+    def __init__(self, passes=None, budget=DEFAULT_BUDGET):
+        self.passes = list(passes) if passes is not None else [pass_type() for pass_type in DEFAULT_PASSES]
+        self.budget = budget
+        self.statistics = []
+        self.nodes_before = 0
+
+    def add(self, optimization_pass):
+        self.passes.append(optimization_pass)
+
+    def run(self, ast):
+        self.statistics = []
+        self.nodes_before = count_nodes(ast)
+        for optimization_pass in self.passes:
+            statistics = PassStatistics(optimization_pass.name)
+            start = time.perf_counter()
+            deadline = start + self.budget if self.budget is not None else None
+            ast = optimization_pass.run(ast, statistics, deadline)
+            statistics.duration = time.perf_counter() - start
+            statistics.nodes_after = count_nodes(ast)
+            self.statistics.append(statistics)
+        return ast
+
+    def summary(self):
+        lines = [f"{'before':18} {self.nodes_before:8} nodes"]
+        for statistics in self.statistics:
+            flag = "  (budget exhausted)" if statistics.exhausted else ""
+            lines.append(f"{statistics.name:18} {statistics.nodes_after:8} nodes {statistics.changes:6} changes "
+                         f"{statistics.duration * 1000:9.2f} ms{flag}")
+        return "\n".join(lines)
+
+def optimize(ast, passes=None, budget=DEFAULT_BUDGET):
+    return PassManager(passes, budget).run(ast)
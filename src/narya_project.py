@@ -0,0 +1,114 @@
+import os
+import sys
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from narya_compiler import NaryaCompiler
+from narya_symbol_table import SymbolTable
+
+SOURCE_EXTENSION = ".narya"
+
+# One compiler per worker process; parsers are shared and cached by NaryaCompiler
+_worker_compilers = {}
+
+class FileResult:
+    def __init__(self, path, ast=None, symbol_table=None, error=None):
+        self.path = path
+        self.ast = ast
+        self.symbol_table = symbol_table
+        self.error = error
+
+class ProjectResult:
+    def __init__(self):
+        self.asts = {}
+        self.symbol_table = SymbolTable()
+        self.errors = []
+
+    @property
+    def ok(self):
+        return not self.errors
+
+def find_sources(paths):
+    """Expand directories into the .narya files they contain, in a stable order."""
+    sources = []
+    for path in paths:
+        if os.path.isdir(path):
+            for directory, _, files in os.walk(path):
+                sources.extend(os.path.join(directory, name) for name in files if name.endswith(SOURCE_EXTENSION))
+        else:
+            sources.append(path)
+    return sorted(sources)
+
+def compile_file(path, parser="lalr"):
+    """Parse and transform one file. Errors are returned, never raised."""
+    compiler = _worker_compilers.get(parser)
+    if compiler is None:
+        compiler = _worker_compilers[parser] = NaryaCompiler(parser=parser)
+    try:
+        with open(path, "r") as source_file:
+            code = source_file.read()
+        ast = compiler.compile(code)
+        return FileResult(path, ast, compiler.symbol_table)
+    except Exception as e:
+        return FileResult(path, error=f"{type(e).__name__}: {e}")
+
+def compile_files(paths, workers=None, parser="lalr"):
+    """Compile files across a process pool, returning one FileResult per path in order.
+
+    workers=1 compiles in this process.
+    """
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(paths) <= 1:
+        return [compile_file(path, parser) for path in paths]
+    chunksize = max(1, len(paths) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(compile_file, paths, [parser] * len(paths), chunksize=chunksize))
+
+def compile_many(paths, workers=None, parser="lalr"):
+    """Compile many files across a process pool and merge their symbol tables.
+
+    Files that fail are reported in ProjectResult.errors and do not stop the
+    rest of the batch.
+    """
+    results = compile_files(find_sources(paths), workers, parser)
+
+    project = ProjectResult()
+    for result in results:
+        if result.error is not None:
+            project.errors.append((result.path, result.error))
+            continue
+        try:
+            project.symbol_table.merge(result.symbol_table)
+        except ValueError as e:
+            project.errors.append((result.path, f"ValueError: {e}"))
+            continue
+        project.asts[result.path] = result.ast
+    return project
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description="Compile a Narya project")
+    arg_parser.add_argument("paths", nargs="+", help=f"{SOURCE_EXTENSION} files or directories")
+    arg_parser.add_argument("-j", "--jobs", type=int, default=None, help="worker processes (default: CPU count)")
+    arg_parser.add_argument("--parser", choices=("lalr", "earley"), default="lalr")
+    arg_parser.add_argument("--incremental", action="store_true", help="reuse cached ASTs for unchanged files")
+    arg_parser.add_argument("--cache-dir", default=None, help="build cache directory for --incremental")
+    args = arg_parser.parse_args(argv)
+
+    if args.incremental:
+        # Imported here because narya_build_cache builds on this module
+        from narya_build_cache import BuildCache, IncrementalBuilder, DEFAULT_BUILD_CACHE_DIR
+        cache = BuildCache(args.cache_dir or DEFAULT_BUILD_CACHE_DIR)
+        build = IncrementalBuilder(cache, workers=args.jobs, parser=args.parser).build(args.paths)
+        for path, error in build.errors:
+            print(f"{path}: {error}", file=sys.stderr)
+        print(f"Built {len(build.files)} files: {len(build.compiled)} changed, "
+              f"{len(build.checked)} checked, {len(build.errors)} errors")
+        return 0 if not build.errors else 1
+
+    project = compile_many(args.paths, workers=args.jobs, parser=args.parser)
+    for path, error in project.errors:
+        print(f"{path}: {error}", file=sys.stderr)
+    print(f"Compiled {len(project.asts)} files, {len(project.errors)} failed")
+    return 0 if project.ok else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,753 @@
+import os
+import sys
+import ast as py
+import keyword
+import marshal
+import hashlib
+import importlib.util
+from lark import Tree
+from narya_ast import *
+from narya_bytecode import ScopeRecorder, DEFAULT_VALUES
+from narya_symbol_table import ScopeType
+from narya_vm import NaryaRuntimeError, SIZE_PROPERTIES
+from narya_templates import compile_template, to_text
+
+# Bump whenever the generated code changes, to invalidate cached code objects
+BACKEND_VERSION = 3
+CACHE_TAG = f"narya-{sys.implementation.cache_tag}"
+CACHE_HEADER = importlib.util.MAGIC_NUMBER + b"NARYA" + bytes([BACKEND_VERSION])
+
+OPERATORS = {
+    "+": py.Add, "-": py.Sub, "*": py.Mult, "/": py.Div, "%": py.Mod,
+    "^": py.Pow, "<<": py.LShift, ">>": py.RShift,
+}
+COMPARISONS = {
+    "=": py.Eq, "!=": py.NotEq, "<": py.Lt, "<=": py.LtE, ">": py.Gt, ">=": py.GtE,
+}
+BOOLEAN_OPERATORS = {"and": py.And, "&&": py.And, "or": py.Or, "||": py.Or}
+
+# Runtime support, bound into the namespace generated code runs in
+
+class NaryaList(list):
+    __slots__ = ()
+
+    def Add(self, *values):
+        self.extend(values)
+
+    def Remove(self, value):
+        self.remove(value)
+
+    def Contains(self, value):
+        return value in self
+
+    def Clear(self):
+        self.clear()
+
+class NaryaObject:
+    """Base of the classes generated for groups.
+
+    Field initializers run first; then the constructor, unless it needs
+    arguments and none were given, so `new Person` leaves it out.
+    """
+    __slots__ = ()
+    group_name = ""
+    # Parameter count of the constructor, None without one
+    constructor_arity = None
+
+    def __init__(self, *arguments):
+        self._narya_fields()
+        if self.constructor_arity is not None and (arguments or self.constructor_arity == 0):
+            self._narya_construct(*arguments)
+        elif arguments:
+            raise NaryaRuntimeError(f"{self.group_name} has no constructor taking {len(arguments)} arguments")
+
+    def _narya_fields(self):
+        pass
+
+    def __str__(self):
+        return self.group_name
+
+def _add(left, right):
+    if left.__class__ is str or right.__class__ is str:
+        return to_text(left) + to_text(right)
+    return left + right
+
+def _concat(left, right):
+    return to_text(left) + to_text(right)
+
+def _xor(left, right):
+    return bool(left) != bool(right)
+
+def _iterate(value):
+    return range(value) if value.__class__ is int else value
+
+def runtime_namespace(output=None):
+    return {
+        "__name__": "__narya__",
+        "_narya_print": output or print,
+        "_narya_text": to_text,
+        "_narya_add": _add,
+        "_narya_concat": _concat,
+        "_narya_xor": _xor,
+        "_narya_iterate": _iterate,
+        "_narya_range": range,
+        "_narya_len": len,
+        "_narya_list": NaryaList,
+        "_narya_object": NaryaObject,
+    }
+
+# Code generation
+
+def _name(identifier, context=None):
+    return py.Name(id=identifier, ctx=context or py.Load())
+
+def _call(function, arguments):
+    return py.Call(func=function, args=arguments, keywords=[])
+
+def _helper(name, *arguments):
+    return _call(_name(f"_narya_{name}"), list(arguments))
+
+def _arguments(names):
+    return py.arguments(posonlyargs=[], args=[py.arg(arg=name) for name in names], vararg=None,
+                        kwonlyargs=[], kw_defaults=[], kwarg=None, defaults=[])
+
+def _function(name, parameters, body, decorators=()):
+    return py.FunctionDef(name=name, args=_arguments(parameters), body=body,
+                          decorator_list=list(decorators), returns=None)
+
+def _python_name(scope, name):
+    qualified = f"{scope.qualified_name}.{name}" if scope.qualified_name else name
+    return qualified.replace(".", "__")
+
+class GroupInfo:
+    """A group as it maps onto a generated class."""
+
+    def __init__(self, node, scope, enclosing):
+        self.node = node
+        self.scope = scope
+        self.enclosing = enclosing
+        self.python_name = _python_name(enclosing, node.name)
+        self.parent = None
+        # Fields and method names including inherited ones; own_fields become __slots__
+        self.fields = []
+        self.own_fields = []
+        self.methods = set()
+        self.constructor = None
+        self.method_nodes = []
+
+class PythonGenerator:
+    """Lowers a Narya AST to a Python module AST.
+
+    Rings become module-level functions run in order, ring variables module
+    globals, groups slotted classes deriving from NaryaObject and locals
+    fast locals named after their symbols. As in NaryaVM, parameterless
+    methods read like properties and `for` runs up to, but not including,
+    its end.
+    """
+
+    def generate(self, ast):
+        recorder = ScopeRecorder()
+        self.symbol_table = recorder.build(ast)
+        self.scopes = recorder.scopes
+        # Ring and group scopes -> name -> (kind, Python name, GroupInfo or None)
+        self.members = {}
+        self.group_scopes = {}
+        self.groups = []
+        self.functions = []
+        self.declared = set()
+        self.ring_names = set()
+        self.global_names = set()
+        self.laid_out = []
+
+        rings = []
+        for node in ast.statements:
+            scope, = self.scopes[id(node)]
+            self.ring_names.add(node.name)
+            self.members[id(scope)] = {}
+            self.declare(node.body.statements, scope, None)
+            rings.append((node, scope))
+
+        in_progress = set()
+        for group in self.groups:
+            self.layout(group, in_progress)
+        # Member names decide how `value.Name` is compiled without knowing the value's group
+        self.field_names = {field for group in self.groups for field in group.fields}
+        self.property_names = {method.name for group in self.groups for method in group.method_nodes
+                               if not method.parameters and method is not group.constructor}
+
+        body = [self.group_class(group) for group in self.laid_out]
+        for node, scope, group, name in self.functions:
+            if group is None:
+                body.append(FunctionBuilder(self, scope, None).function(node, name))
+        for index, (node, scope) in enumerate(rings):
+            name = f"_narya_ring_{index}"
+            body.append(FunctionBuilder(self, scope, None).block(name, node.body.statements))
+            body.append(py.Expr(value=_call(_name(name), [])))
+        return py.fix_missing_locations(py.Module(body=body, type_ignores=[]))
+
+    def declare(self, statements, scope, group):
+        members = self.members[id(scope)]
+        for statement in statements:
+            if isinstance(statement, (GroupDeclaration, FunctionDeclaration)):
+                self.declared.add(id(statement))
+            if isinstance(statement, GroupDeclaration) and not statement.name:
+                self.declare(statement.body.statements, scope, group)
+            elif isinstance(statement, GroupDeclaration):
+                group_scope, = self.scopes[id(statement)]
+                info = GroupInfo(statement, group_scope, scope)
+                members[statement.name] = ('value', info.python_name, info)
+                self.global_names.add(info.python_name)
+                self.group_scopes[id(group_scope)] = info
+                self.members[id(group_scope)] = {}
+                self.groups.append(info)
+                self.declare(statement.body.statements, group_scope, info)
+            elif isinstance(statement, FunctionDeclaration):
+                function_scope, = self.scopes[id(statement)]
+                python_name = _python_name(scope, statement.name) if group is None else statement.name
+                self.functions.append((statement, function_scope, group, python_name))
+                if group is None:
+                    members[statement.name] = ('value', python_name, None)
+                    self.global_names.add(python_name)
+                elif statement.name == group.node.name and statement.return_type is None:
+                    group.constructor = statement
+                else:
+                    group.method_nodes.append(statement)
+            elif isinstance(statement, VariableDeclaration) and group is None and scope.scope_type == ScopeType.RING:
+                global_name = _python_name(scope, statement.name)
+                members[statement.name] = ('global', global_name, None)
+                self.global_names.add(global_name)
+
+    def layout(self, group, in_progress):
+        if group in self.laid_out:
+            return
+        if group in in_progress:
+            raise ValueError(f"Group '{group.node.name}' derives from itself")
+        in_progress.add(group)
+        if group.node.parent:
+            parent = self.lookup_group(group.node.parent, group.enclosing)
+            if parent is None:
+                raise ValueError(f"Unknown parent group '{group.node.parent}' of '{group.node.name}'")
+            self.layout(parent, in_progress)
+            group.parent = parent
+            group.fields = list(parent.fields)
+            group.methods = set(parent.methods)
+        for statement in group.node.body.statements:
+            if isinstance(statement, VariableDeclaration) and statement.name not in group.fields:
+                group.fields.append(statement.name)
+                group.own_fields.append(statement.name)
+        group.methods.update(method.name for method in group.method_nodes)
+        self.laid_out.append(group)
+
+    def lookup_group(self, name, scope):
+        while scope is not None:
+            member = self.members.get(id(scope), {}).get(name)
+            if member is not None and member[2] is not None:
+                return member[2]
+            scope = scope.parent
+        return None
+
+    def group_class(self, group):
+        node = group.node
+        body = [
+            py.Assign(targets=[_name("__slots__", py.Store())],
+                      value=py.Tuple(elts=[py.Constant(field) for field in group.own_fields], ctx=py.Load())),
+            py.Assign(targets=[_name("group_name", py.Store())], value=py.Constant(node.name)),
+        ]
+        fields = [statement for statement in node.body.statements if isinstance(statement, VariableDeclaration)]
+        if fields:
+            body.append(FunctionBuilder(self, group.scope, group).fields(fields))
+        if group.constructor is not None:
+            body.append(py.Assign(targets=[_name("constructor_arity", py.Store())],
+                                  value=py.Constant(len(group.constructor.parameters))))
+        for function, scope, owner, _ in self.functions:
+            if owner is group:
+                name = "_narya_construct" if function is group.constructor else function.name
+                body.append(FunctionBuilder(self, scope, group).function(function, name))
+        base = _name(group.parent.python_name) if group.parent else _name("_narya_object")
+        return py.ClassDef(name=group.python_name, bases=[base], keywords=[], body=body, decorator_list=[])
+
+class FunctionBuilder:
+    """Emits the Python function of one Narya function, ring body or group initializer."""
+
+    def __init__(self, generator, scope, group):
+        self.generator = generator
+        self.scope = scope
+        self.group = group
+        # id(symbol) -> local name
+        self.names = {}
+        self.used = {"self"} | generator.global_names
+        self.assigned_globals = set()
+        self.loop_depth = 0
+
+    # Code units
+
+    def function(self, node, name):
+        parameters = ["self"] if self.group is not None else []
+        parameters += [self.local_name(self.scope.symbols[parameter.name]) for parameter in node.parameters]
+        body = self.statements(node.body.statements)
+        decorators = []
+        if self.group is not None and not node.parameters and node is not self.group.constructor:
+            decorators.append(_name("property"))
+        return _function(name, parameters, self.with_globals(body), decorators)
+
+    def fields(self, declarations):
+        body = []
+        if self.group.parent is not None:
+            body.append(py.Expr(value=_call(
+                py.Attribute(value=_name(self.group.parent.python_name), attr="_narya_fields", ctx=py.Load()),
+                [_name("self")])))
+        for declaration in declarations:
+            body.append(py.Assign(targets=[self.field(declaration.name, py.Store())], value=self.initial_value(declaration)))
+        return _function("_narya_fields", ["self"], self.with_globals(body))
+
+    def block(self, name, statements):
+        return _function(name, [], self.with_globals(self.statements(statements)))
+
+    def with_globals(self, body):
+        if not body:
+            body = [py.Pass()]
+        if self.assigned_globals:
+            body.insert(0, py.Global(names=sorted(self.assigned_globals)))
+        return body
+
+    # Names
+
+    def local_name(self, symbol):
+        name = self.names.get(id(symbol))
+        if name is None:
+            name = symbol.name
+            counter = 1
+            while name in self.used or keyword.iskeyword(name) or name.startswith("_narya_"):
+                counter += 1
+                name = f"{symbol.name}_{counter}"
+            self.names[id(symbol)] = name
+            self.used.add(name)
+        return name
+
+    def temporary(self, prefix):
+        counter = 1
+        while f"_narya_{prefix}_{counter}" in self.used:
+            counter += 1
+        name = f"_narya_{prefix}_{counter}"
+        self.used.add(name)
+        return name
+
+    def resolve(self, name):
+        """Where a name lives: ('local', name), ('global', name), ('field', name), ('method', name), ('value', name) or ('ring', name)."""
+        scope = self.scope
+        while scope is not None:
+            members = self.generator.members.get(id(scope))
+            if members is not None:
+                owner = self.generator.group_scopes.get(id(scope))
+                if owner is not None and owner is self.group and name in owner.fields:
+                    return 'field', name
+                if owner is not None and owner is self.group and name in owner.methods:
+                    return 'method', name
+                member = members.get(name)
+                if member is not None:
+                    return member[0], member[1]
+            elif scope.scope_type != ScopeType.GLOBAL:
+                symbol = scope.symbols.get(name)
+                if symbol is not None:
+                    return 'local', self.local_name(symbol)
+            scope = scope.parent
+        if name in self.generator.ring_names:
+            return 'ring', name
+        raise ValueError(f"Unknown name '{name}'")
+
+    def field(self, name, context=None):
+        return py.Attribute(value=_name("self"), attr=name, ctx=context or py.Load())
+
+    def load(self, name):
+        kind, where = self.resolve(name)
+        if kind in ('field', 'method'):
+            return self.field(where)
+        if kind == 'ring':
+            raise ValueError(f"Ring '{name}' can only be used to access its members")
+        return _name(where)
+
+    def store(self, name):
+        kind, where = self.resolve(name)
+        if kind == 'field':
+            return self.field(where, py.Store())
+        if kind == 'global':
+            self.assigned_globals.add(where)
+        elif kind != 'local':
+            raise ValueError(f"Cannot assign to '{name}'")
+        return _name(where, py.Store())
+
+    def ring_member(self, node):
+        """The module global behind `Ring.member`, or None when node is not such an access."""
+        if not isinstance(node.object, Variable):
+            return None
+        try:
+            kind, ring = self.resolve(node.object.name)
+        except ValueError:
+            return None
+        if kind != 'ring':
+            return None
+        # A ring declared twice has one scope per declaration
+        for scope in self.generator.symbol_table.root.children:
+            member = self.generator.members.get(id(scope), {}).get(node.member) if scope.name == ring else None
+            if member is not None:
+                return member
+        raise ValueError(f"Ring '{ring}' has no member '{node.member}'")
+
+    # Static types, to pick plain arithmetic over the text-aware helpers.
+    # Declared types are not enforced, so only what literals build is known.
+
+    def static_type(self, node):
+        if isinstance(node, (Integer, Float)):
+            return "num"
+        if isinstance(node, (String, InterpolatedString)):
+            return "text"
+        if isinstance(node, CollectionLiteral):
+            return "collection"
+        if isinstance(node, UnaryOperation) and node.operator == "-":
+            return self.static_type(node.operand)
+        if isinstance(node, BinaryOperation) and node.operator in OPERATORS:
+            left, right = self.static_type(node.left), self.static_type(node.right)
+            if node.operator == "+" and "text" in (left, right):
+                return "text"
+            if left == right == "num":
+                return "num"
+        return None
+
+    # Statements
+
+    def statements(self, statements):
+        body = []
+        for statement in statements:
+            body.extend(self.statement(statement))
+        return body
+
+    def scoped(self, node, index, statements):
+        scope = self.generator.scopes[id(node)][index]
+        self.scope, previous = scope, self.scope
+        body = self.statements(statements)
+        self.scope = previous
+        return body or [py.Pass()]
+
+    def loop_body(self, node, index, statements):
+        self.loop_depth += 1
+        body = self.scoped(node, index, statements)
+        self.loop_depth -= 1
+        return body
+
+    def statement(self, node):
+        if isinstance(node, (FunctionDeclaration, GroupDeclaration)):
+            # Declarations are compiled on their own
+            if id(node) not in self.generator.declared:
+                raise ValueError("Declarations are only supported in rings and groups")
+            if isinstance(node, GroupDeclaration) and not node.name:
+                return self.statements(node.body.statements)
+            return []
+        if node is None or isinstance(node, (UsingStatement, WithStatement, InStatement)):
+            return []
+        if isinstance(node, Tree):
+            raise ValueError(f"Unsupported construct '{node.data}'")
+        method = getattr(self, f'statement_{type(node).__name__}', None)
+        if method is not None:
+            return method(node)
+        return [py.Expr(value=self.expression(node))]
+
+    def statement_Suite(self, node):
+        return self.statements(node.statements)
+
+    def statement_VariableDeclaration(self, node):
+        return [py.Assign(targets=[self.store(node.name)], value=self.initial_value(node))]
+
+    def initial_value(self, node):
+        if node.initializer is not None:
+            return self.expression(node.initializer)
+        type_expression = node.type
+        if type_expression is None or type_expression.is_nullable:
+            return py.Constant(None)
+        if isinstance(type_expression, CollectionType):
+            return _helper("list")
+        return py.Constant(DEFAULT_VALUES.get(type_expression.base_type))
+
+    def statement_BinaryOperation(self, node):
+        # `name = value` as a statement is an assignment, elsewhere a comparison
+        if node.operator != "=" or not isinstance(node.left, (Variable, MemberAccess)):
+            return [py.Expr(value=self.expression(node))]
+        if isinstance(node.left, Variable):
+            target = self.store(node.left.name)
+        else:
+            member = self.ring_member(node.left)
+            if member is not None and member[0] == 'global':
+                self.assigned_globals.add(member[1])
+                target = _name(member[1], py.Store())
+            else:
+                target = py.Attribute(value=self.expression(node.left.object), attr=node.left.member, ctx=py.Store())
+        return [py.Assign(targets=[target], value=self.expression(node.right))]
+
+    def statement_PrintStatement(self, node):
+        return [py.Expr(value=_helper("print", _helper("text", self.expression(node.expression))))]
+
+    def statement_ReturnStatement(self, node):
+        return [py.Return(value=None if node.value is None else self.expression(node.value))]
+
+    def statement_SkipStatement(self, node):
+        if not self.loop_depth:
+            raise ValueError("'skip' outside a loop")
+        return [py.Continue()]
+
+    def statement_ExitStatement(self, node):
+        if not self.loop_depth:
+            raise ValueError("'exit' outside a loop")
+        return [py.Break()]
+
+    def statement_DoBlock(self, node):
+        return self.scoped(node, 0, node.body.statements)
+
+    def statement_DoWhileStatement(self, node):
+        # `while first or condition`, so `skip` still checks the condition
+        first = self.temporary("first")
+        body = [py.Assign(targets=[_name(first, py.Store())], value=py.Constant(False))]
+        body += self.loop_body(node, 0, node.body.statements)
+        test = py.BoolOp(op=py.Or(), values=[_name(first), self.expression(node.condition)])
+        return [py.Assign(targets=[_name(first, py.Store())], value=py.Constant(True)),
+                py.While(test=test, body=body, orelse=[])]
+
+    def statement_WhileStatement(self, node):
+        test = self.expression(node.condition)
+        return [py.While(test=test, body=self.loop_body(node, 0, node.body.statements), orelse=[])]
+
+    def statement_IfStatement(self, node):
+        test = self.expression(node.condition)
+        orelse = self.scoped(node, 1, node.else_body.statements) if node.else_body is not None else []
+        return [py.If(test=test, body=self.scoped(node, 0, node.if_body.statements), orelse=orelse)]
+
+    def statement_ForStatement(self, node):
+        # Like the VM: bind the variable, fix the end, then re-read the
+        # variable every pass, so the body may assign it. The increment
+        # comes first and is skipped on the first pass, so skip still runs it
+        start = self.expression(node.start)
+        end_name, first = self.temporary("end"), self.temporary("first")
+        self.scope, previous = self.generator.scopes[id(node)][0], self.scope
+        bind = py.Assign(targets=[self.store(node.variable)], value=start)
+        end = py.Assign(targets=[_name(end_name, py.Store())], value=self.expression(node.end))
+        increment = py.If(test=_name(first),
+                          body=[py.Assign(targets=[_name(first, py.Store())], value=py.Constant(False))],
+                          orelse=[py.Assign(targets=[self.store(node.variable)],
+                                            value=py.BinOp(left=self.load(node.variable), op=py.Add(),
+                                                           right=py.Constant(1)))])
+        test = py.Compare(left=self.load(node.variable), ops=[py.Lt()], comparators=[_name(end_name)])
+        self.scope = previous
+        body = [increment, py.If(test=py.UnaryOp(op=py.Not(), operand=test), body=[py.Break()], orelse=[])]
+        body += self.loop_body(node, 0, node.body.statements)
+        return [bind, end, py.Assign(targets=[_name(first, py.Store())], value=py.Constant(True)),
+                py.While(test=py.Constant(True), body=body, orelse=[])]
+
+    def statement_ForeachStatement(self, node):
+        iterable = self.expression(node.iterable)
+        kind = self.static_type(node.iterable)
+        if kind == "num":
+            iterable = _helper("range", iterable)
+        elif kind != "collection":
+            iterable = _helper("iterate", iterable)
+        self.scope, previous = self.generator.scopes[id(node)][0], self.scope
+        target = self.store(node.variable)
+        self.scope = previous
+        body = self.loop_body(node, 0, node.body.statements)
+        return [py.For(target=target, iter=iterable, body=body, orelse=[])]
+
+    def statement_MatchStatement(self, node):
+        # Cases compare the subject against the value of their name, in order
+        subject = self.temporary("subject")
+        statements = [py.Assign(targets=[_name(subject, py.Store())], value=self.expression(node.subject))]
+        branches = []
+        for index, case in enumerate(node.cases):
+            body = self.scoped(node, index, case.body.statements)
+            if case.pattern is None:
+                branches.append((None, body))
+                break
+            test = py.Compare(left=_name(subject), ops=[py.Eq()], comparators=[self.load(case.pattern)])
+            branches.append((test, body))
+        orelse = []
+        for test, body in reversed(branches):
+            orelse = body if test is None else [py.If(test=test, body=body, orelse=orelse)]
+        return statements + orelse
+
+    def statement_AnonymousScope(self, node):
+        return self.scoped(node, 0, node.body.statements)
+
+    def statement_DangerousScope(self, node):
+        if isinstance(node.body, AnonymousScope):
+            return self.scoped(node, 0, node.body.body.statements)
+        return self.statement(node.body)
+
+    # Expressions
+
+    def expression(self, node):
+        if isinstance(node, Tree):
+            raise ValueError(f"Unsupported construct '{node.data}'")
+        method = getattr(self, f'expression_{type(node).__name__}', None)
+        if method is None:
+            raise ValueError(f"Unsupported expression {type(node).__name__}")
+        return method(node)
+
+    def expression_Integer(self, node):
+        return py.Constant(node.value)
+
+    expression_Float = expression_Integer
+    expression_Boolean = expression_Integer
+    expression_String = expression_Integer
+
+    def expression_Variable(self, node):
+        return self.load(node.name)
+
+    def expression_InterpolatedString(self, node):
+        template = compile_template(node)
+        values = [py.Constant(template.segments[0])] if template.segments[0] else []
+        for name, segment in zip(template.names, template.segments[1:]):
+            values.append(py.FormattedValue(value=_helper("text", self.load(name)), conversion=-1, format_spec=None))
+            if segment:
+                values.append(py.Constant(segment))
+        return py.JoinedStr(values=values)
+
+    def expression_CollectionLiteral(self, node):
+        if node.size is not None:
+            elements = py.BinOp(left=py.List(elts=[py.Constant(None)], ctx=py.Load()), op=py.Mult(),
+                                right=py.Constant(node.size))
+        else:
+            elements = py.List(elts=[self.expression(element) for element in node.elements], ctx=py.Load())
+        return _helper("list", elements)
+
+    def expression_BinaryOperation(self, node):
+        left = self.expression(node.left)
+        right = self.expression(node.right)
+        operator = node.operator
+        if operator in BOOLEAN_OPERATORS:
+            return py.BoolOp(op=BOOLEAN_OPERATORS[operator](), values=[left, right])
+        if operator in COMPARISONS:
+            return py.Compare(left=left, ops=[COMPARISONS[operator]()], comparators=[right])
+        if operator == "+":
+            kinds = (self.static_type(node.left), self.static_type(node.right))
+            if "text" in kinds and kinds != ("text", "text"):
+                return _helper("concat", left, right)
+            if kinds[0] != kinds[1] or kinds[0] is None:
+                return _helper("add", left, right)
+        if operator in OPERATORS:
+            return py.BinOp(left=left, op=OPERATORS[operator](), right=right)
+        return _helper("xor", left, right)
+
+    def expression_UnaryOperation(self, node):
+        operator = py.USub() if node.operator == "-" else py.Not()
+        return py.UnaryOp(op=operator, operand=self.expression(node.operand))
+
+    def expression_Conditional(self, node):
+        return py.IfExp(test=self.expression(node.condition), body=self.expression(node.if_true),
+                        orelse=self.expression(node.if_false))
+
+    def expression_MemberAccess(self, node):
+        member = self.ring_member(node)
+        if member is not None:
+            return _name(member[1])
+        value = self.expression(node.object)
+        name = node.member
+        if name in SIZE_PROPERTIES and name not in self.generator.field_names and name not in self.generator.property_names:
+            return _helper("len", value)
+        return py.Attribute(value=value, attr=name, ctx=py.Load())
+
+    def expression_FunctionCall(self, node):
+        function = node.function
+        arguments = [self.expression(argument) for argument in node.arguments]
+        if isinstance(function, MemberAccess) and self.ring_member(function) is None:
+            method = py.Attribute(value=self.expression(function.object), attr=function.member, ctx=py.Load())
+            # Parameterless methods are properties
+            if not arguments and function.member in self.generator.property_names:
+                return method
+            return _call(method, arguments)
+        if isinstance(function, Variable) and self.resolve(function.name)[0] == 'method':
+            method = self.field(function.name)
+            if not arguments and function.name in self.generator.property_names:
+                return method
+            return _call(method, arguments)
+        return _call(self.expression(function), arguments)
+
+    def expression_ObjectCreation(self, node):
+        kind, name = self.resolve(node.group)
+        if kind != 'value' or name not in {group.python_name for group in self.generator.groups}:
+            raise ValueError(f"'{node.group}' is not a group")
+        return _call(_name(name), [self.expression(argument) for argument in node.arguments or []])
+
+def python_module(ast):
+    """The Python module AST for a Narya AST; py.unparse shows the generated source."""
+    return PythonGenerator().generate(ast)
+
+def compile_ast(ast, filename="<narya>"):
+    return compile(python_module(ast), filename, "exec")
+
+def cache_path(path):
+    """Where the code object for a source file is cached, next to it like a .pyc file."""
+    directory, filename = os.path.split(os.path.abspath(path))
+    return os.path.join(directory, "__pycache__", f"{os.path.splitext(filename)[0]}.{CACHE_TAG}.pyc")
+
+def _read_cache(path, digest):
+    try:
+        with open(path, "rb") as cache_file:
+            data = cache_file.read()
+    except OSError:
+        return None
+    header = CACHE_HEADER + digest
+    if not data.startswith(header):
+        return None
+    try:
+        return marshal.loads(data[len(header):])
+    except (ValueError, EOFError, TypeError):
+        return None
+
+def _write_cache(path, digest, code):
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temporary_path = f"{path}.{os.getpid()}.tmp"
+        with open(temporary_path, "wb") as cache_file:
+            cache_file.write(CACHE_HEADER + digest + marshal.dumps(code))
+        os.replace(temporary_path, path)
+    except OSError:
+        pass
+
+def compile_file(path, compiler=None, use_cache=True):
+    """The code object for a Narya source file, from its cache when the source and frontend still match.
+
+    Only what the default compiler builds is cached; a file compiled with a
+    configured compiler is always compiled again.
+    """
+    from narya_compiler import NaryaCompiler, frontend_version
+    with open(path, "rb") as source_file:
+        source = source_file.read()
+    use_cache = use_cache and compiler is None
+    digest = hashlib.sha256(frontend_version() + source).digest()
+    cached = cache_path(path)
+    if use_cache:
+        code = _read_cache(cached, digest)
+        if code is not None:
+            return code
+    compiler = compiler or NaryaCompiler()
+    code = compile_ast(compiler.compile(source.decode("utf-8")), os.path.abspath(path))
+    if use_cache:
+        _write_cache(cached, digest, code)
+    return code
+
+def run_code(code, output=None):
+    """Run a compiled Narya program; returns its module namespace."""
+    namespace = runtime_namespace(output)
+    try:
+        exec(code, namespace)
+    except (ArithmeticError, TypeError, ValueError, IndexError, KeyError, AttributeError) as e:
+        raise NaryaRuntimeError(f"{type(e).__name__}: {e}") from e
+    return namespace
+
+def run_file(path, output=None, use_cache=True):
+    return run_code(compile_file(path, use_cache=use_cache), output)
+
+# Usage: python narya_python.py program.narya [--source]
+if __name__ == "__main__":
+    if "--source" in sys.argv[2:]:
+        from narya_compiler import NaryaCompiler
+        with open(sys.argv[1]) as source_file:
+            print(py.unparse(python_module(NaryaCompiler().compile(source_file.read()))))
+    else:
+        run_file(sys.argv[1])
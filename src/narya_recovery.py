@@ -0,0 +1,182 @@
+from lark import Token
+from lark.exceptions import UnexpectedCharacters, UnexpectedToken
+from narya_indenter import NaryaIndenter
+from narya_diagnostics import Diagnostic
+
+LAYOUT_TOKENS = ('NEWLINE', 'INDENT', 'DEDENT')
+TOKEN_DESCRIPTIONS = {'NEWLINE': "end of line", 'INDENT': "indent", 'DEDENT': "dedent", '$END': "end of file"}
+
+def describe(token):
+    return TOKEN_DESCRIPTIONS.get(token.type) or repr(str(token))
+
+def token_span(token):
+    """(line, column, end line, end column) of a token as the user sees it."""
+    if token.type in ('INDENT', 'DEDENT'):
+        # Layout tokens borrow the NEWLINE's position; point at the indented line
+        return token.end_line, 1, token.end_line, token.end_column
+    if token.type == 'NEWLINE':
+        return token.line, token.column, token.line, token.column + 1
+    return token.line, token.column, token.end_line, token.end_column
+
+class RecoveringParser:
+    """Parses with a LALR Lark parser, reporting every syntax error instead of stopping at the first.
+
+    On an error the parser state is unwound to the nearest point where a
+    statement can start, input is skipped to the end of the line (NEWLINE,
+    INDENT or DEDENT), and an ERROR token is fed in its place, so the tree
+    gets an error_statement there. Blocks opened by the broken statement
+    are kept as the error statement's body, so errors inside them are
+    still found. Bad characters cost the rest of their line, and the
+    indenter records inconsistent dedents instead of raising.
+    """
+
+    def __init__(self, parser, first_line=1):
+        self.parser = parser
+        self.diagnostics = []
+        # Diagnostics and ERROR tokens carry line numbers counted from first_line
+        self.line_offset = first_line - 1
+        self.indenter = NaryaIndenter(self.diagnostics)
+        self.indenter.first_line = first_line
+        # lex tracks brackets itself, so recovery can forget the ones a
+        # skipped line left open without reaching into the indenter
+        self.indenter.OPEN_PAREN_types = self.indenter.CLOSE_PAREN_types = ()
+
+    @property
+    def token_count(self):
+        return self.indenter.token_count
+
+    def parse(self, text):
+        """The parse tree of text, or None if it could not be completed; see diagnostics."""
+        interactive = self.parser.parse_interactive(text)
+        self.state = interactive.parser_state
+        self.states = self.state.parse_conf.states
+        # PostLexConnector -> ContextualLexer; the indenter is this parser's own
+        lexer = interactive.lexer_thread.lexer.lexer
+        self.tokens = self.indenter.process(self.lex(lexer, interactive.lexer_thread.state))
+        self.pending = []
+        self.depth = 0
+        self.last = None
+        self.failed = None
+        while True:
+            token = self.next_token()
+            if token is None:
+                return self.finish()
+            try:
+                self.state.feed_token(token)
+            except UnexpectedToken as e:
+                self.recover(token, e)
+
+    def next_token(self):
+        if self.pending:
+            return self.pending.pop()
+        token = next(self.tokens, None)
+        if token is not None:
+            self.last = token
+        return token
+
+    def lex(self, lexer, lexer_state):
+        # ContextualLexer.lex, except that a bad character skips the rest of its line
+        while True:
+            try:
+                token = lexer.lexers[self.state.position].next_token(lexer_state, self.state)
+            except EOFError:
+                return
+            except UnexpectedCharacters as e:
+                try:
+                    # A terminal of another context; the parser reports it
+                    token = lexer.root_lexer.next_token(lexer_state, self.state)
+                except UnexpectedCharacters:
+                    self.report(f"Unexpected character {e.char!r}", e.line, e.column, e.line, e.column + 1)
+                    text = lexer_state.text.text
+                    start = lexer_state.line_ctr.char_pos
+                    end = text.find("\n", start)
+                    lexer_state.line_ctr.feed(text[start:len(text) if end < 0 else end])
+                    continue
+            if token.type in NaryaIndenter.OPEN_PAREN_types:
+                self.depth += 1
+            elif token.type in NaryaIndenter.CLOSE_PAREN_types:
+                if not self.depth:
+                    self.report(f"Unmatched {describe(token)}", *token_span(token))
+                    continue
+                self.depth -= 1
+            elif token.type == NaryaIndenter.NL_type and self.depth:
+                # Line breaks inside brackets carry no layout
+                continue
+            yield token
+
+    def report(self, message, line, column, end_line, end_column):
+        line += self.line_offset
+        # One diagnostic per line; later errors on it are usually fallout of the first
+        if self.diagnostics and self.diagnostics[-1].line == line:
+            return
+        self.diagnostics.append(Diagnostic(message, line=line, column=column,
+                                           end_line=end_line + self.line_offset, end_column=end_column))
+
+    def recover(self, token, error):
+        if token is self.failed:
+            # Recovery already ran at this token and it still does not fit; drop it
+            return
+        self.failed = token
+        message = f"Unexpected {describe(token)}"
+        expected = sorted(name for name in error.expected if name not in ('ERROR', '$END'))
+        if 0 < len(expected) <= 4:
+            message += f", expected {' or '.join(expected)}"
+        line, column, end_line, end_column = token_span(token)
+        self.report(message, line, column, end_line, end_column)
+        error = Token('ERROR', message, line=line + self.line_offset, column=column,
+                      end_line=end_line + self.line_offset, end_column=end_column)
+
+        indents = self.unwind()
+        # Skip the rest of the line; brackets left open by it no longer count
+        self.depth = 0
+        while token is not None and token.type not in LAYOUT_TOKENS:
+            token = self.next_token()
+        anchor = token or self.last
+        self.state.feed_token(error)
+        for indent in indents:
+            self.state.feed_token(Token.new_borrow_pos('NEWLINE', "\n", indent))
+            self.state.feed_token(indent)
+            self.state.feed_token(error)
+        if token is not None and token.type == 'NEWLINE':
+            self.state.feed_token(token)
+            return
+        self.state.feed_token(Token.new_borrow_pos('NEWLINE', "\n", anchor))
+        if token is None:
+            self.pending.extend(Token.new_borrow_pos('DEDENT', '', anchor) for _ in indents)
+        else:
+            self.pending.append(token)
+
+    def unwind(self):
+        """Pop parser states until an ERROR token fits; returns the INDENTs popped, outermost first."""
+        probe = Token('ERROR', '')
+        indents = []
+        while len(self.state.state_stack) > 1:
+            if 'ERROR' in self.states[self.state.position]:
+                trial = self.state.copy(deepcopy_values=False)
+                try:
+                    trial.feed_token(probe)
+                    break
+                except UnexpectedToken:
+                    pass
+            self.state.state_stack.pop()
+            value = self.state.value_stack.pop()
+            if isinstance(value, Token) and value.type == 'INDENT':
+                indents.append(value)
+        indents.reverse()
+        return indents
+
+    def finish(self):
+        end = Token.new_borrow_pos('$END', '', self.last) if self.last else Token('$END', '', 0, 1, 1)
+        try:
+            return self.state.feed_token(end, True)
+        except UnexpectedToken as e:
+            self.recover(end, e)
+        while self.pending:
+            try:
+                self.state.feed_token(self.pending.pop())
+            except UnexpectedToken:
+                return None
+        try:
+            return self.state.feed_token(end, True)
+        except UnexpectedToken:
+            return None
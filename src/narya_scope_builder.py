@@ -0,0 +1,123 @@
+from lark import Tree
+from narya_ast import *
+from narya_symbol_table import SymbolTable, ScopeType
+
+class ScopeBuilder:
+    """Builds the scope tree and symbols in one top-down pass over a finished AST."""
+
+    def __init__(self, symbol_table=None):
+        self.symbol_table = symbol_table or SymbolTable()
+
+    def build(self, ast):
+        self.visit(ast)
+        return self.symbol_table
+
+    def visit(self, node):
+        if isinstance(node, list):
+            for item in node:
+                self.visit(item)
+        elif isinstance(node, Tree):
+            self.visit(node.children)
+        elif isinstance(node, Ast):
+            method = getattr(self, f'visit_{type(node).__name__}', self.generic_visit)
+            method(node)
+
+    def visit_scoped(self, body, name, scope_type, is_dangerous=False):
+        self.symbol_table.enter_scope(name, scope_type, is_dangerous)
+        self.visit(body)
+        self.symbol_table.exit_scope()
+
+    def visit_Ring(self, node):
+        self.visit_scoped(node.body, node.name, ScopeType.RING)
+
+    def visit_GroupDeclaration(self, node):
+        if not node.name:
+            self.visit(node.body)
+            return
+        self.symbol_table.add_symbol(node.name, TypeExpression(node.name), "group")
+        self.visit_scoped(node.body, node.name, ScopeType.GROUP)
+
+    def visit_FunctionDeclaration(self, node):
+        if node.name and node.return_type:
+            self.symbol_table.add_symbol(node.name, node.return_type, "function", node.access_modifier)
+        self.symbol_table.enter_scope(node.name, ScopeType.FUNCTION)
+        for param in node.parameters:
+            self.symbol_table.add_symbol(param.name, param.type, "parameter")
+        self.visit(node.body)
+        self.symbol_table.exit_scope()
+
+    def visit_AnonymousFunction(self, node):
+        self.symbol_table.enter_scope("", ScopeType.ANONYMOUS)
+        for param in node.parameters:
+            self.symbol_table.add_symbol(param.name, param.type, "parameter")
+        self.visit(node.body)
+        self.symbol_table.exit_scope()
+
+    def visit_VariableDeclaration(self, node):
+        if node.name and node.type:
+            self.symbol_table.add_symbol(node.name, node.type, "variable")
+        self.visit(node.initializer)
+
+    def visit_DoBlock(self, node):
+        self.visit_scoped(node.body, "do", ScopeType.CONTROL_FLOW)
+
+    def visit_DoWhileStatement(self, node):
+        self.visit_scoped(node.body, "do", ScopeType.CONTROL_FLOW)
+        self.visit(node.condition)
+
+    def visit_IfStatement(self, node):
+        self.visit(node.condition)
+        self.visit_scoped(node.if_body, "if", ScopeType.CONTROL_FLOW)
+        if node.else_body:
+            self.visit_scoped(node.else_body, "else", ScopeType.CONTROL_FLOW)
+
+    def visit_WhileStatement(self, node):
+        self.visit(node.condition)
+        self.visit_scoped(node.body, "while", ScopeType.CONTROL_FLOW)
+
+    def visit_ForStatement(self, node):
+        self.visit(node.start)
+        self.visit(node.end)
+        self.symbol_table.enter_scope("for", ScopeType.CONTROL_FLOW)
+        self.symbol_table.add_symbol(node.variable, TypeExpression("int"), "loop_variable")  # Assuming int type for loop variable
+        self.visit(node.body)
+        self.symbol_table.exit_scope()
+
+    def visit_ForeachStatement(self, node):
+        self.visit(node.iterable)
+        self.symbol_table.enter_scope("foreach", ScopeType.CONTROL_FLOW)
+        self.symbol_table.add_symbol(node.variable, TypeExpression("any"), "loop_variable")  # Using 'any' as we don't know the exact type
+        self.visit(node.body)
+        self.symbol_table.exit_scope()
+
+    def visit_MatchStatement(self, node):
+        self.visit(node.subject)
+        for case in node.cases:
+            self.visit_scoped(case.body, "case", ScopeType.CONTROL_FLOW)
+
+    def visit_AnonymousScope(self, node):
+        self.visit_scoped(node.body, "", ScopeType.ANONYMOUS)
+
+    def visit_DangerousScope(self, node):
+        if isinstance(node.body, AnonymousScope):
+            # The anonymous scope itself is the dangerous one
+            self.visit_scoped(node.body.body, "", ScopeType.ANONYMOUS, is_dangerous=True)
+        else:
+            was_dangerous = self.symbol_table.current_scope.is_dangerous
+            self.symbol_table.set_dangerous(True)
+            self.visit(node.body)
+            self.symbol_table.set_dangerous(was_dangerous)
+
+    def visit_UsingStatement(self, node):
+        self.symbol_table.current_scope.imports.append(node.name)
+
+    def visit_WithStatement(self, node):
+        self.symbol_table.current_scope.imports.append(node.qualified_name)
+
+    def visit_InStatement(self, node):
+        self.symbol_table.current_scope.imports.append(node.qualified_name)
+
+    def generic_visit(self, node):
+        for _, value in node.iter_fields():
+            if isinstance(value, (list, Ast, Tree)):
+                self.visit(value)
@@ -0,0 +1,453 @@
+import os
+import pickle
+from narya_ast import *
+from narya_diagnostics import Diagnostic, CompileErrors
+
+# Built-in types of the TYPE terminal; anything else must name a group
+PRIMITIVE_TYPES = frozenset(("num", "int", "big int", "uint", "big uint", "float", "big float",
+                             "text", "char", "string", "bool", "byte"))
+TEXT_TYPES = frozenset(("text", "char", "string"))
+# Units each worker needs before starting worker processes pays off; a
+# unit checks in well under a millisecond, a pool takes hundreds to start
+UNITS_PER_WORKER = 4096
+
+# Pass-two state of each worker process: the index, loaded once from shared
+# memory, and the units, inherited when workers are forked
+_worker_index = None
+_worker_units = None
+
+class SemanticError(CompileErrors):
+    pass
+
+class Declaration:
+    __slots__ = ('kind', 'type', 'arity')
+
+    def __init__(self, kind, type=None, arity=None):
+        # kind is "variable", "function", "group" or "ring"
+        self.kind = kind
+        self.type = type
+        self.arity = arity
+
+class DeclarationIndex:
+    """Everything rings and groups declare, by the qualified name of the declaring scope.
+
+    Built by pass one without entering function bodies. Pass two only reads
+    it, so workers can share a single snapshot.
+    """
+
+    def __init__(self):
+        self.scopes = {}
+        # Qualified group name -> qualified name of its parent group
+        self.parents = {}
+        # Qualified group name -> number of constructor parameters
+        self.constructors = {}
+
+    def lookup(self, scope, name):
+        """The Declaration a name refers to from inside scope, or None."""
+        while scope:
+            group = scope
+            while group is not None:
+                declaration = self.scopes[group].get(name)
+                if declaration is not None:
+                    return declaration
+                group = self.parents.get(group)
+            scope = scope.rpartition(".")[0]
+        if name in self.scopes:
+            return Declaration("ring")
+        return None
+
+    def group_scope(self, scope, name):
+        """Qualified name of the group a name refers to from inside scope, or None."""
+        while scope:
+            declaration = self.scopes[scope].get(name)
+            if declaration is not None and declaration.kind == "group":
+                return f"{scope}.{name}"
+            scope = scope.rpartition(".")[0]
+        return None
+
+    def constructor_arity(self, group):
+        while group is not None:
+            if group in self.constructors:
+                return self.constructors[group]
+            group = self.parents.get(group)
+        return None
+
+class Unit:
+    """The statements of one Ring or GroupDeclaration body, without nested group bodies."""
+    __slots__ = ('scope', 'statements')
+
+    def __init__(self, scope):
+        self.scope = scope
+        self.statements = []
+
+# Pass one
+
+def collect_declarations(ast):
+    """Build the DeclarationIndex and split the program into units for pass two.
+
+    Returns (index, units, diagnostics); units are in source order.
+    """
+    index = DeclarationIndex()
+    units = []
+    diagnostics = []
+    parents = []
+    for ring in ast.statements:
+        if not isinstance(ring, Ring):
+            continue
+        index.scopes.setdefault(ring.name, {})
+        unit = Unit(ring.name)
+        units.append(unit)
+        _declare(ring.body.statements, ring.name, unit, index, units, parents, diagnostics)
+
+    for group, parent, enclosing in parents:
+        parent_scope = index.group_scope(enclosing, parent)
+        if parent_scope is None:
+            diagnostics.append(Diagnostic(f"Unknown parent group '{parent}'", group))
+        else:
+            index.parents[group] = parent_scope
+    for group, _, _ in parents:
+        seen = {group}
+        current = index.parents.get(group)
+        while current is not None:
+            if current in seen:
+                diagnostics.append(Diagnostic("Group derives from itself", group))
+                index.parents.pop(group)
+                break
+            seen.add(current)
+            current = index.parents.get(current)
+    return index, units, diagnostics
+
+def _declare(statements, scope, unit, index, units, parents, diagnostics):
+    members = index.scopes[scope]
+    group_name = scope.rpartition(".")[2] if "." in scope else None
+    for statement in statements:
+        if isinstance(statement, GroupDeclaration) and not statement.name:
+            _declare(statement.body.statements, scope, unit, index, units, parents, diagnostics)
+            continue
+        if isinstance(statement, GroupDeclaration):
+            _add(members, statement.name, Declaration("group"), scope, diagnostics)
+            group = f"{scope}.{statement.name}"
+            index.scopes.setdefault(group, {})
+            if statement.parent:
+                parents.append((group, statement.parent, scope))
+            group_unit = Unit(group)
+            units.append(group_unit)
+            _declare(statement.body.statements, group, group_unit, index, units, parents, diagnostics)
+            continue
+        if isinstance(statement, FunctionDeclaration):
+            if statement.name == group_name and statement.return_type is None:
+                index.constructors[scope] = len(statement.parameters)
+            else:
+                declaration = Declaration("function", statement.return_type, len(statement.parameters))
+                _add(members, statement.name, declaration, scope, diagnostics)
+        elif isinstance(statement, VariableDeclaration):
+            _add(members, statement.name, Declaration("variable", statement.type), scope, diagnostics)
+        unit.statements.append(statement)
+
+def _add(members, name, declaration, scope, diagnostics):
+    if name in members:
+        diagnostics.append(Diagnostic(f"'{name}' is already declared", scope))
+        return
+    members[name] = declaration
+
+# Pass two
+
+class BodyChecker:
+    """Resolves names and checks calls and literal types in one unit against the index."""
+
+    def __init__(self, index, unit):
+        self.index = index
+        self.scope = unit.scope
+        self.where = unit.scope
+        # Innermost-last local scopes, name -> declared type
+        self.locals = []
+        self.loops = 0
+        self.diagnostics = []
+
+    def check(self, statements):
+        self.visit(statements)
+        return self.diagnostics
+
+    def report(self, message):
+        self.diagnostics.append(Diagnostic(message, self.where))
+
+    def visit(self, node):
+        if isinstance(node, list):
+            for item in node:
+                self.visit(item)
+        elif isinstance(node, Ast):
+            method = getattr(self, f'visit_{type(node).__name__}', self.generic_visit)
+            method(node)
+
+    def generic_visit(self, node):
+        for _, value in node.iter_fields():
+            if isinstance(value, (list, Ast)):
+                self.visit(value)
+
+    def visit_block(self, statements, variables=None):
+        scope = dict(variables or {})
+        for statement in statements:
+            # Like the symbol table, a local is visible throughout its block
+            if isinstance(statement, DangerousScope) and not isinstance(statement.body, AnonymousScope):
+                statement = statement.body
+            if isinstance(statement, VariableDeclaration):
+                scope[statement.name] = statement.type
+        self.locals.append(scope)
+        self.visit(statements)
+        self.locals.pop()
+
+    def visit_Suite(self, node):
+        self.visit_block(node.statements)
+
+    def lookup(self, name):
+        for scope in reversed(self.locals):
+            if name in scope:
+                return Declaration("variable", scope[name])
+        return self.index.lookup(self.scope, name)
+
+    def resolve(self, name):
+        declaration = self.lookup(name)
+        if declaration is None:
+            self.report(f"Unknown name '{name}'")
+        return declaration
+
+    def check_type(self, type):
+        if type is None:
+            return
+        if isinstance(type, CollectionType):
+            self.check_type(type.value_type)
+            self.check_type(type.key_type)
+        elif type.base_type not in PRIMITIVE_TYPES and self.index.group_scope(self.scope, type.base_type) is None:
+            self.report(f"Unknown type '{type.base_type}'")
+
+    def check_value(self, type, value, name):
+        # Numbers and bools print as text, but text never becomes a number or bool
+        if (type is not None and type.base_type in PRIMITIVE_TYPES and type.base_type not in TEXT_TYPES
+                and not isinstance(type, CollectionType) and isinstance(value, (String, InterpolatedString))):
+            self.report(f"Cannot assign text to {type} '{name}'")
+
+    def check_arity(self, declaration, name, arguments):
+        if declaration is not None and declaration.kind == "function" and declaration.arity != len(arguments):
+            self.report(f"'{name}' takes {declaration.arity} arguments, {len(arguments)} given")
+
+    def check_construction(self, group, arguments):
+        group_scope = self.index.group_scope(self.scope, group)
+        if group_scope is None:
+            self.report(f"'{group}' is not a group")
+            return
+        arity = self.index.constructor_arity(group_scope)
+        # Groups without a matching constructor can still be created without arguments
+        if arguments and arity != len(arguments):
+            self.report(f"'{group}' has no constructor taking {len(arguments)} arguments")
+
+    # Declarations
+
+    def visit_FunctionDeclaration(self, node):
+        where, loops = self.where, self.loops
+        self.where, self.loops = f"{self.scope}.{node.name}", 0
+        self.check_type(node.return_type)
+        for parameter in node.parameters:
+            self.check_type(parameter.type)
+        self.visit_block(node.body.statements, {parameter.name: parameter.type for parameter in node.parameters})
+        self.where, self.loops = where, loops
+
+    def visit_AnonymousFunction(self, node):
+        loops, self.loops = self.loops, 0
+        self.check_type(node.return_type)
+        for parameter in node.parameters:
+            self.check_type(parameter.type)
+        self.visit_block(node.body.statements, {parameter.name: parameter.type for parameter in node.parameters})
+        self.loops = loops
+
+    def visit_VariableDeclaration(self, node):
+        self.check_type(node.type)
+        self.visit(node.initializer)
+        self.check_value(node.type, node.initializer, node.name)
+
+    def visit_GroupDeclaration(self, node):
+        self.report(f"Group '{node.name}' can only be declared in a ring or group")
+
+    # Statements
+
+    def visit_BinaryOperation(self, node):
+        if node.operator != "=" or not isinstance(node.left, Variable):
+            self.generic_visit(node)
+            return
+        declaration = self.lookup(node.left.name)
+        if declaration is None:
+            # An assignment to an unknown name on its own is a comparison the backends reject too
+            self.report(f"Unknown name '{node.left.name}'")
+        elif declaration.kind != "variable":
+            self.report(f"Cannot assign to {declaration.kind} '{node.left.name}'")
+        else:
+            self.check_value(declaration.type, node.right, node.left.name)
+        self.visit(node.right)
+
+    def visit_loop(self, body, variables=None):
+        self.loops += 1
+        self.visit_block(body.statements, variables)
+        self.loops -= 1
+
+    def visit_WhileStatement(self, node):
+        self.visit(node.condition)
+        self.visit_loop(node.body)
+
+    def visit_DoWhileStatement(self, node):
+        self.visit_loop(node.body)
+        self.visit(node.condition)
+
+    def visit_ForStatement(self, node):
+        variables = {node.variable: TypeExpression("int")}
+        self.visit(node.start)
+        # The backends bind the loop variable before evaluating the end
+        self.locals.append(variables)
+        self.visit(node.end)
+        self.locals.pop()
+        self.visit_loop(node.body, variables)
+
+    def visit_ForeachStatement(self, node):
+        self.visit(node.iterable)
+        self.visit_loop(node.body, {node.variable: None})
+
+    def visit_SkipStatement(self, node):
+        if not self.loops:
+            self.report("'skip' outside a loop")
+
+    def visit_ExitStatement(self, node):
+        if not self.loops:
+            self.report("'exit' outside a loop")
+
+    def visit_UsingStatement(self, node):
+        if node.name not in self.index.scopes:
+            self.report(f"Unknown ring '{node.name}'")
+
+    def visit_WithStatement(self, node):
+        self.check_import(node.qualified_name)
+
+    def visit_InStatement(self, node):
+        self.check_import(node.qualified_name)
+
+    def check_import(self, qualified_name):
+        owner, _, name = qualified_name.rpartition(".")
+        if qualified_name not in self.index.scopes and name not in self.index.scopes.get(owner, {}):
+            self.report(f"Unknown name '{qualified_name}'")
+
+    # Expressions
+
+    def visit_Variable(self, node):
+        self.resolve(node.name)
+
+    def visit_StringInterpolation(self, node):
+        self.resolve(node.identifier)
+
+    def visit_MemberAccess(self, node):
+        self.ring_member(node)
+
+    def ring_member(self, node):
+        """The Declaration behind `Ring.member`, or None when node is not such an access."""
+        if not isinstance(node.object, Variable):
+            self.visit(node.object)
+            return None
+        declaration = self.resolve(node.object.name)
+        if declaration is None or declaration.kind != "ring":
+            return None
+        member = self.index.scopes[node.object.name].get(node.member)
+        if member is None:
+            self.report(f"Ring '{node.object.name}' has no member '{node.member}'")
+        return member
+
+    def visit_FunctionCall(self, node):
+        if isinstance(node.function, Variable):
+            name = node.function.name
+            declaration = self.resolve(name)
+            if declaration is not None and declaration.kind == "group":
+                self.check_construction(name, node.arguments)
+            else:
+                self.check_arity(declaration, name, node.arguments)
+        elif isinstance(node.function, MemberAccess):
+            self.check_arity(self.ring_member(node.function), node.function.member, node.arguments)
+        else:
+            self.visit(node.function)
+        self.visit(node.arguments)
+
+    def visit_ObjectCreation(self, node):
+        self.check_construction(node.group, node.arguments)
+        self.visit(node.arguments)
+
+def check_unit(index, unit):
+    return BodyChecker(index, unit).check(unit.statements)
+
+def _start_worker(name, size, units):
+    global _worker_index, _worker_units
+    from multiprocessing import shared_memory
+    memory = shared_memory.SharedMemory(name=name)
+    view = memory.buf[:size]
+    try:
+        _worker_index = pickle.loads(view)
+    finally:
+        view.release()
+        memory.close()
+    if units is not None:
+        _worker_units = units
+
+def _check_in_worker(start, stop):
+    return [check_unit(_worker_index, unit) for unit in _worker_units[start:stop]]
+
+class SharedIndex:
+    """A DeclarationIndex pickled once into a shared memory segment for the workers to load.
+
+    The segment only transports the pickle: every worker unpickles its own
+    copy of the index, so the index is pickled once rather than per worker,
+    but no memory is shared.
+    """
+
+    def __init__(self, index):
+        from multiprocessing import shared_memory
+        data = pickle.dumps(index, pickle.HIGHEST_PROTOCOL)
+        self.size = len(data)
+        self.memory = shared_memory.SharedMemory(create=True, size=max(1, self.size))
+        self.memory.buf[:self.size] = data
+        self.name = self.memory.name
+
+    def close(self):
+        self.memory.close()
+        self.memory.unlink()
+
+def check_units(index, units, workers=1):
+    """Run pass two over every unit, returning one diagnostics list per unit in order.
+
+    Each unit is checked on its own against the read-only index, so the
+    result is the same whatever the worker count. workers=1 checks in this
+    process; workers=None uses the CPUs, but only as many workers as get
+    UNITS_PER_WORKER units each.
+    """
+    global _worker_units
+    if workers is None:
+        workers = min(os.cpu_count() or 1, len(units) // UNITS_PER_WORKER) or 1
+    if workers == 1 or len(units) <= 1:
+        return [check_unit(index, unit) for unit in units]
+    # The process machinery is only imported for parallel checks
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+    # Forked workers inherit the units; pickling the bodies costs more than checking them
+    forking = "fork" in multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context("fork") if forking else None
+    chunk = max(1, len(units) // (workers * 4))
+    starts = range(0, len(units), chunk)
+    snapshot = SharedIndex(index)
+    _worker_units = units
+    try:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_start_worker,
+                                 initargs=(snapshot.name, snapshot.size, None if forking else units)) as executor:
+            chunks = executor.map(_check_in_worker, starts, [start + chunk for start in starts])
+            return [diagnostics for result in chunks for diagnostics in result]
+    finally:
+        _worker_units = None
+        snapshot.close()
+
+def analyze(ast, workers=1):
+    """Check a program in two passes and return its diagnostics in source order; see check_units for workers."""
+    index, units, diagnostics = collect_declarations(ast)
+    for unit_diagnostics in check_units(index, units, workers):
+        diagnostics.extend(unit_diagnostics)
+    return diagnostics
@@ -0,0 +1,340 @@
+import os
+import mmap
+import struct
+import narya_ast
+from narya_ast import Ast, TypeExpression, CollectionType, Program, Suite, Ring, GroupDeclaration, FunctionDeclaration
+
+# Layout, all integers little-endian:
+#   magic, version, padding                                  16 bytes
+#   string, node, class and declaration counts              4 x uint32
+#   string offsets                                          uint32[strings + 1]
+#   node offsets                                            uint32[nodes + 1]
+#   class signatures, as string indices                     uint32[classes]
+#   declarations, (name string, first node, node) triples   uint32[declarations * 3]
+#   string bytes, UTF-8
+#   node records
+# A node record is a varint class tag followed by one value per field, with
+# child nodes stored as indices into the node array. Nodes are numbered in
+# post-order, so children come before their parents, the root is the last
+# node, and a subtree is the run of nodes from its first node up to its root
+# (plus any interned types it shares with earlier nodes).
+FORMAT_MAGIC = b"NARYA-AST-BIN"
+FORMAT_VERSION = 1
+HEADER = struct.Struct(f"<{len(FORMAT_MAGIC)}sB{16 - len(FORMAT_MAGIC) - 1}x4I")
+FLOAT = struct.Struct("<d")
+
+NONE, FALSE, TRUE, INT, FLOAT_VALUE, STRING, NODE, LIST, TUPLE = range(9)
+
+# Types are interned, so they are rebuilt through their constructors; these
+# are the constructors' arguments, in order
+TYPE_ARGUMENTS = {
+    TypeExpression: TypeExpression._fields,
+    CollectionType: ('base_type', 'value_type', 'key_type', 'is_nullable', 'is_mutable'),
+}
+DECLARATIONS = (Ring, GroupDeclaration, FunctionDeclaration)
+
+def node_fields(cls):
+    return TYPE_ARGUMENTS.get(cls) or cls._fields
+
+def _signature(cls):
+    return f"{cls.__name__}:{','.join(node_fields(cls))}"
+
+def _read_varint(view, position):
+    byte = view[position]
+    position += 1
+    result = byte & 0x7F
+    shift = 7
+    while byte & 0x80:
+        byte = view[position]
+        position += 1
+        result |= (byte & 0x7F) << shift
+        shift += 7
+    return result, position
+
+def iter_declarations(ast):
+    """Yield (qualified name, node) for every ring, group and function, as find_declaration names them."""
+    pending = [("", ast.statements)] if isinstance(ast, Program) else []
+    while pending:
+        prefix, statements = pending.pop()
+        for statement in statements:
+            if isinstance(statement, DECLARATIONS):
+                qualified_name = prefix + statement.name
+                yield qualified_name, statement
+                if isinstance(statement.body, Suite):
+                    pending.append((qualified_name + ".", statement.body.statements))
+
+class AstWriter:
+    def __init__(self):
+        self.strings = {}
+        # Class -> tag, and the string index of each tag's signature
+        self.classes = {}
+        self.signatures = []
+        self.indices = {}
+        self.nodes = []
+        self.records = bytearray()
+        self.offsets = []
+
+    def serialize(self, ast):
+        # Iterative post-order walk; deep trees would overflow a recursive one
+        first_nodes = {}
+        stack = [(ast, False)]
+        while stack:
+            node, expanded = stack.pop()
+            if id(node) in self.indices:
+                continue
+            if expanded:
+                # By identity: interned types are stored once however often they are used
+                self.indices[id(node)] = len(self.nodes)
+                self.nodes.append(node)
+                self.offsets.append(len(self.records))
+                self.write_record(node)
+                continue
+            if isinstance(node, DECLARATIONS):
+                first_nodes[id(node)] = len(self.nodes)
+            stack.append((node, True))
+            stack.extend((child, False) for child in reversed(list(self.children(node))))
+        self.offsets.append(len(self.records))
+        declarations = [(self.string_index(name), first_nodes[id(node)], self.indices[id(node)])
+                        for name, node in iter_declarations(ast)]
+
+        strings = [string.encode("utf-8") for string in self.strings]
+        string_offsets = [0]
+        for data in strings:
+            string_offsets.append(string_offsets[-1] + len(data))
+        tables = [*string_offsets, *self.offsets, *self.signatures]
+        for declaration in declarations:
+            tables += declaration
+        header = HEADER.pack(FORMAT_MAGIC, FORMAT_VERSION, len(strings), len(self.nodes), len(self.classes),
+                             len(declarations))
+        return b"".join((header, struct.pack(f"<{len(tables)}I", *tables), *strings, self.records))
+
+    def children(self, node, values=None):
+        for value in values if values is not None else (getattr(node, name) for name in node_fields(type(node))):
+            if isinstance(value, Ast):
+                yield value
+            elif isinstance(value, (list, tuple)):
+                yield from self.children(None, value)
+
+    def string_index(self, string):
+        index = self.strings.get(string)
+        if index is None:
+            index = self.strings[string] = len(self.strings)
+        return index
+
+    def write_record(self, node):
+        cls = type(node)
+        tag = self.classes.get(cls)
+        if tag is None:
+            tag = self.classes[cls] = len(self.classes)
+            self.signatures.append(self.string_index(_signature(cls)))
+        self.write_varint(tag)
+        for name in node_fields(cls):
+            self.write_value(getattr(node, name))
+
+    def write_value(self, value):
+        records = self.records
+        if value is None:
+            records.append(NONE)
+        elif value is True:
+            records.append(TRUE)
+        elif value is False:
+            records.append(FALSE)
+        elif isinstance(value, str):
+            records.append(STRING)
+            self.write_varint(self.string_index(value))
+        elif isinstance(value, Ast):
+            records.append(NODE)
+            self.write_varint(self.indices[id(value)])
+        elif isinstance(value, int):
+            records.append(INT)
+            # Zigzag, so small negative numbers stay short
+            self.write_varint(value * 2 if value >= 0 else -value * 2 - 1)
+        elif isinstance(value, float):
+            records.append(FLOAT_VALUE)
+            records += FLOAT.pack(value)
+        elif isinstance(value, (list, tuple)):
+            records.append(LIST if isinstance(value, list) else TUPLE)
+            self.write_varint(len(value))
+            for item in value:
+                self.write_value(item)
+        else:
+            raise TypeError(f"Cannot serialize {type(value).__name__} values")
+
+    def write_varint(self, value):
+        records = self.records
+        while value >= 0x80:
+            records.append((value & 0x7F) | 0x80)
+            value >>= 7
+        records.append(value)
+
+def serialize(ast):
+    """Encode an AST, or any subtree, in the compact binary format."""
+    return AstWriter().serialize(ast)
+
+def write_ast(ast, path):
+    data = serialize(ast)
+    temporary_path = f"{path}.{os.getpid()}.tmp"
+    with open(temporary_path, "wb") as output:
+        output.write(data)
+    os.replace(temporary_path, path)
+    return len(data)
+
+class AstReader:
+    """Decodes nodes from a serialized AST in place, one subtree at a time.
+
+    buffer can be bytes or an mmap; it is only read through memoryviews.
+    Each node is decoded at most once per reader and the result is reused,
+    so asking for a subtree again returns the same objects.
+    """
+
+    def __init__(self, buffer):
+        self.view = memoryview(buffer)
+        if len(self.view) < HEADER.size:
+            raise ValueError("Not a serialized Narya AST")
+        magic, version, string_count, node_count, class_count, declaration_count = HEADER.unpack_from(self.view)
+        if magic != FORMAT_MAGIC:
+            raise ValueError("Not a serialized Narya AST")
+        if version != FORMAT_VERSION:
+            raise ValueError(f"Unsupported AST format version {version}, expected {FORMAT_VERSION}")
+        tables_end = HEADER.size + 4 * (string_count + 1 + node_count + 1 + class_count + 3 * declaration_count)
+        self.tables = self.view[HEADER.size:tables_end].cast("I")
+        self.string_offsets = self.tables[:string_count + 1]
+        self.node_offsets = self.tables[string_count + 1:string_count + node_count + 2]
+        self.strings_base = tables_end
+        self.nodes_base = tables_end + self.string_offsets[string_count]
+        self.string_cache = [None] * string_count
+        self.node_cache = [None] * node_count
+        signatures_start = string_count + node_count + 2
+        self.classes = [self.resolve_class(self.string(index))
+                        for index in self.tables[signatures_start:signatures_start + class_count]]
+        self.field_counts = [len(node_fields(cls)) for cls in self.classes]
+        declarations = self.tables[signatures_start + class_count:]
+        # Qualified name -> (first node, node) of each ring, group and function
+        self.declarations = {self.string(declarations[position]): (declarations[position + 1], declarations[position + 2])
+                             for position in range(0, len(declarations), 3)}
+
+    @staticmethod
+    def resolve_class(signature):
+        name = signature.partition(":")[0]
+        cls = getattr(narya_ast, name, None)
+        if not (isinstance(cls, type) and issubclass(cls, Ast)) or _signature(cls) != signature:
+            raise ValueError(f"Serialized node {signature} does not match narya_ast")
+        return cls
+
+    def string(self, index):
+        string = self.string_cache[index]
+        if string is None:
+            start = self.strings_base + self.string_offsets[index]
+            end = self.strings_base + self.string_offsets[index + 1]
+            string = self.string_cache[index] = str(self.view[start:end], "utf-8")
+        return string
+
+    def __len__(self):
+        return len(self.node_cache)
+
+    def root(self):
+        return self.decode_range(0, len(self.node_cache) - 1)
+
+    def declaration(self, qualified_name):
+        """Decode only the ring, group or function declared as e.g. Main.Person."""
+        if qualified_name not in self.declarations:
+            raise ValueError(f"No declaration named '{qualified_name}'")
+        return self.decode_range(*self.declarations[qualified_name])
+
+    def node(self, index):
+        """The node at index with its whole subtree decoded."""
+        node = self.node_cache[index]
+        return node if node is not None else self.decode(index)
+
+    def decode_range(self, first, last):
+        # In order, every child is decoded before its parent needs it
+        cache = self.node_cache
+        for index in range(first, last + 1):
+            if cache[index] is None:
+                self.decode(index)
+        return cache[last]
+
+    def decode(self, index):
+        view = self.view
+        tag, position = _read_varint(view, self.nodes_base + self.node_offsets[index])
+        cls = self.classes[tag]
+        values = []
+        for _ in range(self.field_counts[tag]):
+            value, position = self.read_value(view, position)
+            values.append(value)
+        if cls in TYPE_ARGUMENTS:
+            node = cls(*values)
+        else:
+            node = object.__new__(cls)
+            for name, value in zip(cls._fields, values):
+                setattr(node, name, value)
+        self.node_cache[index] = node
+        return node
+
+    def read_value(self, view, position):
+        tag = view[position]
+        position += 1
+        if tag == STRING:
+            index, position = _read_varint(view, position)
+            return self.string(index), position
+        if tag == NODE:
+            index, position = _read_varint(view, position)
+            # Only a node reached outside decode_range, or a shared type, is missing here
+            node = self.node_cache[index]
+            return (node if node is not None else self.decode(index)), position
+        if tag == NONE:
+            return None, position
+        if tag == TRUE:
+            return True, position
+        if tag == FALSE:
+            return False, position
+        if tag == INT:
+            value, position = _read_varint(view, position)
+            return (value >> 1 if not value & 1 else -(value >> 1) - 1), position
+        if tag == FLOAT_VALUE:
+            return FLOAT.unpack_from(view, position)[0], position + FLOAT.size
+        if tag == LIST or tag == TUPLE:
+            count, position = _read_varint(view, position)
+            items = []
+            for _ in range(count):
+                item, position = self.read_value(view, position)
+                items.append(item)
+            return (items if tag == LIST else tuple(items)), position
+        raise ValueError(f"Corrupt AST record: unknown value tag {tag}")
+
+    def release(self):
+        # mmap refuses to close while memoryviews of it are alive
+        self.string_offsets.release()
+        self.node_offsets.release()
+        self.tables.release()
+        self.view.release()
+
+def deserialize(data):
+    """Decode a whole AST from bytes produced by serialize."""
+    reader = AstReader(data)
+    try:
+        return reader.root()
+    finally:
+        reader.release()
+
+class AstFile(AstReader):
+    """A serialized AST file, memory-mapped and decoded lazily; use as a context manager."""
+
+    def __init__(self, path):
+        with open(path, "rb") as source:
+            self.mapping = mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            super().__init__(self.mapping)
+        except Exception:
+            self.mapping.close()
+            raise
+
+    def close(self):
+        self.release()
+        self.mapping.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,292 @@
+import os
+import sys
+import json
+import time
+import asyncio
+import inspect
+import argparse
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from narya_compiler import NaryaCompiler
+from narya_semantic import analyze
+from narya_diagnostics import CompileErrors
+from narya_build_cache import content_hash, file_exports, file_imports
+from narya_client import DEFAULT_SOCKET_PATH
+
+DEFAULT_MAX_ENTRIES = 4096
+WORKER_MAX_ASTS = 64
+# Requests carry whole sources, so lines can be far longer than asyncio's 64 KiB default
+STREAM_LIMIT = 256 * 1024 * 1024
+
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+INTERNAL_ERROR = -32603
+SERVER_ERROR = -32000
+
+# Warm state of a worker process: its compiler, and the ASTs and symbol tables
+# of recently compiled sources by content hash. ASTs stay in the worker that
+# built them; pickling them back to the server costs more than the compile.
+_worker_compiler = None
+_worker_asts = OrderedDict()
+
+def _start_worker():
+    global _worker_compiler
+    _worker_compiler = NaryaCompiler(recover=True)
+
+def compile_source(code, digest, check=False):
+    """Compile code in a worker process, returning a JSON-ready result dict."""
+    if _worker_compiler is None:
+        _start_worker()
+    result = {"ok": False, "diagnostics": [], "error": None, "exports": {}, "imports": []}
+    diagnostics = []
+    try:
+        compiled = _worker_asts.get(digest)
+        if compiled is None:
+            ast = _worker_compiler.compile(code)
+            compiled = _worker_asts[digest] = (ast, _worker_compiler.symbol_table)
+            if len(_worker_asts) > WORKER_MAX_ASTS:
+                _worker_asts.popitem(last=False)
+        else:
+            _worker_asts.move_to_end(digest)
+        ast, symbol_table = compiled
+        result["exports"] = file_exports(symbol_table)
+        result["imports"] = file_imports(symbol_table)
+        if check:
+            diagnostics = analyze(ast, 1)
+    except CompileErrors as e:
+        diagnostics = e.diagnostics
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+    result["diagnostics"] = [diagnostic.as_dict() for diagnostic in diagnostics]
+    result["ok"] = not diagnostics and result["error"] is None
+    return result
+
+class RequestError(Exception):
+    def __init__(self, code, message):
+        self.code = code
+        super().__init__(message)
+
+class CompileServer:
+    """Answers newline-delimited JSON-RPC 2.0 requests from a warm process pool.
+
+    Results are cached per content hash and check mode. Files are looked up
+    by (mtime_ns, size) first, so an unchanged file is answered without
+    being read, and concurrent requests for the same source share a single
+    compile. JSON-RPC batches are compiled concurrently across the pool.
+    """
+
+    def __init__(self, workers=None, max_entries=DEFAULT_MAX_ENTRIES):
+        self.workers = workers or os.cpu_count() or 1
+        # Spawned rather than forked; this process runs an event loop and holds sockets
+        self.executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"),
+                                            initializer=_start_worker)
+        self.max_entries = max_entries
+        # path -> (mtime_ns, size, content hash)
+        self.files = {}
+        # (content hash, check) -> result
+        self.results = OrderedDict()
+        self.pending = {}
+        self.counters = {"requests": 0, "hits": 0, "compiles": 0}
+        self.started = time.monotonic()
+        self.stopped = asyncio.Event()
+
+    async def warm(self):
+        """Start every worker and load its parser before the first request."""
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(self.executor, os.getpid) for _ in range(self.workers)))
+
+    def close(self):
+        self.executor.shutdown(cancel_futures=True)
+
+    async def rpc_compile(self, path=None, source=None, check=False):
+        if (path is None) == (source is None):
+            raise RequestError(INVALID_PARAMS, "Expected exactly one of path or source")
+        if source is not None:
+            code = source
+            digest = content_hash(source.encode("utf-8"))
+        else:
+            digest, code = self.read(path)
+        key = (digest, bool(check))
+        result = self.results.get(key)
+        if result is not None:
+            self.results.move_to_end(key)
+            self.counters["hits"] += 1
+            return dict(result, cached=True)
+        if code is None:
+            # The file is unchanged but its result was evicted
+            with open(path, "r") as source_file:
+                code = source_file.read()
+        task = self.pending.get(key)
+        if task is None:
+            task = self.pending[key] = asyncio.ensure_future(self.run_compile(key, code))
+        # Shielded so a client hanging up does not cancel a compile others wait on
+        return dict(await asyncio.shield(task), cached=False)
+
+    async def rpc_check(self, path=None, source=None):
+        return await self.rpc_compile(path, source, check=True)
+
+    async def rpc_invalidate(self, path=None):
+        """Forget one file, or with no path every file and cached result."""
+        if path is None:
+            dropped = len(self.files)
+            self.files.clear()
+            self.results.clear()
+            return dropped
+        return int(self.files.pop(path, None) is not None)
+
+    async def rpc_stats(self):
+        return dict(self.counters, files=len(self.files), entries=len(self.results), workers=self.workers,
+                    uptime=round(time.monotonic() - self.started, 3))
+
+    async def rpc_shutdown(self):
+        self.stopped.set()
+        return True
+
+    def read(self, path):
+        """(content hash, source) of a file; source is None when its stat is unchanged."""
+        stat = os.stat(path)
+        state = self.files.get(path)
+        if state is not None and state[:2] == (stat.st_mtime_ns, stat.st_size):
+            return state[2], None
+        with open(path, "rb") as source_file:
+            data = source_file.read()
+        digest = content_hash(data)
+        self.files[path] = (stat.st_mtime_ns, stat.st_size, digest)
+        return digest, data.decode("utf-8")
+
+    async def run_compile(self, key, code):
+        loop = asyncio.get_running_loop()
+        try:
+            result = await loop.run_in_executor(self.executor, compile_source, code, *key)
+        finally:
+            del self.pending[key]
+        self.counters["compiles"] += 1
+        self.results[key] = result
+        if len(self.results) > self.max_entries:
+            self.results.popitem(last=False)
+        return result
+
+    async def handle(self, line):
+        """The response line for one request line, or None if nothing is to be sent."""
+        try:
+            message = json.loads(line)
+        except ValueError as e:
+            response = error_response(None, PARSE_ERROR, f"Parse error: {e}")
+        else:
+            if isinstance(message, list) and message:
+                responses = await asyncio.gather(*(self.handle_request(request) for request in message))
+                response = [response for response in responses if response is not None] or None
+            else:
+                response = await self.handle_request(message)
+        return None if response is None else json.dumps(response).encode("utf-8") + b"\n"
+
+    async def handle_request(self, request):
+        if not isinstance(request, dict) or not isinstance(request.get("method"), str):
+            return error_response(None, INVALID_REQUEST, "Invalid request")
+        self.counters["requests"] += 1
+        request_id = request.get("id")
+        handler = getattr(self, "rpc_" + request["method"], None)
+        params = request.get("params", {})
+        try:
+            if handler is None:
+                raise RequestError(METHOD_NOT_FOUND, f"Unknown method '{request['method']}'")
+            if not isinstance(params, dict):
+                raise RequestError(INVALID_PARAMS, "params must be an object")
+            try:
+                inspect.signature(handler).bind(**params)
+            except TypeError as e:
+                raise RequestError(INVALID_PARAMS, str(e))
+            result = await handler(**params)
+        except RequestError as e:
+            response = error_response(request_id, e.code, str(e))
+        except OSError as e:
+            response = error_response(request_id, SERVER_ERROR, str(e))
+        except Exception as e:
+            response = error_response(request_id, INTERNAL_ERROR, f"{type(e).__name__}: {e}")
+        else:
+            response = {"jsonrpc": "2.0", "id": request_id, "result": result}
+        # Requests without an id are notifications and get no response
+        return response if "id" in request else None
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while not self.stopped.is_set():
+                line = await reader.readline()
+                if not line:
+                    break
+                response = await self.handle(line)
+                if response is not None:
+                    writer.write(response)
+                    await writer.drain()
+        except (ConnectionError, ValueError):
+            # A dropped client, or a line over STREAM_LIMIT
+            pass
+        finally:
+            writer.close()
+
+    async def serve_unix(self, path=DEFAULT_SOCKET_PATH):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        if os.path.exists(path):
+            try:
+                _, writer = await asyncio.open_unix_connection(path)
+            except (ConnectionRefusedError, FileNotFoundError):
+                # Left behind by a server that did not shut down cleanly
+                os.unlink(path)
+            else:
+                writer.close()
+                raise RuntimeError(f"A server is already listening on {path}")
+        await self.warm()
+        server = await asyncio.start_unix_server(self.handle_connection, path, limit=STREAM_LIMIT)
+        try:
+            async with server:
+                await self.stopped.wait()
+        finally:
+            if os.path.exists(path):
+                os.unlink(path)
+
+    async def serve_stdio(self):
+        loop = asyncio.get_running_loop()
+        reader = asyncio.StreamReader(limit=STREAM_LIMIT)
+        await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), sys.stdin)
+        await self.warm()
+        while not self.stopped.is_set():
+            line = await reader.readline()
+            if not line:
+                break
+            response = await self.handle(line)
+            if response is not None:
+                sys.stdout.buffer.write(response)
+                sys.stdout.buffer.flush()
+
+def error_response(request_id, code, message):
+    return {"jsonrpc": "2.0", "id": request_id, "error": {"code": code, "message": message}}
+
+async def serve(args):
+    server = CompileServer(workers=args.jobs, max_entries=args.max_entries)
+    try:
+        if args.stdio:
+            await server.serve_stdio()
+        else:
+            await server.serve_unix(args.socket)
+    finally:
+        server.close()
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description="Run a Narya compile server")
+    transport = arg_parser.add_mutually_exclusive_group()
+    transport.add_argument("--socket", default=DEFAULT_SOCKET_PATH, help="Unix socket to listen on")
+    transport.add_argument("--stdio", action="store_true", help="read requests from stdin instead")
+    arg_parser.add_argument("-j", "--jobs", type=int, default=None, help="worker processes (default: CPU count)")
+    arg_parser.add_argument("--max-entries", type=int, default=DEFAULT_MAX_ENTRIES, help="cached results to keep")
+    args = arg_parser.parse_args(argv)
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,138 @@
+import os
+import json
+import time
+import threading
+from contextlib import contextmanager
+from lark import Tree, Token
+from narya_ast import Ast
+
+def count_nodes(node):
+    count = 0
+    stack = [node]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, list):
+            stack.extend(item)
+        elif isinstance(item, Tree):
+            count += 1
+            stack.extend(item.children)
+        elif isinstance(item, Ast):
+            count += 1
+            stack.extend(value for _, value in item.iter_fields())
+        elif isinstance(item, Token):
+            count += 1
+    return count
+
+class PhaseTiming:
+    def __init__(self, name, start, duration):
+        self.name = name
+        self.start = start
+        self.duration = duration
+
+class CompileStats:
+    """Phase timings, counters and optional profiles collected during one compile.
+
+    Profilers are either "cprofile", which keeps a pstats.Stats per phase in
+    profiles, or a callable taking the phase name and returning a context
+    manager, to plug in a sampling profiler.
+    """
+
+    def __init__(self):
+        self.created = time.perf_counter()
+        self.phases = []
+        self.counters = {}
+        self.profiles = {}
+
+    @contextmanager
+    def phase(self, name, profiler=None):
+        profile = None
+        hook = None
+        if profiler == "cprofile":
+            # Imported on first use; most compiles are not profiled
+            import cProfile
+            profile = cProfile.Profile()
+        elif profiler is not None:
+            hook = profiler(name)
+        start = time.perf_counter()
+        try:
+            if profile is not None:
+                profile.enable()
+            if hook is not None:
+                with hook:
+                    yield
+            else:
+                yield
+        finally:
+            if profile is not None:
+                profile.disable()
+            self.phases.append(PhaseTiming(name, start - self.created, time.perf_counter() - start))
+            if profile is not None:
+                import pstats
+                self.profiles[name] = pstats.Stats(profile)
+
+    def count_parse_tree(self, parse_tree):
+        self.counters["parse_tree_nodes"] = sum(1 for _ in parse_tree.iter_subtrees())
+
+    def count_ast(self, ast):
+        count = 0
+        stack = [ast]
+        while stack:
+            item = stack.pop()
+            if isinstance(item, list):
+                stack.extend(item)
+            elif isinstance(item, Ast):
+                count += 1
+                stack.extend(value for _, value in item.iter_fields())
+        self.counters["ast_nodes"] = count
+
+    def count_symbol_table(self, symbol_table):
+        scopes = symbols = 0
+        stack = [symbol_table.root]
+        while stack:
+            scope = stack.pop()
+            scopes += 1
+            symbols += len(scope.symbols)
+            stack.extend(scope.children)
+        self.counters["scopes"] = scopes
+        self.counters["symbols"] = symbols
+
+    @property
+    def total(self):
+        return sum(phase.duration for phase in self.phases)
+
+    def to_dict(self):
+        return {
+            "phases": {phase.name: phase.duration for phase in self.phases},
+            "total": self.total,
+            "counters": dict(self.counters),
+        }
+
+    def to_json(self, indent=2):
+        return json.dumps(self.to_dict(), indent=indent)
+
+    def to_chrome_trace(self):
+        """Trace Event Format data, viewable in chrome://tracing or Perfetto."""
+        pid, tid = os.getpid(), threading.get_ident()
+        events = [{"name": phase.name, "cat": "narya", "ph": "X", "pid": pid, "tid": tid,
+                   "ts": phase.start * 1e6, "dur": phase.duration * 1e6}
+                  for phase in self.phases]
+        end = max((phase.start + phase.duration for phase in self.phases), default=0)
+        events.append({"name": "counters", "cat": "narya", "ph": "C", "pid": pid, "tid": tid,
+                       "ts": end * 1e6, "args": dict(self.counters)})
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def write_chrome_trace(self, path):
+        with open(path, "w") as trace_file:
+            json.dump(self.to_chrome_trace(), trace_file)
+
+    def dump_profiles(self, directory):
+        """Write one .prof file per profiled phase, for snakeviz or pstats."""
+        os.makedirs(directory, exist_ok=True)
+        for name, profile in self.profiles.items():
+            profile.dump_stats(os.path.join(directory, f"{name}.prof"))
+
+    def summary(self):
+        lines = [f"{phase.name:14} {phase.duration * 1000:10.2f} ms" for phase in self.phases]
+        lines.append(f"{'total':14} {self.total * 1000:10.2f} ms")
+        lines.extend(f"{name:18} {value}" for name, value in self.counters.items())
+        return "\n".join(lines)
@@ -1,5 +1,6 @@
-from typing import Dict, Optional, List
+from typing import Dict, Optional, List, Union
 from enum import Enum, auto
+from narya_ast import TypeExpression
 
 class ScopeType(Enum):
     GLOBAL = auto()
@@ -9,6 +10,9 @@ class ScopeType(Enum):
     CONTROL_FLOW = auto()
     ANONYMOUS = auto()
 
+# Scopes that contribute a segment to qualified names such as Main.Person.Greeting
+DECLARATION_SCOPES = (ScopeType.RING, ScopeType.GROUP, ScopeType.FUNCTION)
+
 
 class ScopeNode:
     def __init__(self, name: str, scope_type: ScopeType, parent: Optional['ScopeNode'] = None, is_dangerous: bool = False):
@@ -16,27 +20,45 @@ class ScopeNode:
         self.scope_type = scope_type
         self.parent = parent
         self.children: List[ScopeNode] = []
+        self.children_by_name: Dict[str, ScopeNode] = {}
         self.symbols: Dict[str, Symbol] = {}
+        self.imports: List[str] = []
         self.is_dangerous = is_dangerous
+        if parent is None:
+            self.qualified_name = ""
+        elif scope_type in DECLARATION_SCOPES and parent.qualified_name:
+            self.qualified_name = f"{parent.qualified_name}.{name}"
+        elif scope_type in DECLARATION_SCOPES:
+            self.qualified_name = name
+        else:
+            self.qualified_name = parent.qualified_name
 
     def add_child(self, name: str, scope_type: ScopeType, is_dangerous: bool = False) -> 'ScopeNode':
         child = ScopeNode(name, scope_type, self, is_dangerous)
         self.children.append(child)
+        self.children_by_name.setdefault(name, child)
         return child
 
 
 class Symbol:
-    def __init__(self, name: str, type: str, kind: str, scope: str):
+    def __init__(self, name: str, type: TypeExpression, kind: str, scope: 'ScopeNode', access_modifier: Optional[str] = None):
         self.name = name
         self.type = type
         self.kind = kind
         self.scope = scope
+        self.access_modifier = access_modifier
         
 class SymbolTable:
     def __init__(self):
         self.root = ScopeNode("global", ScopeType.GLOBAL)
         self.current_scope = self.root
         self.anonymous_counter = 0
+        # Innermost-last stack of visible symbols per name, for O(1) lookup
+        self.bindings: Dict[str, List[Symbol]] = {}
+        # Number of entered scopes currently marked dangerous
+        self.dangerous_depth = 0
+        # Declaration scopes by qualified name; the first declaration wins
+        self.scope_index: Dict[str, ScopeNode] = {"": self.root}
 
     def enter_scope(self, name: str, scope_type: ScopeType, is_dangerous: bool = False):
         if scope_type == ScopeType.RING and self.current_scope.scope_type != ScopeType.GLOBAL:
@@ -45,28 +67,139 @@ class SymbolTable:
             self.anonymous_counter += 1
             name = f"anonymous_{self.anonymous_counter}"
         self.current_scope = self.current_scope.add_child(name, scope_type, is_dangerous)
+        if scope_type in DECLARATION_SCOPES:
+            self.scope_index.setdefault(self.current_scope.qualified_name, self.current_scope)
+        if is_dangerous:
+            self.dangerous_depth += 1
 
     def exit_scope(self):
         if self.current_scope.parent:
+            for name in self.current_scope.symbols:
+                stack = self.bindings[name]
+                stack.pop()
+                if not stack:
+                    del self.bindings[name]
+            if self.current_scope.is_dangerous:
+                self.dangerous_depth -= 1
             self.current_scope = self.current_scope.parent
 
-    def add_symbol(self, name: str, type: str, kind: str):
+    def set_dangerous(self, is_dangerous: bool):
+        """Mark or unmark the current scope as dangerous."""
+        if self.current_scope.is_dangerous != is_dangerous:
+            self.dangerous_depth += 1 if is_dangerous else -1
+            self.current_scope.is_dangerous = is_dangerous
+
+    def add_symbol(self, name: str, type: TypeExpression, kind: str, access_modifier: Optional[str] = None):
         if name in self.current_scope.symbols:
             raise ValueError(f"Symbol '{name}' already defined in current scope")
-        self.current_scope.symbols[name] = Symbol(name, type, kind, self.current_scope)
+        symbol = Symbol(name, type, kind, self.current_scope, access_modifier)
+        self.current_scope.symbols[name] = symbol
+        self.bindings.setdefault(name, []).append(symbol)
+
+    def detach_scope(self, scope: ScopeNode):
+        """Remove a scope and everything declared in it, e.g. to replace it after a reparse."""
+        parent = scope.parent
+        parent.children.remove(scope)
+        if parent.children_by_name.get(scope.name) is scope:
+            del parent.children_by_name[scope.name]
+            for child in parent.children:
+                if child.name == scope.name:
+                    parent.children_by_name[scope.name] = child
+                    break
+        pending = [scope]
+        while pending:
+            scope = pending.pop()
+            if self.scope_index.get(scope.qualified_name) is scope:
+                del self.scope_index[scope.qualified_name]
+            pending.extend(scope.children)
 
     def lookup_symbol(self, name: str) -> Optional[Symbol]:
-        scope = self.current_scope
-        while scope:
-            if name in scope.symbols:
-                return scope.symbols[name]
-            scope = scope.parent
-        return None
+        stack = self.bindings.get(name)
+        return stack[-1] if stack else None
 
     def is_in_dangerous_scope(self) -> bool:
-        scope = self.current_scope
-        while scope:
-            if scope.is_dangerous:
-                return True
-            scope = scope.parent
-        return False
+        return self.dangerous_depth > 0
+
+    def find_scope(self, qualified_name: str) -> Optional[ScopeNode]:
+        return self.scope_index.get(qualified_name)
+
+    def resolve(self, qualified_name: str) -> Optional[Union[ScopeNode, Symbol]]:
+        """Resolve a qualified name such as Main.Person.Age to a scope or a symbol.
+
+        This is what `using`, `with` and `in` statements refer to.
+        """
+        scope = self.scope_index.get(qualified_name)
+        if scope is not None:
+            return scope
+        owner, _, name = qualified_name.rpartition(".")
+        scope = self.scope_index.get(owner)
+        if scope is None:
+            return None
+        return scope.symbols.get(name)
+
+    def merge(self, other: 'SymbolTable'):
+        """Merge the scopes of another table (for example another file) into this one.
+
+        Declaration scopes with the same qualified name are merged; a symbol
+        declared in both raises ValueError, and leaves this table unchanged.
+        """
+        conflict = self._find_conflict(self.root, other.root, {}, {})
+        if conflict is not None:
+            name, scope = conflict
+            raise ValueError(f"Symbol '{name}' already defined in {scope.qualified_name or 'global scope'}")
+        self._merge_scope(self.root, other.root)
+
+    def _find_conflict(self, target: ScopeNode, source: ScopeNode, added: Dict[ScopeNode, set],
+                       adopted: Dict[tuple, ScopeNode]):
+        """(name, scope) of the first symbol _merge_scope would declare twice, or None; changes nothing.
+
+        added holds the names the merge would have put in each scope so far,
+        and adopted the source scopes it would have moved under a target.
+        """
+        names = added.setdefault(target, set())
+        for name in source.symbols:
+            if name in target.symbols or name in names:
+                return name, target
+        names.update(source.symbols)
+        for child in source.children:
+            existing = target.children_by_name.get(child.name) or adopted.get((target, child.name))
+            if child.scope_type in DECLARATION_SCOPES and existing is not None and existing.scope_type == child.scope_type:
+                conflict = self._find_conflict(existing, child, added, adopted)
+                if conflict is not None:
+                    return conflict
+            else:
+                adopted.setdefault((target, child.name), child)
+        return None
+
+    def _merge_scope(self, target: ScopeNode, source: ScopeNode):
+        for name, symbol in source.symbols.items():
+            symbol.scope = target
+            target.symbols[name] = symbol
+        target.imports.extend(source.imports)
+        for child in source.children:
+            existing = target.children_by_name.get(child.name)
+            if child.scope_type in DECLARATION_SCOPES and existing is not None and existing.scope_type == child.scope_type:
+                self._merge_scope(existing, child)
+            else:
+                child.parent = target
+                target.children.append(child)
+                target.children_by_name.setdefault(child.name, child)
+                self._index_scopes(child)
+
+    def _index_scopes(self, scope: ScopeNode):
+        pending = [scope]
+        while pending:
+            scope = pending.pop()
+            if scope.scope_type in DECLARATION_SCOPES:
+                self.scope_index.setdefault(scope.qualified_name, scope)
+            pending.extend(scope.children)
+
+    def print_table(self, scope: Optional[ScopeNode] = None, depth: int = 0):
+        scope = scope or self.root
+        indent = "  " * depth
+        marker = " (dangerous)" if scope.is_dangerous else ""
+        print(f"{indent}{scope.name} [{scope.scope_type.name}]{marker}")
+        for symbol in scope.symbols.values():
+            print(f"{indent}  {symbol.name}: {symbol.type} ({symbol.kind})")
+        for child in scope.children:
+            self.print_table(child, depth + 1)
@@ -0,0 +1,60 @@
+from narya_ast import StringInterpolation
+
+# Classes whose str() already is their Narya text; bool is not one of them
+PLAIN_TYPES = frozenset((str, int, float))
+
+def to_text(value):
+    if value is True:
+        return "true"
+    if value is False:
+        return "false"
+    if value is None:
+        return "null"
+    if isinstance(value, list):
+        return "[" + ", ".join(to_text(item) for item in value) + "]"
+    return str(value)
+
+class Template:
+    """An interpolated string compiled once: literal segments around one slot per name.
+
+    The transformer has already resolved the '' and .. escapes, so the
+    segments are final text. They are compiled into a Python f-string,
+    making render one call that builds the string in a single step.
+    """
+    __slots__ = ('segments', 'names', 'render')
+
+    def __init__(self, segments, names):
+        # One more segment than names; segments[i] comes before names[i]
+        self.segments = tuple(segments)
+        self.names = tuple(names)
+        self.render = _compile_render(self.segments)
+
+    def __reduce__(self):
+        return Template, (self.segments, self.names)
+
+    def __repr__(self):
+        text = self.segments[0] + "".join(f".{name}{segment}" for name, segment in zip(self.names, self.segments[1:]))
+        return f"Template({text!r})"
+
+def _compile_render(segments):
+    """A function taking one value per slot and returning the rendered text."""
+    # Adjacent literals join into one f-string; repr() takes care of quoting the segments
+    parameters = [f"value{index}" for index in range(len(segments) - 1)]
+    pieces = [repr(segments[0])]
+    for parameter, segment in zip(parameters, segments[1:]):
+        pieces.append(f"f'{{{parameter} if {parameter}.__class__ in PLAIN_TYPES else to_text({parameter})}}'")
+        pieces.append(repr(segment))
+    source = f"lambda {', '.join(parameters)}: {' '.join(pieces)}"
+    return eval(source, {"PLAIN_TYPES": PLAIN_TYPES, "to_text": to_text})
+
+def compile_template(node):
+    """The Template of an InterpolatedString node."""
+    segments = [""]
+    names = []
+    for part in node.parts:
+        if isinstance(part, StringInterpolation):
+            names.append(part.identifier)
+            segments.append("")
+        else:
+            segments[-1] += part.value
+    return Template(segments, names)
@@ -1,36 +1,91 @@
-from lark import Transformer, v_args, Token
+from lark import Transformer, v_args, Token, Tree
+import re
 import narya_ast
-from narya_symbol_table import SymbolTable, ScopeType
 import logging
+from narya_diagnostics import Diagnostic
 
-logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
+ACCESS_MODIFIERS = ("public", "private", "protected")
+BUILTIN_TYPES = ("num", "int", "big int", "uint", "big uint", "float", "big float", "text", "char", "string", "bool", "byte")
+LAYOUT_TOKENS = ('NEWLINE', 'INDENT', 'DEDENT')
+INTERPOLATION_PATTERN = re.compile(r"''|\.\.|\.([a-zA-Z_][a-zA-Z0-9_]*)")
+
+def enable_tracing(stream=None):
+    """Route transformer trace messages to stream (stderr by default)."""
+    if not logger.handlers:
+        handler = logging.StreamHandler(stream)
+        handler.setFormatter(logging.Formatter("%(name)s: %(message)s"))
+        logger.addHandler(handler)
+    logger.setLevel(logging.DEBUG)
+
 class NaryaTransformer(Transformer):
-    def __init__(self):
-        super().__init__()
-        self.symbol_table = SymbolTable()
+    def __init__(self, trace=False, recover=False):
+        # Layout tokens are only visited to trace them, so without tracing
+        # Lark skips the token callbacks entirely.
+        super().__init__(visit_tokens=trace)
+        self.trace = trace
+        # With recover, trees from the recovering parser that are still
+        # malformed get ErrorNodes and diagnostics instead of raising
+        self.recover = recover
+        self.diagnostics = []
+        self.line_offset = 0
+
+    def transform(self, tree, first_line=1):
+        """The AST of a parse tree whose first line is line first_line of its file."""
+        self.diagnostics = []
+        self.line_offset = first_line - 1
+        return super().transform(tree)
+
+    def structure_error(self, message, items):
+        """Raise ValueError; with recover, record a diagnostic and return an ErrorNode instead."""
+        if not self.recover:
+            raise ValueError(message)
+        # The rules' own line breaks are the only positions left in the items
+        line = next((item.line + self.line_offset for item in items
+                     if isinstance(item, Token) and item.type == 'NEWLINE'), None)
+        self.diagnostics.append(Diagnostic(message, line=line, column=1))
+        return narya_ast.ErrorNode(message=message, line=line, column=1)
 
     def filter_newlines(self, items):
-        return [item for item in items if not (isinstance(item, Token) and item.type == 'NEWLINE')]
+        return [item for item in items if not (isinstance(item, Token) and item.type in LAYOUT_TOKENS)]
 
     @v_args(inline=True)
     def start(self, *rings):
-        logger.debug(f"Start method called with {len(rings)} rings")
+        if self.trace:
+            logger.debug("Start method called with %d rings", len(rings))
         return narya_ast.Program(statements=self.filter_newlines(rings))
 
     @v_args(inline=True)
-    def ring(self, name, block):
-        logger.debug(f"Ring method called with name: {name}")
-        self.symbol_table.enter_scope(str(name), ScopeType.RING)
-        result = narya_ast.Ring(name=str(name), body=block)
-        self.symbol_table.exit_scope()
-        return result
+    def ring(self, *args):
+        name, block = self.filter_newlines(args)
+        if self.trace:
+            logger.debug("Ring method called with name: %s", name)
+        return narya_ast.Ring(name=str(name), body=block)
 
     @v_args(inline=True)
     def block(self, *statements):
-        logger.debug(f"Block method called with {len(statements)} statements")
-        return narya_ast.Suite(statements=self.filter_newlines(statements))
+        if self.trace:
+            logger.debug("Block method called with %d statements", len(statements))
+        merged = []
+        for statement in self.filter_newlines(statements):
+            if isinstance(statement, Tree) and statement.data == 'do_while_condition':
+                if merged and isinstance(merged[-1], narya_ast.ErrorNode):
+                    # The do block it belongs to was a syntax error, already reported
+                    continue
+                if not merged or not isinstance(merged[-1], narya_ast.DoBlock):
+                    merged.append(self.structure_error("'? repeat' must directly follow a do block",
+                                                       statement.children))
+                    continue
+                merged[-1] = narya_ast.DoWhileStatement(body=merged[-1].body, condition=statement.children[0])
+            else:
+                merged.append(statement)
+        return narya_ast.Suite(statements=merged)
+
+    @v_args(inline=True)
+    def do_while_condition(self, condition, *newlines):
+        # Left for block to merge into the do block before it; the line break locates it
+        return Tree('do_while_condition', [condition, *newlines])
 
     @v_args(inline=True)
     def type_expression(self, *args):
@@ -41,9 +96,9 @@ class NaryaTransformer(Transformer):
             return narya_ast.TypeExpression(base_type=str(args[0]))
         elif len(args) == 2:
             if args[1] == '?':
-                return narya_ast.TypeExpression(base_type=args[0].base_type, parameters=args[0].parameters, is_nullable=True, is_mutable=args[0].is_mutable)
+                return args[0].with_flags(is_nullable=True)
             elif args[0] == '*':
-                return narya_ast.TypeExpression(base_type=args[1].base_type, parameters=args[1].parameters, is_nullable=args[1].is_nullable, is_mutable=True)
+                return args[1].with_flags(is_mutable=True)
             else:
                 return narya_ast.CollectionType(base_type=str(args[0]), value_type=args[1])
         elif len(args) == 3:
@@ -51,9 +106,44 @@ class NaryaTransformer(Transformer):
         else:
             raise ValueError(f"Unexpected number of arguments for type_expression: {len(args)}")
 
+    @v_args(inline=True)
+    def generic_type(self, name, *arguments):
+        arguments = self.filter_newlines(arguments)
+        if len(arguments) == 1 and isinstance(arguments[0], list):
+            # Read like a call at the start of a statement
+            arguments = arguments[0]
+        return narya_ast.TypeExpression(base_type=self.type_name(name),
+                                        parameters=[self.type_argument(argument) for argument in arguments])
+
+    def type_name(self, name):
+        if isinstance(name, narya_ast.Variable):
+            return name.name
+        if isinstance(name, Token) and name.type == 'IDENTIFIER':
+            return str(name)
+        raise ValueError(f"Expected a type name, got {type(name).__name__}")
+
+    def type_argument(self, argument):
+        if isinstance(argument, narya_ast.TypeExpression):
+            return argument
+        if isinstance(argument, narya_ast.FunctionCall):
+            return self.generic_type(argument.function, argument.arguments)
+        return narya_ast.TypeExpression(base_type=self.type_name(argument))
+
+    @v_args(inline=True)
+    def nullable_type(self, type_expr):
+        return self.type_expression(type_expr, '?')
+
+    @v_args(inline=True)
+    def access_modifier(self, modifier):
+        return str(modifier)
+
+    def mutable_marker(self, _):
+        return '*'
+
     @v_args(inline=True)
     def variable_declaration(self, *args):
-        logger.debug(f"Variable declaration method called with args: {args}")
+        if self.trace:
+            logger.debug("Variable declaration method called with args: %s", args)
         args = self.filter_newlines(args)
         is_mutable = False
         type_expr = None
@@ -63,24 +153,43 @@ class NaryaTransformer(Transformer):
         for arg in args:
             if isinstance(arg, str) and arg == '*':
                 is_mutable = True
+            elif isinstance(arg, str) and arg in ACCESS_MODIFIERS:
+                continue
             elif isinstance(arg, narya_ast.TypeExpression):
                 type_expr = arg
             elif isinstance(arg, str) and name is None:
-                name = arg
+                name = str(arg)
             else:
                 initializer = arg
-        
-        if name and type_expr:
-            logger.debug(f"Adding symbol: {name} with type: {type_expr}")
-            self.symbol_table.add_symbol(name, str(type_expr), "variable")
+
         return narya_ast.VariableDeclaration(type=type_expr, name=name, initializer=initializer, is_mutable=is_mutable)
 
     def collection_type(self, args):
         args = self.filter_newlines(args)
         if len(args) == 1:
-            return narya_ast.TypeExpression(base_type=str(args[0]))
+            return str(args[0])
         else:
-            return narya_ast.TypeExpression(base_type="UnknownCollectionType")
+            return "UnknownCollectionType"
+
+    @v_args(inline=True)
+    def parameter(self, type_expr, name):
+        return narya_ast.Parameter(type=type_expr, name=str(name))
+
+    def parameter_list(self, args):
+        return self.filter_newlines(args)
+
+    def argument_list(self, args):
+        return self.filter_newlines(args)
+
+    @v_args(inline=True)
+    def anonymous_function(self, *args):
+        args = self.filter_newlines(args)
+        body = args.pop()
+        parameters = args.pop(0) if args and isinstance(args[0], list) else []
+        if not isinstance(body, narya_ast.Suite):
+            # do(num x) num: x + 1 returns its expression
+            body = narya_ast.Suite(statements=[narya_ast.ReturnStatement(value=body)])
+        return narya_ast.AnonymousFunction(parameters=parameters, return_type=args[0] if args else None, body=body)
 
     @v_args(inline=True)
     def group_declaration(self, *args):
@@ -92,42 +201,31 @@ class NaryaTransformer(Transformer):
 
         for arg in args:
             if isinstance(arg, str):
-                if arg in ["public", "private", "protected"]:
+                if arg in ACCESS_MODIFIERS:
                     access_modifier = arg
                 elif name is None:
-                    name = arg
+                    name = str(arg)
                 elif parent is None:
-                    parent = arg
+                    parent = str(arg)
             elif isinstance(arg, narya_ast.Suite):
                 body = arg
 
-        if name:
-            self.symbol_table.add_symbol(name, "group", "group")
-            self.symbol_table.enter_scope(name, ScopeType.GROUP)
-
-        # Process the body of the group
-        if body:
-            for statement in body.statements:
-                self.transform(statement)
-
-        result = narya_ast.GroupDeclaration(name=name, parent=parent, body=body)
-        
-        if name:
-            self.symbol_table.exit_scope()
-
-        return result
+        return narya_ast.GroupDeclaration(name=name, parent=parent, body=body)
 
     @v_args(inline=True)
     def function_declaration(self, *args):
         args = self.filter_newlines(args)
+        access_modifier = None
         name = None
         return_type = None
         parameters = []
         body = None
 
         for arg in args:
-            if isinstance(arg, str) and name is None:
-                name = arg
+            if isinstance(arg, str) and arg in ACCESS_MODIFIERS:
+                access_modifier = arg
+            elif isinstance(arg, str) and name is None:
+                name = str(arg)
             elif isinstance(arg, narya_ast.TypeExpression) and return_type is None:
                 return_type = arg
             elif isinstance(arg, list):
@@ -135,106 +233,223 @@ class NaryaTransformer(Transformer):
             elif isinstance(arg, narya_ast.Suite):
                 body = arg
 
-        if name and return_type:
-            self.symbol_table.add_symbol(name, str(return_type), "function")
-        self.symbol_table.enter_scope(name, ScopeType.FUNCTION)
-        
-        # Process function parameters
-        for param in parameters:
-            self.symbol_table.add_symbol(param.name, str(param.type), "parameter")
-
-        # Process function body
-        if body:
-            for statement in body.statements:
-                self.transform(statement)
+        return narya_ast.FunctionDeclaration(name=name, parameters=parameters, return_type=return_type, body=body, access_modifier=access_modifier)
 
-        result = narya_ast.FunctionDeclaration(name=name, parameters=parameters, return_type=return_type, body=body)
-        self.symbol_table.exit_scope()
-        return result
+    @v_args(inline=True)
+    def property_declaration(self, *args):
+        args = self.filter_newlines(args)
+        type_expr = args[-3]
+        # `Person Charlie` with a body declares an instance group deriving from Person
+        if len(args) == 3 and type(type_expr) is narya_ast.TypeExpression and not type_expr.is_nullable and type_expr.base_type not in BUILTIN_TYPES:
+            return self.group_declaration(args[1], type_expr.base_type, args[2])
+        return self.function_declaration(*args)
 
     @v_args(inline=True)
     def do_block(self, *args):
         args = self.filter_newlines(args)
-        self.symbol_table.enter_scope("do", ScopeType.CONTROL_FLOW)
-        result = narya_ast.DoBlock(body=args[0])
-        self.symbol_table.exit_scope()
-        return result
+        return narya_ast.DoBlock(body=args[0])
 
     @v_args(inline=True)
     def if_statement(self, *args):
         args = self.filter_newlines(args)
         condition = args[0]
         if_body = args[1]
-        else_body = args[2] if len(args) > 2 else None
+        else_body = None
+        if len(args) > 3:
+            # Chained `else if` branches nest as the else body of this statement
+            else_body = narya_ast.Suite(statements=[self.if_statement(*args[2:])])
+        elif len(args) == 3:
+            else_body = args[2]
+        return narya_ast.IfStatement(condition=condition, if_body=if_body, else_body=else_body)
 
-        self.symbol_table.enter_scope("if", ScopeType.CONTROL_FLOW)
-        self.transform(if_body)
-        self.symbol_table.exit_scope()
+    @v_args(inline=True)
+    def while_statement(self, *args):
+        condition, body = self.filter_newlines(args)
+        return narya_ast.WhileStatement(condition=condition, body=body)
 
-        if else_body:
-            self.symbol_table.enter_scope("else", ScopeType.CONTROL_FLOW)
-            self.transform(else_body)
-            self.symbol_table.exit_scope()
+    @v_args(inline=True)
+    def for_statement(self, *args):
+        variable, start, end, body = self.filter_newlines(args)
+        return narya_ast.ForStatement(variable=str(variable), start=start, end=end, body=body)
 
-        return narya_ast.IfStatement(condition=condition, if_body=if_body, else_body=else_body)
+    @v_args(inline=True)
+    def foreach_statement(self, *args):
+        variable, iterable, body = self.filter_newlines(args)
+        return narya_ast.ForeachStatement(variable=str(variable), iterable=iterable, body=body)
 
     @v_args(inline=True)
-    def while_statement(self, condition, body):
-        self.symbol_table.enter_scope("while", ScopeType.CONTROL_FLOW)
-        self.transform(body)
-        self.symbol_table.exit_scope()
-        return narya_ast.WhileStatement(condition=condition, body=body)
+    def match_statement(self, *args):
+        subject, *cases = self.filter_newlines(args)
+        return narya_ast.MatchStatement(subject=subject, cases=cases)
 
     @v_args(inline=True)
-    def for_statement(self, variable, start, end, body):
-        self.symbol_table.enter_scope("for", ScopeType.CONTROL_FLOW)
-        self.symbol_table.add_symbol(variable, "int", "loop_variable")  # Assuming int type for loop variable
-        self.transform(body)
-        self.symbol_table.exit_scope()
-        return narya_ast.ForStatement(variable=variable, start=start, end=end, body=body)
+    def match_case(self, *args):
+        args = self.filter_newlines(args)
+        pattern = str(args[0]) if len(args) > 1 else None
+        return narya_ast.MatchCase(pattern=pattern, body=args[-1])
 
     @v_args(inline=True)
-    def foreach_statement(self, variable, iterable, body):
-        self.symbol_table.enter_scope("foreach", ScopeType.CONTROL_FLOW)
-        self.symbol_table.add_symbol(variable, "any", "loop_variable")  # Using 'any' as we don't know the exact type
-        self.transform(body)
-        self.symbol_table.exit_scope()
-        return narya_ast.ForeachStatement(variable=variable, iterable=iterable, body=body)
+    def anonymous_scope(self, *args):
+        body = self.filter_newlines(args)
+        if len(body) > 1:
+            return self.structure_error("Malformed anonymous scope", args)
+        if not body:
+            body = [narya_ast.Suite(statements=[])]
+        elif not isinstance(body[0], narya_ast.Suite):
+            # A statement written inline, as in { print x }
+            body = [narya_ast.Suite(statements=body)]
+        return narya_ast.AnonymousScope(body=body[0])
 
     @v_args(inline=True)
-    def anonymous_scope(self, body):
-        self.symbol_table.enter_scope("", ScopeType.ANONYMOUS)
-        result = narya_ast.AnonymousScope(body=body)
-        self.symbol_table.exit_scope()
-        return result
+    def dangerous_scope(self, body):
+        return narya_ast.DangerousScope(body=body)
 
     @v_args(inline=True)
-    def dangerous_scope(self, keyword, body):
-        if isinstance(body, narya_ast.AnonymousScope):
-            self.symbol_table.enter_scope("", ScopeType.ANONYMOUS, is_dangerous=True)
-            result = self.transform(body)
-            self.symbol_table.exit_scope()
-        else:
-            current_scope = self.symbol_table.current_scope
-            current_scope.is_dangerous = True
-            result = self.transform(body)
-            current_scope.is_dangerous = False
-        return narya_ast.DangerousScope(body=result)
+    def error_statement(self, error, *args):
+        body = self.filter_newlines(args)
+        return narya_ast.ErrorNode(message=str(error), line=error.line, column=error.column,
+                                   body=body[0] if body else None)
+
+    error_block = block
+
+    @v_args(inline=True)
+    def expression_statement(self, expression, *newlines):
+        return expression
+
+    @v_args(inline=True)
+    def assignment(self, target, value, *newlines):
+        return narya_ast.BinaryOperation(left=target, operator="=", right=value)
+
+    @v_args(inline=True)
+    def print_statement(self, expression, *newlines):
+        return narya_ast.PrintStatement(expression=expression)
+
+    @v_args(inline=True)
+    def return_statement(self, *args):
+        values = self.filter_newlines(args)
+        return narya_ast.ReturnStatement(value=values[0] if values else None)
+
+    def skip_statement(self, args):
+        return narya_ast.SkipStatement()
+
+    def exit_statement(self, args):
+        return narya_ast.ExitStatement()
+
+    @v_args(inline=True)
+    def using_statement(self, name, *newlines):
+        return narya_ast.UsingStatement(name=str(name))
+
+    @v_args(inline=True)
+    def with_statement(self, qualified_name, *newlines):
+        return narya_ast.WithStatement(qualified_name=qualified_name)
+
+    @v_args(inline=True)
+    def in_statement(self, qualified_name, *newlines):
+        return narya_ast.InStatement(qualified_name=qualified_name)
+
+    def qualified_name(self, names):
+        return ".".join(str(name) for name in names)
+
+    @v_args(inline=True)
+    def binary_operation(self, left, operator, right):
+        return narya_ast.BinaryOperation(left=left, operator=str(operator), right=right)
+
+    @v_args(inline=True)
+    def unary_operation(self, operator, operand):
+        return narya_ast.UnaryOperation(operator=str(operator), operand=operand)
+
+    @v_args(inline=True)
+    def conditional(self, condition, if_true, if_false):
+        return narya_ast.Conditional(condition=condition, if_true=if_true, if_false=if_false)
+
+    @v_args(inline=True)
+    def member_access(self, obj, member):
+        return narya_ast.MemberAccess(object=obj, member=str(member))
+
+    @v_args(inline=True)
+    def function_call(self, function, arguments=None):
+        return narya_ast.FunctionCall(function=function, arguments=arguments or [])
+
+    @v_args(inline=True)
+    def object_creation(self, new, group, arguments=None):
+        return narya_ast.ObjectCreation(group=str(group), arguments=arguments)
+
+    def collection_literal(self, args):
+        args = self.filter_newlines(args)
+        if args and isinstance(args[0], Token) and args[0].type == 'NEW':
+            return narya_ast.CollectionLiteral(elements=[], size=int(args[1]))
+        if len(args) == 1 and isinstance(args[0], list):
+            args = args[0]
+        return narya_ast.CollectionLiteral(elements=args)
+
+    def dictionary_literal(self, entries):
+        entries = self.filter_newlines(entries)
+        return narya_ast.DictionaryLiteral(keys=[key for key, _ in entries], values=[value for _, value in entries])
+
+    @v_args(inline=True)
+    def dictionary_entry(self, key, value):
+        return str(key), value
+
+    @v_args(inline=True)
+    def variable(self, name):
+        return narya_ast.Variable(name=str(name))
+
+    @v_args(inline=True)
+    def integer(self, token):
+        return narya_ast.Integer(value=int(token))
+
+    @v_args(inline=True)
+    def float(self, token):
+        return narya_ast.Float(value=float(token))
+
+    @v_args(inline=True)
+    def boolean(self, token):
+        return narya_ast.Boolean(value=token == "true")
+
+    @v_args(inline=True)
+    def string(self, token):
+        return narya_ast.String(value=token[1:-1])
+
+    @v_args(inline=True)
+    def char(self, token):
+        return narya_ast.String(value=token[1:-1])
+
+    @v_args(inline=True)
+    def interpolated_string(self, token):
+        text = token[1:-1]
+        parts = []
+        literal = []
+        position = 0
+        for match in INTERPOLATION_PATTERN.finditer(text):
+            literal.append(text[position:match.start()])
+            if match.group(1):
+                if any(literal):
+                    parts.append(narya_ast.String(value="".join(literal)))
+                literal = []
+                parts.append(narya_ast.StringInterpolation(identifier=match.group(1)))
+            else:
+                literal.append(match.group(0)[0])
+            position = match.end()
+        literal.append(text[position:])
+        if any(literal):
+            parts.append(narya_ast.String(value="".join(literal)))
+        return narya_ast.InterpolatedString(parts=parts)
 
     def NEWLINE(self, token):
-        logger.debug(f"NEWLINE token encountered: {token}")
+        logger.debug("NEWLINE token encountered: %r", token)
         return token
 
     def INDENT(self, token):
-        logger.debug(f"INDENT token encountered: {token}")
+        logger.debug("INDENT token encountered: %r", token)
         return token
 
     def DEDENT(self, token):
-        logger.debug(f"DEDENT token encountered: {token}")
+        logger.debug("DEDENT token encountered: %r", token)
         return token
 
     def __default__(self, data, children, meta):
-        logger.debug(f"Default method called with data: {data}, children: {children}")
+        if self.trace:
+            logger.debug("Default method called with data: %s, children: %s", data, children)
         if data == 'collection_type':
             return self.collection_type(children)
         filtered_children = self.filter_newlines(children)
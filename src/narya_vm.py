@@ -0,0 +1,303 @@
+import sys
+import operator
+from functools import partial
+from narya_bytecode import *
+from narya_templates import to_text
+
+ARGUMENT_MASK = (1 << ARGUMENT_BITS) - 1
+
+class NaryaRuntimeError(RuntimeError):
+    pass
+
+class Instance:
+    __slots__ = ('group', 'fields')
+
+    def __init__(self, group, fields):
+        self.group = group
+        self.fields = fields
+
+    def __str__(self):
+        return self.group.name
+
+class BoundMethod:
+    __slots__ = ('receiver', 'function')
+
+    def __init__(self, receiver, function):
+        self.receiver = receiver
+        self.function = function
+
+def _xor(left, right):
+    return bool(left) != bool(right)
+
+# Indexed by the BINARY_OP argument, in the order of BINARY_OPERATORS
+BINARY_FUNCTIONS = (operator.pow, operator.lshift, operator.rshift, _xor, _xor)
+
+def _add(items, *values):
+    items.extend(values)
+
+LIST_METHODS = {
+    "Add": _add,
+    "Remove": list.remove,
+    "Contains": lambda items, value: value in items,
+    "Clear": list.clear,
+}
+SIZE_PROPERTIES = ("Count", "Length")
+
+class NaryaVM:
+    """Runs a BytecodeProgram.
+
+    Every frame runs in its own call of execute, a single dispatch loop
+    over the two-int instructions with the most frequent opcodes tested
+    first. Calls to Narya functions recurse into execute.
+    """
+
+    def __init__(self, program, output=None):
+        self.program = program
+        self.globals = [None] * program.globals_count
+        self.output = output or print
+
+    def run(self):
+        try:
+            for init in self.program.inits:
+                self.execute(init, [None] * init.nlocals)
+        except (ArithmeticError, TypeError, ValueError, IndexError, KeyError) as e:
+            raise NaryaRuntimeError(f"{type(e).__name__}: {e}") from e
+
+    def execute(self, code, frame):
+        instructions = code.code
+        constants = code.constants
+        global_values = self.globals
+        stack = []
+        push = stack.append
+        pop = stack.pop
+        pc = 0
+        while True:
+            opcode = instructions[pc]
+            argument = instructions[pc + 1]
+            pc += 2
+            if opcode == LOAD_LOCAL:
+                push(frame[argument])
+            elif opcode == LOAD_CONST:
+                push(constants[argument])
+            elif opcode == STORE_LOCAL:
+                frame[argument] = pop()
+            elif opcode == LOAD_FIELD:
+                push(frame[0].fields[argument])
+            elif opcode == ADD:
+                right = pop()
+                left = stack[-1]
+                if left.__class__ is str or right.__class__ is str:
+                    stack[-1] = to_text(left) + to_text(right)
+                else:
+                    stack[-1] = left + right
+            elif opcode == JUMP_IF_FALSE:
+                if not pop():
+                    pc = argument
+            elif opcode == LESS:
+                right = pop()
+                stack[-1] = stack[-1] < right
+            elif opcode == JUMP:
+                pc = argument
+            elif opcode == SUBTRACT:
+                right = pop()
+                stack[-1] = stack[-1] - right
+            elif opcode == MULTIPLY:
+                right = pop()
+                stack[-1] = stack[-1] * right
+            elif opcode == CALL:
+                if argument:
+                    arguments = stack[-argument:]
+                    del stack[-argument:]
+                else:
+                    arguments = []
+                callee = pop()
+                if callee.__class__ is Function:
+                    push(self.invoke(callee, arguments))
+                else:
+                    push(self.call_value(callee, arguments))
+            elif opcode == CALL_METHOD:
+                count = argument & ARGUMENT_MASK
+                name = constants[argument >> ARGUMENT_BITS]
+                if count:
+                    arguments = stack[-count:]
+                    del stack[-count:]
+                else:
+                    arguments = []
+                receiver = pop()
+                method = receiver.group.methods.get(name) if receiver.__class__ is Instance else None
+                if method is not None:
+                    arguments.insert(0, receiver)
+                    push(self.invoke(method, arguments))
+                else:
+                    push(self.call_method(receiver, name, arguments))
+            elif opcode == RETURN:
+                return pop()
+            elif opcode == STORE_FIELD:
+                frame[0].fields[argument] = pop()
+            elif opcode == LOAD_GLOBAL:
+                push(global_values[argument])
+            elif opcode == STORE_GLOBAL:
+                global_values[argument] = pop()
+            elif opcode == LOAD_ATTR:
+                stack[-1] = self.load_attribute(stack[-1], constants[argument])
+            elif opcode == EQUAL:
+                right = pop()
+                stack[-1] = stack[-1] == right
+            elif opcode == NOT_EQUAL:
+                right = pop()
+                stack[-1] = stack[-1] != right
+            elif opcode == LESS_EQUAL:
+                right = pop()
+                stack[-1] = stack[-1] <= right
+            elif opcode == GREATER:
+                right = pop()
+                stack[-1] = stack[-1] > right
+            elif opcode == GREATER_EQUAL:
+                right = pop()
+                stack[-1] = stack[-1] >= right
+            elif opcode == DIVIDE:
+                right = pop()
+                stack[-1] = stack[-1] / right
+            elif opcode == MODULO:
+                right = pop()
+                stack[-1] = stack[-1] % right
+            elif opcode == FOR_ITER:
+                item = next(stack[-1], _EXHAUSTED)
+                if item is _EXHAUSTED:
+                    pop()
+                    pc = argument
+                else:
+                    push(item)
+            elif opcode == POP:
+                pop()
+            elif opcode == JUMP_IF_TRUE:
+                if pop():
+                    pc = argument
+            elif opcode == JUMP_IF_FALSE_OR_POP:
+                if stack[-1]:
+                    pop()
+                else:
+                    pc = argument
+            elif opcode == JUMP_IF_TRUE_OR_POP:
+                if stack[-1]:
+                    pc = argument
+                else:
+                    pop()
+            elif opcode == NOT:
+                stack[-1] = not stack[-1]
+            elif opcode == NEGATE:
+                stack[-1] = -stack[-1]
+            elif opcode == BINARY_OP:
+                right = pop()
+                stack[-1] = BINARY_FUNCTIONS[argument](stack[-1], right)
+            elif opcode == FORMAT:
+                template = constants[argument]
+                count = len(template.names)
+                values = stack[-count:]
+                del stack[-count:]
+                push(template.render(*values))
+            elif opcode == BUILD_LIST:
+                items = stack[-argument:] if argument else []
+                del stack[len(stack) - argument:]
+                push(items)
+            elif opcode == MAKE_ARRAY:
+                push([None] * argument)
+            elif opcode == GET_ITER:
+                value = stack[-1]
+                stack[-1] = iter(range(value) if value.__class__ is int else value)
+            elif opcode == STORE_ATTR:
+                value = pop()
+                self.store_attribute(pop(), constants[argument], value)
+            elif opcode == PRINT:
+                self.output(to_text(pop()))
+            else:
+                raise NaryaRuntimeError(f"Unknown opcode {opcode} in {code.name}")
+
+    def invoke(self, function, arguments):
+        code = function.code
+        if len(arguments) != code.argcount:
+            expected = code.argcount - 1 if function.is_method else code.argcount
+            given = len(arguments) - 1 if function.is_method else len(arguments)
+            raise NaryaRuntimeError(f"{function.name} takes {expected} arguments, {given} given")
+        if code.nlocals > code.argcount:
+            arguments.extend([None] * (code.nlocals - code.argcount))
+        return self.execute(code, arguments)
+
+    def construct(self, group, arguments):
+        instance = Instance(group, [None] * len(group.fields))
+        for init in group.inits:
+            self.execute(init, [instance] + [None] * (init.nlocals - 1))
+        constructor = group.constructor
+        # `new Person` skips a constructor that needs arguments
+        if constructor is not None and (arguments or constructor.code.argcount == 1):
+            self.invoke(constructor, [instance] + arguments)
+        elif arguments:
+            raise NaryaRuntimeError(f"{group.name} has no constructor taking {len(arguments)} arguments")
+        return instance
+
+    def call_value(self, callee, arguments):
+        if isinstance(callee, Function):
+            return self.invoke(callee, arguments)
+        if isinstance(callee, Group):
+            return self.construct(callee, arguments)
+        if isinstance(callee, BoundMethod):
+            return self.invoke(callee.function, [callee.receiver] + arguments)
+        if callable(callee):
+            return callee(*arguments)
+        raise NaryaRuntimeError(f"{to_text(callee)} is not callable")
+
+    def call_method(self, receiver, name, arguments):
+        if isinstance(receiver, list) and name in LIST_METHODS:
+            return LIST_METHODS[name](receiver, *arguments)
+        if isinstance(receiver, Ring):
+            member = receiver.members.get(name)
+            if isinstance(member, (Function, Group)):
+                return self.call_value(member, arguments)
+        return self.call_value(self.load_attribute(receiver, name), arguments)
+
+    def load_attribute(self, value, name):
+        if isinstance(value, Instance):
+            group = value.group
+            index = group.field_index.get(name)
+            if index is not None:
+                return value.fields[index]
+            method = group.methods.get(name)
+            if method is not None:
+                # Parameterless methods read like properties: person.Greeting
+                if method.code.argcount == 1:
+                    return self.invoke(method, [value])
+                return BoundMethod(value, method)
+        elif isinstance(value, (list, str)):
+            if name in SIZE_PROPERTIES:
+                return len(value)
+            if isinstance(value, list) and name in LIST_METHODS:
+                return partial(LIST_METHODS[name], value)
+        elif isinstance(value, Ring):
+            member = value.members.get(name)
+            if isinstance(member, GlobalSlot):
+                return self.globals[member.index]
+            if member is not None:
+                return member
+        raise NaryaRuntimeError(f"{to_text(value)} has no member '{name}'")
+
+    def store_attribute(self, target, name, value):
+        if isinstance(target, Instance) and name in target.group.field_index:
+            target.fields[target.group.field_index[name]] = value
+        elif isinstance(target, Ring) and isinstance(target.members.get(name), GlobalSlot):
+            self.globals[target.members[name].index] = value
+        else:
+            raise NaryaRuntimeError(f"Cannot assign '{name}' on {to_text(value)}")
+
+_EXHAUSTED = object()
+
+def run_source(code, output=None, compiler=None):
+    """Compile Narya source to bytecode and run it."""
+    from narya_compiler import NaryaCompiler
+    compiler = compiler or NaryaCompiler()
+    program = generate_bytecode(compiler.parse(code))
+    NaryaVM(program, output).run()
+
+# Usage: python narya_vm.py program.narya
+if __name__ == "__main__":
+    with open(sys.argv[1]) as source_file:
+        run_source(source_file.read())